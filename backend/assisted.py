@@ -0,0 +1,133 @@
+"""
+Assisted (speculative) decoding with a small draft model.
+A locally available draft seq2seq model that shares the target's tokenizer
+proposes a few tokens at a time and the target model checks them in one
+forward pass (transformers' ``assistant_model``). Decoding is greedy, so the
+output is exactly the target model's greedy output; only the number of
+target decoder passes changes.
+
+Draft models are configured per task with TEXTMORPH_DRAFT_MODEL_SUMMARY and
+TEXTMORPH_DRAFT_MODEL_PARAPHRASE (TEXTMORPH_DRAFT_MODEL sets both). Tasks
+without a draft model, and non-torch backends, keep normal beam search.
+Assisted generation runs one sequence at a time.
+"""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from backend import metrics
+from backend.model_manager import get_model
+from backend.startup import lazy_import
+
+TASKS = ("summary", "paraphrase")
+
+# Tokens the draft model proposes per round (transformers adapts it from there)
+DRAFT_TOKENS = int(os.environ.get("TEXTMORPH_DRAFT_TOKENS", "5"))
+
+_draft_models: Dict[str, Optional[str]] = {
+    task: os.environ.get(f"TEXTMORPH_DRAFT_MODEL_{task.upper()}") or os.environ.get("TEXTMORPH_DRAFT_MODEL") or None
+    for task in TASKS
+}
+
+# Output-affecting settings in assisted mode, for result-cache keys; the draft
+# model itself does not change the output
+DECODING = dict(num_beams=1, do_sample=False, assisted=True)
+
+_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+def draft_model(task: str) -> Optional[str]:
+    """Draft model configured for ``task``, or None."""
+    return _draft_models.get(task)
+
+def set_draft_model(task: str, model_name: Optional[str]) -> None:
+    """Use ``model_name`` as the draft model for ``task``; None turns assisted decoding off."""
+    if task not in TASKS:
+        raise ValueError(f"Unknown task {task!r}; expected one of {TASKS}")
+    _draft_models[task] = model_name or None
+
+def enabled(task: str, backend_name: str) -> bool:
+    """Assisted decoding applies: a draft model is configured and the backend runs torch models."""
+    return draft_model(task) is not None and backend_name == "torch"
+
+@contextmanager
+def _count_forwards(model, counts: Dict[str, int], name: str):
+    """Count top-level forward calls (one per decoding step) while the block runs."""
+    def hook(module, args, output):
+        counts[name] += 1
+    handle = model.register_forward_hook(hook)
+    try:
+        yield
+    finally:
+        handle.remove()
+
+def _record(task: str, counts: Dict[str, int]) -> None:
+    # Every target pass emits the draft tokens it accepted plus one of its own
+    accepted = max(0, counts["new_tokens"] - counts["target_passes"])
+    with _lock:
+        totals = _stats.setdefault(task, dict.fromkeys(
+            ("sequences", "new_tokens", "target_passes", "drafted", "accepted"), 0))
+        totals["sequences"] += counts["sequences"]
+        totals["new_tokens"] += counts["new_tokens"]
+        totals["target_passes"] += counts["target_passes"]
+        totals["drafted"] += counts["drafted"]
+        totals["accepted"] += accepted
+    metrics.inc("assisted_drafted_tokens", counts["drafted"], task=task)
+    metrics.inc("assisted_accepted_tokens", accepted, task=task)
+    metrics.inc("assisted_target_passes", counts["target_passes"], task=task)
+
+def generate(task: str, model_name: str, batch: Dict[str, object], max_length: int,
+             min_length: int = 0) -> Optional[List[List[int]]]:
+    """
+    Greedy assisted generation for each row of a padded batch, returning
+    token id sequences like InferenceBackend.generate. Returns None when the
+    draft model cannot be loaded; assisted decoding is then switched off for
+    the task and the caller decodes normally.
+    """
+    torch = lazy_import("torch")
+    _, model, device = get_model(model_name)
+    try:
+        _, draft, _ = get_model(draft_model(task))
+    except Exception as e:
+        logging.warning(f"Draft model {draft_model(task)!r} unavailable, decoding {task} normally: {e}")
+        set_draft_model(task, None)
+        return None
+    draft.generation_config.num_assistant_tokens = DRAFT_TOKENS
+
+    counts = dict.fromkeys(("sequences", "new_tokens", "target_passes", "drafted"), 0)
+    outputs: List[List[int]] = []
+    input_ids, attention_mask = batch["input_ids"], batch["attention_mask"]
+    with torch.inference_mode(), _count_forwards(model, counts, "target_passes"), \
+            _count_forwards(draft, counts, "drafted"):
+        for ids, mask in zip(input_ids, attention_mask):
+            # Assisted generation takes one unpadded sequence at a time
+            row = ids[mask.bool()].unsqueeze(0).to(device)
+            out = model.generate(input_ids=row, attention_mask=torch.ones_like(row),
+                                 assistant_model=draft, num_beams=1, do_sample=False,
+                                 max_length=max_length, min_length=min_length)
+            outputs.append(out[0].tolist())
+            counts["sequences"] += 1
+            counts["new_tokens"] += out.shape[-1] - 1   # minus the decoder start token
+    _record(task, counts)
+    return outputs
+
+def acceptance_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Per-task totals: draft tokens proposed and accepted, target decoder
+    passes, acceptance rate, and new tokens per target pass (1.0 means the
+    draft never helped).
+    """
+    with _lock:
+        snapshot = {task: dict(totals) for task, totals in _stats.items()}
+    for totals in snapshot.values():
+        totals["acceptance_rate"] = totals["accepted"] / totals["drafted"] if totals["drafted"] else 0.0
+        totals["tokens_per_pass"] = (totals["new_tokens"] / totals["target_passes"]
+                                     if totals["target_passes"] else 0.0)
+    return snapshot
+
+def reset_stats() -> None:
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,230 @@
+"""
+Offline batch processing.
+Reads a directory of txt/pdf/docx files (or a JSONL manifest) and runs
+summarization, paraphrasing and/or readability over a pool of worker
+processes, each loading the model once. Results are written as they finish,
+to a JSONL file and/or the database, and every finished document is recorded
+in a checkpoint file so an interrupted run resumes where it stopped.
+
+Manifest lines look like {"id": "...", "path": "..."} or {"id": "...", "text": "..."}.
+
+Usage:
+    python -m backend.batch INPUT [--tasks summary,readability] [--workers 2]
+                            [--output results.jsonl] [--db-user NAME] [--checkpoint FILE]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Set
+
+TASKS = ("summary", "paraphrase", "readability")
+MODEL_TASKS = ("summary", "paraphrase")
+EXTENSIONS = (".txt", ".pdf", ".docx")
+LOG_EVERY = 25
+
+_settings: Dict[str, object] = {}
+
+# ---------- INPUTS ----------
+def iter_documents(source: str) -> Iterator[Dict[str, str]]:
+    """Yield {"id", "path"} or {"id", "text"} for each document in a directory or JSONL manifest."""
+    if os.path.isdir(source):
+        for root, _, files in sorted(os.walk(source)):
+            for name in sorted(files):
+                if name.lower().endswith(EXTENSIONS):
+                    path = os.path.join(root, name)
+                    yield {"id": os.path.relpath(path, source), "path": path}
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            doc = json.loads(line)
+            if "path" in doc and not os.path.isabs(doc["path"]):
+                doc["path"] = os.path.join(base, doc["path"])
+            doc.setdefault("id", doc.get("path") or f"line-{line_no}")
+            yield doc
+
+def default_checkpoint(source: str, output: Optional[str] = None) -> str:
+    """OUTPUT.done, or INPUT.done next to the input when results only go to the database."""
+    return (output or os.path.abspath(source).rstrip(os.sep)) + ".done"
+
+def load_checkpoint(path: Optional[str]) -> Set[str]:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+# ---------- WORKER ----------
+def _init_worker(settings: Dict[str, object]) -> None:
+    """Runs once per worker process: load the model and size torch's thread pool."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    _settings.update(settings)
+
+    from backend import extraction
+    extraction.WORKERS = 1   # pool workers cannot start their own extraction pool
+
+    if any(task in MODEL_TASKS for task in settings["tasks"]):
+        from backend.model_manager import configure_threads, get_model
+        configure_threads(settings["threads"])
+        get_model()
+
+def process_document(doc: Dict[str, str]) -> Dict[str, object]:
+    """Run the configured tasks on one document and return its result record."""
+    start = time.perf_counter()
+    record: Dict[str, object] = {"id": doc["id"]}
+    try:
+        if "text" in doc:
+            text = doc["text"]
+        else:
+            from backend.extraction import extract_text
+            with open(doc["path"], "rb") as f:
+                text = extract_text(f.read(), doc["path"], use_cache=False)
+        text = " ".join(text.split())
+        record["words"] = len(text.split())
+
+        tasks = _settings["tasks"]
+        if any(task in MODEL_TASKS for task in tasks):
+            from backend.inference import get_backend
+            from backend.model_manager import DEFAULT_MODEL
+            record["tokens"] = len(get_backend().tokenizer(DEFAULT_MODEL)(text).input_ids)
+        else:
+            record["tokens"] = record["words"]
+
+        if "summary" in tasks:
+            from backend.summarization import summarize_text
+            summary, rouge_scores = summarize_text(text, summary_length=_settings["summary_length"])
+            record["summary"] = {"text": summary, "rouge": rouge_scores}
+        if "paraphrase" in tasks:
+            from backend.paraphrasing import generate_paraphrase
+            record["paraphrase"] = {"text": generate_paraphrase(text, complexity=_settings["complexity"])}
+        if "readability" in tasks:
+            from backend.text_readability import calculate_readability
+            scores, category, _ = calculate_readability(text, with_chart=False)
+            record["readability"] = {"scores": scores, "category": category}
+        if _settings.get("keep_text"):
+            record["text"] = text
+    except Exception as e:
+        logging.exception(f"Document {doc['id']} failed")
+        record["error"] = str(e) or type(e).__name__
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+# ---------- DRIVER ----------
+def _save_to_db(username: str, record: Dict[str, object], text: str) -> None:
+    from backend import metrics
+    from database.user_db import save_processed_text
+    for task in MODEL_TASKS:
+        if task in record:
+            with metrics.span("db_write", table="processed_text"):
+                save_processed_text(username, task, text, record[task]["text"], "pegasus")
+
+def run_batch(source: str, tasks: List[str], workers: int = 1, output: Optional[str] = None,
+              db_user: Optional[str] = None, checkpoint: Optional[str] = None,
+              summary_length: str = "medium", complexity: str = "medium") -> Dict[str, float]:
+    """
+    Process every document not yet in the checkpoint; returns throughput
+    statistics. Database runs always keep a checkpoint (see
+    default_checkpoint), so a rerun never saves the same document twice.
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    if db_user and not checkpoint:
+        checkpoint = default_checkpoint(source, output)
+    done = load_checkpoint(checkpoint)
+    pending = [doc for doc in iter_documents(source) if doc["id"] not in done]
+    logging.info(f"{len(pending)} documents to process ({len(done)} already done)")
+
+    settings = {
+        "tasks": tasks,
+        "summary_length": summary_length,
+        "complexity": complexity,
+        "threads": max(1, (os.cpu_count() or 1) // max(workers, 1)),
+        "keep_text": bool(db_user),   # the database stores the original alongside the result
+    }
+    stats = {"documents": 0, "failed": 0, "skipped": len(done), "words": 0, "tokens": 0}
+    out_f = open(output, "a", encoding="utf-8") if output else None
+    ckpt_f = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+    start = time.perf_counter()
+
+    # spawn: every worker starts clean and loads its own model copy once
+    pool = multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(settings,))
+    try:
+        for record in pool.imap_unordered(process_document, pending):
+            if "error" in record:
+                stats["failed"] += 1
+            else:
+                stats["documents"] += 1
+                stats["words"] += record["words"]
+                stats["tokens"] += record["tokens"]
+            text = record.pop("text", None)
+            if db_user and "error" not in record:
+                _save_to_db(db_user, record, text)
+            if out_f:
+                out_f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out_f.flush()
+            # Failed documents stay out of the checkpoint so a resumed run retries them
+            if ckpt_f and "error" not in record:
+                ckpt_f.write(record["id"] + "\n")
+                ckpt_f.flush()
+
+            finished = stats["documents"] + stats["failed"]
+            if finished % LOG_EVERY == 0:
+                elapsed = time.perf_counter() - start
+                logging.info(f"{finished}/{len(pending)} documents, {finished / elapsed:.2f} docs/s, "
+                             f"{stats['tokens'] / elapsed:.0f} tokens/s")
+        pool.close()
+    except KeyboardInterrupt:
+        logging.warning("Interrupted; rerun with the same --checkpoint to resume")
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        for f in (out_f, ckpt_f):
+            if f:
+                f.close()
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = round(elapsed, 2)
+    stats["docs_per_s"] = round(stats["documents"] / elapsed, 3) if elapsed else 0.0
+    stats["tokens_per_s"] = round(stats["tokens"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize/paraphrase/score a directory or JSONL manifest.")
+    parser.add_argument("input", help="Directory of txt/pdf/docx files or a JSONL manifest")
+    parser.add_argument("--tasks", default="summary", help=f"Comma-separated subset of {','.join(TASKS)}")
+    parser.add_argument("--workers", type=_positive_int, default=1)
+    parser.add_argument("--output", help="Append result records to this JSONL file")
+    parser.add_argument("--db-user", help="Also save summaries/paraphrases to the database under this user")
+    parser.add_argument("--checkpoint", help="Finished document ids (default: OUTPUT.done, else INPUT.done)")
+    parser.add_argument("--summary-length", default="medium", choices=["short", "medium", "long", "fast"])
+    parser.add_argument("--complexity", default="medium", choices=["basic", "medium", "advanced"])
+    args = parser.parse_args()
+
+    tasks = [t.strip() for t in args.tasks.split(",") if t.strip()]
+    unknown = [t for t in tasks if t not in TASKS]
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(unknown)}")
+    if not args.output and not args.db_user:
+        parser.error("give --output and/or --db-user")
+    checkpoint = args.checkpoint or default_checkpoint(args.input, args.output)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    stats = run_batch(args.input, tasks, args.workers, args.output, args.db_user, checkpoint,
+                      args.summary_length, args.complexity)
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Decoding budgets.
+Generation limits are scaled to the input instead of fixed per setting: a
+short sentence gets fewer beams and a shorter max length than a long one,
+and a summary is never allowed to be longer than its input.
+
+A request may also carry a latency budget (``deadline_s``). Generation cost
+is estimated from row, beam and token counts times the measured seconds per
+decoder step (a moving average per task, updated after every generate call).
+When the estimate does not fit, beams, then the number of summary chunks,
+then max tokens are reduced, and every reduction is recorded in the plan's
+"degradations" list. Work still running when the deadline passes is cut
+short, and that is recorded too.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Seconds for one decoder step of one beam of one sequence, until measured
+DEFAULT_STEP_SECONDS = float(os.environ.get("TEXTMORPH_STEP_SECONDS", "0.004"))
+EWMA_ALPHA = 0.2
+
+# Share of the deadline planned for generate calls; the rest covers tokenization, ROUGE, ...
+PLAN_SHARE = 0.8
+
+# ---------- INPUT-LENGTH SCALING ----------
+SUMMARY_LENGTH_RATIO = 1.0      # summary tokens at most ~ input tokens
+PARAPHRASE_LENGTH_RATIO = 2.0   # paraphrase tokens at most 2x input tokens ...
+PARAPHRASE_LENGTH_SLACK = 8     # ... plus a few
+TOKENS_PER_BEAM = 6             # one beam per 6 input tokens, within the table's limit
+MIN_BEAMS = 2
+MIN_MAX_TOKENS = 16
+
+_lock = threading.Lock()
+_step_seconds: Dict[str, float] = {}
+
+def record(task: str, seconds: float, steps: int, beams: int, rows: int) -> None:
+    """Fold one generate call (``steps`` decoder steps over ``rows`` x ``beams`` sequences) into the cost estimate."""
+    work = steps * beams * rows
+    if work <= 0 or seconds <= 0:
+        return
+    sample = seconds / work
+    with _lock:
+        previous = _step_seconds.get(task)
+        _step_seconds[task] = sample if previous is None else previous + EWMA_ALPHA * (sample - previous)
+
+def step_seconds(task: str) -> float:
+    return _step_seconds.get(task, DEFAULT_STEP_SECONDS)
+
+def estimate_seconds(task: str, rows: float, beams: int, max_tokens: int) -> float:
+    """Upper-bound generation time: every sequence runs to ``max_tokens``."""
+    return step_seconds(task) * rows * beams * max_tokens
+
+def summary_lengths(input_tokens: int, min_len: int, max_len: int) -> Tuple[int, int]:
+    """
+    (min, max) summary tokens for an input of ``input_tokens`` tokens. Only
+    when max is cut for a short input is min lowered to fit under it.
+    """
+    scaled_max = min(max_len, max(MIN_MAX_TOKENS, int(input_tokens * SUMMARY_LENGTH_RATIO)))
+    if scaled_max < max_len:
+        return min(min_len, scaled_max // 2), scaled_max
+    return min_len, max_len
+
+def paraphrase_params(params: Dict[str, object], input_tokens: int) -> Dict[str, object]:
+    """Decoding params with max_length and num_beams scaled down for short inputs."""
+    scaled = dict(params)
+    scaled["max_length"] = min(params["max_length"], max(
+        MIN_MAX_TOKENS, int(input_tokens * PARAPHRASE_LENGTH_RATIO) + PARAPHRASE_LENGTH_SLACK))
+    scaled["num_beams"] = min(params["num_beams"], max(MIN_BEAMS, input_tokens // TOKENS_PER_BEAM))
+    return scaled
+
+# ---------- DEADLINES ----------
+def plan(task: str, deadline_s: float, rows: int, beams: int, max_tokens: int,
+         reducible_rows: bool = False, row_weight: float = 1.0,
+         started: Optional[float] = None) -> Dict[str, object]:
+    """
+    Fit ``rows`` sequences of ``beams`` beams and up to ``max_tokens`` tokens
+    into ``deadline_s`` counted from ``started`` (a perf_counter time,
+    default now). ``row_weight`` is the cost of a row relative to one
+    generate row (e.g. to include the reduce stage of a summary chunk); rows
+    are only dropped when ``reducible_rows``. Returns the (possibly reduced)
+    rows/beams/max_tokens, the estimate, the absolute deadline and the list
+    of degradations applied.
+    """
+    started = time.perf_counter() if started is None else started
+    available = deadline_s * PLAN_SHARE - (time.perf_counter() - started)
+    chosen = {"rows": rows, "beams": beams, "max_tokens": max_tokens}
+
+    def estimate() -> float:
+        return estimate_seconds(task, chosen["rows"] * row_weight, chosen["beams"], chosen["max_tokens"])
+
+    degradations = []
+    while estimate() > available and chosen["beams"] > 1:
+        chosen["beams"] = max(1, chosen["beams"] // 2)
+    if chosen["beams"] < beams:
+        degradations.append(f"beams {beams}→{chosen['beams']}")
+
+    if estimate() > available and reducible_rows and rows > 1:
+        per_row = estimate_seconds(task, row_weight, chosen["beams"], chosen["max_tokens"])
+        chosen["rows"] = max(1, min(rows, int(available / per_row)))
+        if chosen["rows"] < rows:
+            degradations.append(f"chunks {rows}→{chosen['rows']}")
+
+    if estimate() > available:
+        per_token = estimate_seconds(task, chosen["rows"] * row_weight, chosen["beams"], 1)
+        chosen["max_tokens"] = max(MIN_MAX_TOKENS, min(max_tokens, int(available / per_token)))
+        if chosen["max_tokens"] < max_tokens:
+            degradations.append(f"max tokens {max_tokens}→{chosen['max_tokens']}")
+
+    chosen.update(estimated_s=round(estimate(), 3), deadline_s=deadline_s,
+                  deadline_at=started + deadline_s, degradations=degradations)
+    return chosen
+
+def expired(budget_plan: Optional[Dict[str, object]]) -> bool:
+    """True once a plan's deadline has passed."""
+    return budget_plan is not None and time.perf_counter() > budget_plan["deadline_at"]
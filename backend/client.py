@@ -0,0 +1,31 @@
+"""
+Client for the local inference server (backend/server.py).
+Pages call these instead of importing the models when
+TEXTMORPH_INFERENCE_URL points at a running server.
+"""
+
+import os
+from typing import Dict, Tuple
+
+from backend.startup import lazy_import
+
+INFERENCE_URL = os.environ.get("TEXTMORPH_INFERENCE_URL", "")
+TIMEOUT_S = float(os.environ.get("TEXTMORPH_INFERENCE_TIMEOUT", "600"))
+
+def server_enabled() -> bool:
+    return bool(INFERENCE_URL)
+
+def _post(path: str, payload: dict) -> dict:
+    httpx = lazy_import("httpx")
+    response = httpx.post(INFERENCE_URL.rstrip("/") + path, json=payload, timeout=TIMEOUT_S)
+    response.raise_for_status()
+    return response.json()
+
+def summarize_text(text: str, summary_length: str = "medium") -> Tuple[str, Dict[str, float]]:
+    """Same contract as backend.summarization.summarize_text, served remotely."""
+    data = _post("/summarize", {"text": text, "summary_length": summary_length})
+    return data["summary"], data["rouge"]
+
+def generate_paraphrase(text: str, complexity: str = "medium") -> str:
+    """Same contract as backend.paraphrasing.generate_paraphrase, served remotely."""
+    return _post("/paraphrase", {"text": text, "complexity": complexity})["paraphrase"]
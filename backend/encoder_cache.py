@@ -0,0 +1,143 @@
+"""
+Encoder-output cache for seq2seq generation.
+Encoder hidden states are kept per input sequence, keyed by the model and
+a hash of the sequence's token ids, in an LRU bounded by bytes
+(TEXTMORPH_ENCODER_CACHE_MB, 0 turns it off). Generating again for the
+same chunk with other length or beam settings, or the same sentence at
+another complexity, then runs only the decoder.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from backend import metrics
+from backend.startup import lazy_import
+
+MAX_MB = float(os.environ.get("TEXTMORPH_ENCODER_CACHE_MB", "256"))
+
+class EncoderCache:
+    """Thread-safe LRU of tensors bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, object]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            tensor = self._data.get(key)
+            if tensor is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return tensor
+
+    def put(self, key: str, tensor) -> None:
+        size = tensor.numel() * tensor.element_size()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old.numel() * old.element_size()
+            self._data[key] = tensor
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= evicted.numel() * evicted.element_size()
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "size_mb": round(self._bytes / 2**20, 1),
+                "max_mb": round(self.max_bytes / 2**20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+_cache = EncoderCache(int(MAX_MB * 2**20))
+
+def enabled() -> bool:
+    return _cache.max_bytes > 0
+
+def set_max_mb(max_mb: float) -> None:
+    """Resize the cache; 0 turns it off and drops every entry."""
+    _cache.max_bytes = int(max_mb * 2**20)
+    if _cache.max_bytes <= 0:
+        _cache.clear()
+
+def cache_stats() -> Dict[str, float]:
+    return _cache.stats()
+
+def clear() -> None:
+    _cache.clear()
+
+def _row_key(model_key: str, ids: List[int]) -> str:
+    return hashlib.sha256(f"{model_key}:{ids}".encode("utf-8")).hexdigest()
+
+def encode(model, model_key: str, input_ids, attention_mask=None):
+    """
+    Encoder outputs for a padded batch, reusing cached rows and encoding the
+    rest in one sub-batch. ``model_key`` identifies the model weights (name,
+    profile, instance). Returns a BaseModelOutput to pass to generate as
+    ``encoder_outputs``. Call inside torch.inference_mode().
+    """
+    torch = lazy_import("torch")
+    outputs = lazy_import("transformers.modeling_outputs")
+    if attention_mask is None:
+        attention_mask = torch.ones_like(input_ids)
+    masks = attention_mask.bool()
+
+    keys = [_row_key(model_key, ids[mask].tolist()) for ids, mask in zip(input_ids, masks)]
+    rows: List[Optional[object]] = [_cache.get(key) for key in keys]
+    missing = [i for i, row in enumerate(rows) if row is None]
+    metrics.inc("encoder_cache_hits", len(rows) - len(missing))
+    metrics.inc("encoder_cache_misses", len(missing))
+
+    if len(missing) == len(rows):
+        # Nothing cached: encode the batch exactly as generate would have
+        with metrics.span("encode"):
+            states = model.get_encoder()(input_ids=input_ids, attention_mask=attention_mask,
+                                         return_dict=True).last_hidden_state
+        for i, key in enumerate(keys):
+            _cache.put(key, states[i][masks[i]].clone())
+        return outputs.BaseModelOutput(last_hidden_state=states)
+
+    if missing:
+        width = int(masks[missing].sum(dim=1).max())
+        sub_ids = input_ids.new_full((len(missing), width), model.config.pad_token_id or 0)
+        sub_mask = attention_mask.new_zeros((len(missing), width))
+        for j, i in enumerate(missing):
+            ids = input_ids[i][masks[i]]
+            sub_ids[j, :len(ids)] = ids
+            sub_mask[j, :len(ids)] = 1
+        with metrics.span("encode"):
+            encoded = model.get_encoder()(input_ids=sub_ids, attention_mask=sub_mask,
+                                          return_dict=True).last_hidden_state
+        for j, i in enumerate(missing):
+            rows[i] = encoded[j][sub_mask[j].bool()].clone()
+            _cache.put(keys[i], rows[i])
+
+    # Place each row's states at its unmasked positions; padded positions are never attended
+    states = rows[0].new_zeros((input_ids.shape[0], input_ids.shape[1], rows[0].shape[-1]))
+    for i, row in enumerate(rows):
+        states[i][masks[i]] = row
+    return outputs.BaseModelOutput(last_hidden_state=states)
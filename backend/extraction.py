@@ -0,0 +1,200 @@
+"""
+Text extraction for uploaded txt, pdf and docx files.
+Extracted text is cached under the SHA-256 of the file bytes in a bounded
+in-memory LRU (TEXTMORPH_EXTRACT_CACHE_MB), so Streamlit reruns and switching
+tasks never parse the same upload twice. Uploaded text is never written to
+disk by this cache; the user-scoped blob store keeps the upload itself. Large PDFs are split into page ranges that a process pool
+extracts in parallel; pages are streamed back in order.
+"""
+
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend import metrics
+from backend.startup import lazy_import
+
+# ---------- EXTRACTION LIMITS ----------
+MAX_FILE_MB = float(os.environ.get("TEXTMORPH_EXTRACT_MAX_MB", "50"))
+MAX_PAGES = int(os.environ.get("TEXTMORPH_EXTRACT_MAX_PAGES", "1000"))
+WORKERS = int(os.environ.get("TEXTMORPH_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = 20
+PARALLEL_MIN_PAGES = 40   # smaller PDFs are not worth the pool round trips
+CACHE_MB = float(os.environ.get("TEXTMORPH_EXTRACT_CACHE_MB", "64"))
+
+MIME_KINDS = {
+    "text/plain": "txt",
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "application/msword": "docx",
+}
+
+class ExtractionError(ValueError):
+    """The upload is unsupported or exceeds the configured limits."""
+
+class TextCache:
+    """Thread-safe LRU of extracted texts bounded by their total size in characters."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._data.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key: str, text: str) -> None:
+        if len(text) > self.max_chars:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._chars -= len(old)
+            self._data[key] = text
+            self._chars += len(text)
+            while self._chars > self.max_chars:
+                _, evicted = self._data.popitem(last=False)
+                self._chars -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._chars = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {"entries": len(self._data), "size_mb": round(self._chars / 2**20, 1),
+                    "max_mb": round(self.max_chars / 2**20, 1), "hits": self.hits, "misses": self.misses}
+
+_cache = TextCache(int(CACHE_MB * 2**20))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def file_kind(file_name: str, mime_type: Optional[str] = None) -> str:
+    """'txt', 'pdf' or 'docx' from the MIME type, falling back to the extension."""
+    kind = MIME_KINDS.get(mime_type or "")
+    if kind:
+        return kind
+    ext = os.path.splitext(file_name or "")[1].lower().lstrip(".")
+    if ext in ("txt", "pdf", "docx"):
+        return ext
+    raise ExtractionError(f"Unsupported file type: {mime_type or ext or file_name!r}")
+
+# ---------- PDF ----------
+_worker_reader: Tuple[Optional[str], object] = (None, None)
+
+def _extract_pdf_range(path: str, start: int, stop: int) -> List[str]:
+    """Pool task: text of pages [start, stop). The parsed reader is reused across tasks."""
+    global _worker_reader
+    if _worker_reader[0] != path:
+        _worker_reader = (path, lazy_import("PyPDF2").PdfReader(path))
+    reader = _worker_reader[1]
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the host process (Streamlit, warm-up thread) is multi-threaded
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def iter_pdf_pages(data: bytes, max_pages: int = MAX_PAGES) -> Iterator[str]:
+    """Yield the text of each page in order, fanning page ranges out to worker processes."""
+    reader = lazy_import("PyPDF2").PdfReader(io.BytesIO(data))
+    total = len(reader.pages)
+    if total > max_pages:
+        raise ExtractionError(f"PDF has {total} pages; the limit is {max_pages}")
+
+    if WORKERS <= 1 or total < PARALLEL_MIN_PAGES:
+        for page in reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    # Workers read the PDF from a temporary file instead of receiving the bytes with every task
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(data)
+    ranges = [(s, min(s + PAGES_PER_TASK, total)) for s in range(0, total, PAGES_PER_TASK)]
+    pool = _get_pool()
+    futures = [pool.submit(_extract_pdf_range, tmp.name, s, e) for s, e in ranges]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        os.unlink(tmp.name)
+
+# ---------- DOCX / TXT ----------
+def iter_docx_paragraphs(data: bytes) -> Iterator[str]:
+    document = lazy_import("docx").Document(io.BytesIO(data))
+    for para in document.paragraphs:
+        yield para.text
+
+def iter_text(data: bytes, kind: str) -> Iterator[str]:
+    """Stream the extracted text of a file as pages/paragraphs."""
+    if kind == "pdf":
+        yield from iter_pdf_pages(data)
+    elif kind == "docx":
+        yield from iter_docx_paragraphs(data)
+    else:
+        yield data.decode("utf-8", errors="ignore")
+
+def extract_text(data: bytes, file_name: str = "", mime_type: Optional[str] = None,
+                 use_cache: bool = True) -> str:
+    """
+    Extracted text of an uploaded file, cached by content hash.
+    Raises ExtractionError for unsupported types and files over the size/page limits.
+    """
+    if len(data) > MAX_FILE_MB * 2**20:
+        raise ExtractionError(f"File is {len(data) / 2**20:.1f} MB; the limit is {MAX_FILE_MB:g} MB")
+    kind = file_kind(file_name, mime_type)
+
+    key = content_hash(data)
+    if use_cache:
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+
+    separator = "\n" if kind == "docx" else ""
+    with metrics.span("extract", kind=kind):
+        text = separator.join(iter_text(data, kind))
+    metrics.inc("extracted_bytes", len(data), kind=kind)
+    if use_cache:
+        _cache.put(key, text)
+    logging.info(f"Extracted {len(text)} characters from {file_name or kind}")
+    return text
+
+def cache_stats() -> Dict[str, float]:
+    return _cache.stats()
+
+def clear_cache() -> None:
+    _cache.clear()
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,166 @@
+"""
+Extractive pre-selection for long inputs.
+Sentences are scored by TF-IDF similarity to the document centroid and by
+TextRank centrality over a sparse sentence-similarity graph, and the best
+ones are kept up to a token budget, in their original order. Summarizing the
+selection instead of the whole text bounds the number of tokens that reach
+the abstractive model. The TF-IDF matrix and the graph are scipy.sparse
+matrices and the graph is built in row blocks, so memory grows linearly with
+the sentence count even for book-length inputs.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from backend.startup import lazy_import
+from backend.text_chunking import split_into_sentences
+
+# Vocabulary kept for the TF-IDF matrix (most widespread terms first)
+MAX_FEATURES = 4096
+
+# Similarity graph: each sentence links to its NEIGHBORS most similar sentences
+# no more than WINDOW positions away. Documents of up to NEIGHBORS + 1
+# sentences get the complete graph.
+NEIGHBORS = 64
+WINDOW = 1000
+BLOCK_CELLS = 2**20   # similarity cells computed at once
+
+# TextRank power iteration
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-5
+
+# Weight of TextRank centrality versus centroid similarity in the final score
+CENTRALITY_WEIGHT = 0.5
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+def _terms(sentence: str) -> List[str]:
+    return [w for w in _WORD_RE.findall(sentence.lower()) if len(w) > 2]
+
+def tfidf_matrix(sentences: List[str]):
+    """
+    Row-normalized TF-IDF matrix (sentences x terms, float32 CSR) with
+    sublinear term frequency. Terms that occur in only one sentence carry no
+    similarity and are dropped when there is more than one sentence.
+    """
+    np = lazy_import("numpy")
+    sparse = lazy_import("scipy.sparse")
+    terms = [_terms(s) for s in sentences]
+    df = Counter(t for ts in terms for t in set(ts))
+    min_df = 2 if len(sentences) > 1 else 1
+    vocab_terms = [t for t, n in df.most_common(MAX_FEATURES) if n >= min_df]
+    vocab = {t: i for i, t in enumerate(vocab_terms)}
+
+    rows, cols = [], []
+    for row, ts in enumerate(terms):
+        for t in ts:
+            col = vocab.get(t)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+    # Repeated (row, col) pairs are summed into term counts
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                               shape=(len(sentences), max(1, len(vocab))), dtype=np.float32)
+    matrix.sum_duplicates()
+
+    idf = np.asarray([math.log((1 + len(sentences)) / (1 + df[t])) + 1 for t in vocab_terms] or [1.0],
+                     dtype=np.float32)
+    matrix.data = np.log1p(matrix.data) * idf[matrix.indices]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1), dtype=np.float32).ravel())
+    return (sparse.diags(1 / np.maximum(norms, 1e-12)) @ matrix).astype(np.float32).tocsr()
+
+def similarity_graph(matrix):
+    """
+    Sparse cosine-similarity graph over the rows of a normalized TF-IDF matrix,
+    without self-loops or zero edges, keeping for each sentence its NEIGHBORS
+    strongest links within WINDOW positions.
+    """
+    np = lazy_import("numpy")
+    sparse = lazy_import("scipy.sparse")
+    n = matrix.shape[0]
+    block = max(1, BLOCK_CELLS // min(n, 2 * WINDOW + 1))
+    rows, cols, values = [], [], []
+    for start in range(0, n, block):
+        stop = min(n, start + block)
+        lo, hi = max(0, start - WINDOW), min(n, stop + WINDOW)
+        sims = (matrix[start:stop] @ matrix[lo:hi].T).toarray()
+        offsets = np.arange(lo, hi)[None, :] - np.arange(start, stop)[:, None]
+        sims[(offsets == 0) | (np.abs(offsets) > WINDOW)] = 0.0
+
+        k = min(NEIGHBORS, hi - lo)
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        weights = np.take_along_axis(sims, top, axis=1)
+        keep = weights > 0
+        rows.append(np.broadcast_to(np.arange(start, stop)[:, None], top.shape)[keep])
+        cols.append(top[keep] + lo)
+        values.append(weights[keep])
+    return sparse.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                             shape=(n, n), dtype=np.float32)
+
+def textrank(graph):
+    """Stationary scores of the damped random walk over a sparse similarity graph (power iteration)."""
+    np = lazy_import("numpy")
+    sparse = lazy_import("scipy.sparse")
+    n = graph.shape[0]
+    out_degree = np.asarray(graph.sum(axis=1), dtype=np.float32).ravel()
+    # Isolated sentences jump uniformly instead of trapping the walk
+    isolated = out_degree <= 0
+    inverse = np.where(isolated, 0.0, 1 / np.maximum(out_degree, 1e-12)).astype(np.float32)
+    incoming = (sparse.diags(inverse) @ graph).T.tocsr()
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(MAX_ITERATIONS):
+        jump = scores[isolated].sum() / n
+        updated = ((1 - DAMPING) / n + DAMPING * (incoming @ scores + jump)).astype(np.float32)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+def sentence_scores(sentences: List[str]) -> List[float]:
+    """Salience per sentence: blend of TextRank centrality and TF-IDF centroid similarity, each scaled to [0, 1]."""
+    np = lazy_import("numpy")
+    if len(sentences) < 2:
+        return [1.0] * len(sentences)
+    matrix = tfidf_matrix(sentences)
+    centrality = textrank(similarity_graph(matrix))
+    centroid = np.asarray(matrix.mean(axis=0)).ravel()
+    relevance = matrix @ (centroid / max(float(np.linalg.norm(centroid)), 1e-12))
+
+    def scaled(values):
+        top = float(values.max())
+        return values / top if top > 0 else values
+
+    combined = CENTRALITY_WEIGHT * scaled(centrality) + (1 - CENTRALITY_WEIGHT) * scaled(relevance)
+    return combined.tolist()
+
+def select_sentences(text: str, tokenizer, budget_tokens: int, stats: Optional[Dict[str, int]] = None) -> str:
+    """
+    The most salient sentences of ``text`` that fit in ``budget_tokens``
+    tokenizer tokens, joined in document order. Text already within the
+    budget is returned unchanged. Counts go to ``stats`` when given.
+    """
+    stats = stats if stats is not None else {}
+    sentences = split_into_sentences(text)
+    if not sentences:
+        return text
+    lengths = [len(ids) for ids in tokenizer(sentences, add_special_tokens=False)["input_ids"]]
+    total = sum(lengths)
+    stats.update(sentences=len(sentences), tokens=total, selected_sentences=len(sentences), selected_tokens=total)
+    if total <= budget_tokens:
+        return text
+
+    scores = sentence_scores(sentences)
+    chosen: List[int] = []
+    used = 0
+    for i in sorted(range(len(sentences)), key=lambda i: (-scores[i], i)):
+        # Skip sentences that no longer fit; a shorter one further down may
+        if used + lengths[i] <= budget_tokens:
+            chosen.append(i)
+            used += lengths[i]
+    chosen.sort()
+    stats.update(selected_sentences=len(chosen), selected_tokens=used)
+    return " ".join(sentences[i] for i in chosen)
@@ -1,17 +1,18 @@
-import sqlite3
+"""
+Schema changes now live in the versioned migrations of database/user_db.py
+(this script's users.uploaded_file column is migration 2). Running it simply
+applies any pending migrations.
+"""
+
 import os
+import sys
 
-# ---------- DATABASE PATH ----------
-DB_NAME = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database", "user.db")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-def add_uploaded_file_column():
-    try:
-        with sqlite3.connect(DB_NAME) as conn:
-            c = conn.cursor()
-            c.execute("ALTER TABLE users ADD COLUMN uploaded_file BLOB")
-            print("Column 'uploaded_file' added successfully!")
-    except sqlite3.OperationalError:
-        print("Column already exists, no changes made.")
+from database.user_db import run_migrations, schema_version, get_db
 
 if __name__ == "__main__":
-    add_uploaded_file_column()
+    applied = run_migrations()
+    conn = get_db()
+    print(f"Applied migrations: {applied or 'none'}; schema version {schema_version(conn)}")
+    conn.close()
@@ -0,0 +1,114 @@
+"""
+Pluggable generation backends.
+The summarization and paraphrasing modules ask the active backend for a
+tokenizer and for batched generation; the backend decides how the model is
+executed. "torch" (default) runs AutoModelForSeq2SeqLM.generate from the
+shared model registry, "onnx" runs an exported encoder/decoder pair on
+ONNX Runtime. The backend is selected per deployment with
+TEXTMORPH_INFERENCE_BACKEND.
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional
+
+from backend import encoder_cache
+from backend.model_manager import DEFAULT_MODEL, active_profile, get_model
+from backend.startup import lazy_import
+
+BACKEND_NAME = os.environ.get("TEXTMORPH_INFERENCE_BACKEND", "torch")
+
+class InferenceBackend:
+    """Interface every generation backend implements."""
+
+    name = "base"
+
+    def tokenizer(self, model_name: str = DEFAULT_MODEL):
+        raise NotImplementedError
+
+    def generate(self, model_name: str, batch: Dict[str, object], **params) -> List[List[int]]:
+        """Generate token id sequences for a padded batch of encoder inputs."""
+        raise NotImplementedError
+
+class TorchBackend(InferenceBackend):
+    """
+    Eager PyTorch generation through the shared model registry.
+    Encoder outputs of seq2seq models come from the encoder cache, so a
+    repeat decode of the same input runs only the decoder.
+    """
+
+    name = "torch"
+
+    def tokenizer(self, model_name: str = DEFAULT_MODEL):
+        return get_model(model_name)[0]
+
+    def generate(self, model_name: str, batch: Dict[str, object], **params) -> List[List[int]]:
+        torch = lazy_import("torch")
+        _, model, device = get_model(model_name)
+        batch = {k: v.to(device) for k, v in batch.items()}
+        with torch.inference_mode():
+            if encoder_cache.enabled() and model.config.is_encoder_decoder:
+                # The instance id keeps states of a reloaded or re-registered model apart
+                model_key = f"{model_name}:{active_profile()}:{id(model)}"
+                batch["encoder_outputs"] = encoder_cache.encode(model, model_key, batch["input_ids"],
+                                                                batch.get("attention_mask"))
+            return model.generate(**batch, **params).tolist()
+
+_backends: Dict[str, InferenceBackend] = {}
+
+def _create(name: str) -> InferenceBackend:
+    if name == "torch":
+        return TorchBackend()
+    if name == "onnx":
+        try:
+            from backend.onnx_backend import OnnxBackend
+            return OnnxBackend()
+        except (ImportError, RuntimeError) as e:
+            logging.warning(f"ONNX backend unavailable, using torch: {e}")
+            return _backends.setdefault("torch", TorchBackend())
+    raise ValueError(f"Unknown inference backend {name!r}; expected 'torch' or 'onnx'")
+
+def get_backend(name: Optional[str] = None) -> InferenceBackend:
+    """Return the named backend, or the deployment default."""
+    name = name or BACKEND_NAME
+    if name not in _backends:
+        _backends[name] = _create(name)
+    return _backends[name]
+
+def set_backend(name: str) -> None:
+    """Switch the deployment default backend."""
+    global BACKEND_NAME
+    get_backend(name)
+    BACKEND_NAME = name
+
+def check_parity(texts: List[str], model_name: str = DEFAULT_MODEL, candidate: str = "onnx",
+                 **params) -> Dict[str, object]:
+    """
+    Run the same inputs through torch and ``candidate`` and compare outputs.
+    Returns the exact-match rate over generated token sequences and the
+    decoded texts of any mismatches.
+    """
+    reference, other = get_backend("torch"), get_backend(candidate)
+    tokenizer = reference.tokenizer(model_name)
+    encoded = tokenizer(texts, truncation=True, padding="longest", return_tensors="pt")
+    batch = {"input_ids": encoded["input_ids"], "attention_mask": encoded["attention_mask"]}
+
+    expected = reference.generate(model_name, batch, **params)
+    actual = other.generate(model_name, batch, **params)
+
+    strip = {tokenizer.pad_token_id}
+    mismatches = []
+    for text, exp, act in zip(texts, expected, actual):
+        exp = [t for t in exp if t not in strip]
+        act = [t for t in act if t not in strip]
+        if exp != act:
+            mismatches.append({
+                "input": text[:80],
+                "torch": tokenizer.decode(exp, skip_special_tokens=True),
+                candidate: tokenizer.decode(act, skip_special_tokens=True),
+            })
+    return {
+        "backend": other.name,
+        "match_rate": 1 - len(mismatches) / len(texts) if texts else 1.0,
+        "mismatches": mismatches,
+    }
@@ -0,0 +1,132 @@
+"""
+Background job workers for summarization and paraphrasing.
+The Dashboard queues jobs in the `jobs` table; worker processes started here
+claim them one at a time, run the model, store the result on the job and
+save it through save_processed_text. Each worker process loads the model
+once and keeps it for every job it runs.
+
+Usage:
+    python -m backend.jobs [--workers 2] [--poll 1.0]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from typing import Dict
+
+from backend import metrics
+from database.user_db import (claim_next_job, finish_job, requeue_running_jobs, running_job_workers,
+                              save_processed_text)
+
+POLL_INTERVAL_S = 1.0
+
+def run_job(job: Dict[str, object]) -> Dict[str, object]:
+    """
+    Execute one claimed job and return its JSON-serializable result. A
+    ``deadline_s`` param is counted from when the worker starts the job; what
+    was reduced to meet it is returned as "degradations".
+    """
+    params = job["params"]
+    text = job["input_text"]
+    stats: Dict[str, object] = {}
+    if job["task_type"] == "summary":
+        from backend.summarization import summarize_text
+        summary, rouge_scores = summarize_text(text, summary_length=params.get("summary_length", "medium"),
+                                               deadline_s=params.get("deadline_s"), stats=stats)
+        return {"text": summary, "rouge": rouge_scores, "degradations": stats.get("degradations", [])}
+    if job["task_type"] == "paraphrase":
+        from backend.paraphrasing import generate_paraphrase
+        paraphrase = generate_paraphrase(text, complexity=params.get("complexity", "medium"),
+                                         deadline_s=params.get("deadline_s"), stats=stats)
+        return {"text": paraphrase, "degradations": stats.get("degradations", [])}
+    raise ValueError(f"Unknown task type {job['task_type']!r}")
+
+def worker_loop(worker: str, poll: float = POLL_INTERVAL_S, max_jobs: int = 0) -> None:
+    """Claim and run jobs until stopped (or until ``max_jobs`` have run)."""
+    done = 0
+    while not max_jobs or done < max_jobs:
+        job = claim_next_job(worker)
+        if job is None:
+            time.sleep(poll)
+            continue
+
+        logging.info(f"[{worker}] running job {job['id']} ({job['task_type']})")
+        try:
+            result = run_job(job)
+            with metrics.span("db_write", table="processed_text"):
+                save_processed_text(job["username"], job["task_type"], job["input_text"], result["text"], "pegasus")
+            finish_job(job["id"], result=result)
+        except Exception as e:
+            logging.exception(f"[{worker}] job {job['id']} failed")
+            finish_job(job["id"], error=str(e) or type(e).__name__)
+        done += 1
+
+def _worker_id(index: int) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True   # exists, owned by another user
+    return True
+
+def requeue_orphaned_jobs() -> int:
+    """
+    Requeue running jobs whose worker process on this host no longer exists.
+    Jobs of live workers, and of workers on other hosts, are left alone, so
+    starting a second pool never takes over jobs that are still running.
+    """
+    requeued = 0
+    for worker in running_job_workers(f"{socket.gethostname()}:"):
+        pid = worker.rsplit(":", 2)[-2]
+        if not pid.isdigit() or not _pid_alive(int(pid)):
+            requeued += requeue_running_jobs(worker)
+    return requeued
+
+def _worker_main(index: int, poll: float) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    worker = _worker_id(index)
+    try:
+        worker_loop(worker, poll)
+    except KeyboardInterrupt:
+        requeue_running_jobs(worker)
+
+def start_workers(count: int, poll: float = POLL_INTERVAL_S):
+    """Start ``count`` worker processes and return them."""
+    # Spawned, not forked: children must not inherit the parent's SQLite connections
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(count):
+        p = context.Process(target=_worker_main, args=(i, poll), name=f"textmorph-worker-{i}", daemon=True)
+        p.start()
+        processes.append(p)
+    return processes
+
+def main():
+    parser = argparse.ArgumentParser(description="Run summarization/paraphrasing job workers.")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL_S, help="Seconds between queue polls")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # Jobs left running by crashed workers on this host go back in the queue
+    requeued = requeue_orphaned_jobs()
+    if requeued:
+        logging.info(f"Requeued {requeued} interrupted jobs")
+
+    processes = start_workers(args.workers, args.poll)
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        for p in processes:
+            p.join(timeout=5)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Lightweight per-stage instrumentation.
+Stages (extraction, tokenization, generate, decode, ROUGE, readability,
+database writes, ...) are timed with ``span`` and land in a Prometheus
+histogram; ``inc`` and ``observe`` record counters (tokens, requests) and
+value summaries (tokens per second, beams, chunk counts).
+
+Metrics are off unless TEXTMORPH_METRICS=1; disabled calls return right away
+(``span`` hands back a shared no-op context manager). The registry is per
+process and can be rendered in Prometheus text format for the server's
+/metrics endpoint, the admin page, or a file (TEXTMORPH_METRICS_FILE,
+"{pid}" is replaced by the process id).
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+ENABLED = os.environ.get("TEXTMORPH_METRICS", "0") == "1"
+METRICS_FILE = os.environ.get("TEXTMORPH_METRICS_FILE", "")
+FILE_INTERVAL_S = 15.0
+PREFIX = "textmorph_"
+
+# Histogram buckets for stage durations, in seconds
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class _Series:
+    """Count, sum and max of observed values, plus cumulative buckets for histograms."""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self, bucketed: bool):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(STAGE_BUCKETS) if bucketed else None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if self.buckets is not None:
+            for i, bound in enumerate(STAGE_BUCKETS):
+                if value <= bound:
+                    self.buckets[i] += 1
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+_series: Dict[Tuple[str, Labels], _Series] = {}
+_NOOP = nullcontext()
+_exporter: Optional[threading.Thread] = None
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def set_enabled(enabled: bool) -> None:
+    global ENABLED
+    ENABLED = enabled
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """Add ``value`` to counter ``name``."""
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name: str, value: float, **labels) -> None:
+    """Record one value of ``name`` (count/sum/max)."""
+    if not ENABLED:
+        return
+    _observe(name, value, False, labels)
+
+def _observe(name: str, value: float, bucketed: bool, labels: Dict[str, object]) -> None:
+    key = (name, _labels(labels))
+    with _lock:
+        series = _series.get(key)
+        if series is None:
+            series = _series[key] = _Series(bucketed)
+        series.add(value)
+    _ensure_exporter()
+
+class _Span:
+    __slots__ = ("labels", "start")
+
+    def __init__(self, labels: Dict[str, object]):
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.labels["error"] = exc_type.__name__
+        _observe("stage_seconds", time.perf_counter() - self.start, True, self.labels)
+        return False
+
+def span(stage: str, **labels):
+    """Context manager timing one stage into the stage_seconds histogram."""
+    if not ENABLED:
+        return _NOOP
+    labels["stage"] = stage
+    return _Span(labels)
+
+def record_generation(task: str, seconds: float, input_tokens: int, output_tokens: int,
+                      beams: int, batch_size: int) -> None:
+    """Record one generate call: duration, token counts, tokens/s, beams and batch size."""
+    if not ENABLED:
+        return
+    _observe("stage_seconds", seconds, True, {"stage": "generate", "task": task})
+    inc("tokens", input_tokens, direction="input", task=task)
+    inc("tokens", output_tokens, direction="output", task=task)
+    inc("generate_calls", task=task)
+    if seconds > 0:
+        observe("generate_output_tokens_per_second", output_tokens / seconds, task=task)
+    observe("generate_beams", beams, task=task)
+    observe("generate_batch_size", batch_size, task=task)
+
+# ---------- EXPORT ----------
+def snapshot() -> Dict[str, List[dict]]:
+    """Plain-dict copy of every counter and series, for the admin page."""
+    with _lock:
+        counters = [{"name": n, **dict(l), "value": v} for (n, l), v in sorted(_counters.items())]
+        series = [{"name": n, **dict(l), "count": s.count, "sum": s.total, "max": s.max,
+                   "mean": s.total / s.count if s.count else 0.0}
+                  for (n, l), s in sorted(_series.items())]
+    return {"counters": counters, "series": series}
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    with _lock:
+        counters = sorted(_counters.items())
+        series = sorted((k, (s.count, s.total, s.max, list(s.buckets) if s.buckets else None))
+                        for k, s in _series.items())
+
+    typed = set()
+    for (name, labels), value in counters:
+        metric = f"{PREFIX}{name}_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+
+    maxima: Dict[str, List[str]] = {}
+    for (name, labels), (count, total, maximum, buckets) in series:
+        metric = f"{PREFIX}{name}"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} {'histogram' if buckets else 'summary'}")
+            typed.add(metric)
+        if buckets:
+            for bound, hits in zip(STAGE_BUCKETS, buckets):
+                lines.append(f"{metric}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {hits}")
+            lines.append(f"{metric}_bucket{_format_labels(labels, (('le', '+Inf'),))} {count}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {total:.6g}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+        maxima.setdefault(f"{metric}_max", []).append(f"{metric}_max{_format_labels(labels)} {maximum:.6g}")
+
+    # Maxima are their own gauge families; a histogram or summary has no _max sample
+    for metric, samples in maxima.items():
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+def write_file(path: Optional[str] = None) -> None:
+    """Atomically write the Prometheus text to ``path`` (default TEXTMORPH_METRICS_FILE)."""
+    path = (path or METRICS_FILE).format(pid=os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+def _export_loop() -> None:
+    while True:
+        time.sleep(FILE_INTERVAL_S)
+        try:
+            write_file()
+        except OSError as e:
+            logging.warning(f"Writing metrics file failed: {e}")
+
+def _ensure_exporter() -> None:
+    global _exporter
+    if not METRICS_FILE or _exporter is not None:
+        return
+    with _lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=_export_loop, name="metrics-file", daemon=True)
+            _exporter.start()
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _series.clear()
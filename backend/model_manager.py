@@ -0,0 +1,241 @@
+"""
+Shared model registry for the Pegasus-based modules.
+Each model is loaded once per process and handed to both summarization and
+paraphrasing. A configurable memory budget evicts the least recently used
+model, and models idle for longer than the idle timeout are unloaded.
+
+Models are prepared with an inference profile: "fp32" (full precision),
+"int8" (dynamic quantization of Linear layers, CPU only) or "bf16" (where
+the hardware supports it).
+
+torch and transformers are imported on first model use, not at import time.
+"""
+
+import gc
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from backend.startup import lazy_import, timed
+
+# ---------- REGISTRY SETTINGS ----------
+DEFAULT_MODEL = "google/pegasus-xsum"
+MEMORY_BUDGET_MB = float(os.environ.get("TEXTMORPH_MODEL_MEMORY_MB", "0"))   # 0 = unlimited
+IDLE_TIMEOUT_S = float(os.environ.get("TEXTMORPH_MODEL_IDLE_SECONDS", "0"))  # 0 = never evict
+
+# ---------- INFERENCE PROFILE ----------
+PROFILES = ("fp32", "int8", "bf16")
+_profile = os.environ.get("TEXTMORPH_INFERENCE_PROFILE", "fp32")
+INTRA_OP_THREADS = int(os.environ.get("TEXTMORPH_TORCH_THREADS", "0"))          # 0 = torch default
+INTER_OP_THREADS = int(os.environ.get("TEXTMORPH_TORCH_INTEROP_THREADS", "0"))  # 0 = torch default
+_threads_configured = False
+
+class LoadedModel:
+    """A tokenizer/model pair with its device and bookkeeping."""
+
+    def __init__(self, name: str, tokenizer, model, device, profile: str = "fp32"):
+        self.name = name
+        self.profile = profile
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        self.size_bytes = model_size_bytes(model)
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+_registry: Dict[str, LoadedModel] = {}
+_lock = threading.RLock()
+_reaper: Optional[threading.Thread] = None
+
+def model_size_bytes(model) -> int:
+    """
+    Bytes held by a model's tensors: parameters, buffers and state_dict
+    entries, so the packed weights of dynamically quantized Linear layers
+    (not parameters) count too. Tensors sharing storage count once.
+    """
+    seen = set()
+    total = 0
+
+    def add(value):
+        nonlocal total
+        if isinstance(value, (tuple, list)):
+            for item in value:
+                add(item)
+            return
+        if not hasattr(value, "element_size") or value.numel() == 0:
+            return
+        try:
+            key = value.data_ptr()
+        except RuntimeError:   # tensors without plain storage
+            key = id(value)
+        if key in seen:
+            return
+        seen.add(key)
+        total += value.numel() * value.element_size()
+
+    for value in list(model.parameters()) + list(model.buffers()) + list(model.state_dict().values()):
+        add(value)
+    return total
+
+def default_device():
+    torch = lazy_import("torch")
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+def active_profile() -> str:
+    return _profile
+
+def set_inference_profile(profile: str) -> None:
+    """Select the profile used by subsequent get_model calls."""
+    global _profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown inference profile {profile!r}; expected one of {PROFILES}")
+    _profile = profile
+
+def configure_threads(intra_op: int = INTRA_OP_THREADS, inter_op: int = INTER_OP_THREADS) -> None:
+    """Apply torch intra-op/inter-op thread counts (0 keeps torch's default)."""
+    global _threads_configured
+    torch = lazy_import("torch")
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0 and not _threads_configured:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # Only settable before the first parallel region runs
+            logging.warning(f"Could not set inter-op threads: {e}")
+    _threads_configured = True
+
+def bf16_supported(device) -> bool:
+    torch = lazy_import("torch")
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+def apply_profile(model, device, profile: str):
+    """Return the model converted for the given inference profile."""
+    torch = lazy_import("torch")
+    if profile == "int8":
+        if device.type != "cpu":
+            logging.warning("int8 dynamic quantization is CPU only; using fp32")
+            return model
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if profile == "bf16":
+        if not bf16_supported(device):
+            logging.warning("bf16 is not supported on this device; using fp32")
+            return model
+        return model.to(torch.bfloat16)
+    return model
+
+def _key(model_name: str, profile: str) -> str:
+    return f"{model_name}:{profile}"
+
+def _load(model_name: str, profile: str) -> LoadedModel:
+    configure_threads()
+    transformers = lazy_import("transformers")
+    with timed(f"from_pretrained {model_name}"):
+        tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+        model = transformers.AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    device = default_device()
+    model.to(device)
+    model.eval()
+    model = apply_profile(model, device, profile)
+    return LoadedModel(model_name, tokenizer, model, device, profile)
+
+def _unload(key: str) -> None:
+    entry = _registry.pop(key, None)
+    if entry is None:
+        return
+    logging.info(f"Unloading model {key} ({entry.size_bytes / 2**20:.0f} MB)")
+    del entry
+    gc.collect()
+    torch = lazy_import("torch")
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+def evict_idle(now: Optional[float] = None) -> List[str]:
+    """Unload models unused for longer than the idle timeout."""
+    if IDLE_TIMEOUT_S <= 0:
+        return []
+    now = now or time.time()
+    with _lock:
+        idle = [key for key, e in _registry.items() if now - e.last_used > IDLE_TIMEOUT_S]
+        for key in idle:
+            _unload(key)
+    return idle
+
+def _reap_forever() -> None:
+    while True:
+        time.sleep(max(IDLE_TIMEOUT_S / 2, 1.0))
+        evict_idle()
+
+def _start_reaper() -> None:
+    """Start the idle-eviction thread once, so quiet processes release memory too."""
+    global _reaper
+    if IDLE_TIMEOUT_S > 0 and _reaper is None:
+        _reaper = threading.Thread(target=_reap_forever, name="model-reaper", daemon=True)
+        _reaper.start()
+
+def _enforce_budget(keep: str) -> None:
+    """Evict least recently used models until the registry fits the memory budget."""
+    if MEMORY_BUDGET_MB <= 0:
+        return
+    budget = MEMORY_BUDGET_MB * 2**20
+    while sum(e.size_bytes for e in _registry.values()) > budget:
+        candidates = [(e.last_used, key) for key, e in _registry.items() if key != keep]
+        if not candidates:
+            logging.warning(f"Model {keep} alone exceeds the {MEMORY_BUDGET_MB:.0f} MB budget")
+            return
+        _unload(min(candidates)[1])
+
+def get_model(model_name: str = DEFAULT_MODEL, profile: Optional[str] = None) -> Tuple[object, object, object]:
+    """Return (tokenizer, model, device), loading the model on first use."""
+    profile = profile or _profile
+    key = _key(model_name, profile)
+    evict_idle()
+    with _lock:
+        entry = _registry.get(key)
+        if entry is None:
+            entry = _load(model_name, profile)
+            _registry[key] = entry
+            _enforce_budget(keep=key)
+            _start_reaper()
+        entry.last_used = time.time()
+        return entry.tokenizer, entry.model, entry.device
+
+def register_model(model_name: str, tokenizer, model, device=None, profile: Optional[str] = None) -> None:
+    """Add an already constructed model to the registry (e.g. a locally built one)."""
+    profile = profile or _profile
+    device = device or default_device()
+    model.to(device)
+    model.eval()
+    model = apply_profile(model, device, profile)
+    key = _key(model_name, profile)
+    with _lock:
+        _registry[key] = LoadedModel(model_name, tokenizer, model, device, profile)
+        _enforce_budget(keep=key)
+
+def unload_model(model_name: str, profile: Optional[str] = None) -> None:
+    with _lock:
+        _unload(_key(model_name, profile or _profile))
+
+def loaded_models() -> List[Dict[str, object]]:
+    """Report what is loaded, where, and how much memory it holds."""
+    now = time.time()
+    with _lock:
+        return [{
+            "name": e.name,
+            "profile": e.profile,
+            "device": str(e.device),
+            "size_mb": round(e.size_bytes / 2**20, 1),
+            "loaded_s_ago": round(now - e.loaded_at, 1),
+            "idle_s": round(now - e.last_used, 1),
+        } for e in _registry.values()]
+
+def total_memory_mb() -> float:
+    with _lock:
+        return round(sum(e.size_bytes for e in _registry.values()) / 2**20, 1)
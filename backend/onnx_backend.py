@@ -0,0 +1,388 @@
+"""
+ONNX Runtime generation backend.
+Exports the Pegasus encoder and decoder from locally cached weights into
+three graphs (encoder, first decoder step, decoder step with past key/values)
+and runs greedy or beam search decoding with KV-cache reuse in NumPy.
+
+Usage:
+    python -m backend.onnx_backend export [--model google/pegasus-xsum]
+    python -m backend.onnx_backend parity [--model google/pegasus-xsum]
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import torch
+
+from backend.inference import InferenceBackend, TorchBackend
+from backend.model_manager import DEFAULT_MODEL
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+# ---------- EXPORT LOCATION ----------
+ONNX_DIR = os.environ.get(
+    "TEXTMORPH_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "onnx_models"),
+)
+OPSET = 17
+
+def model_dir(model_name: str) -> str:
+    return os.path.join(ONNX_DIR, model_name.replace("/", "__"))
+
+# ---------- EXPORT WRAPPERS ----------
+def _legacy(past) -> tuple:
+    """Cache object → tuple of (self_k, self_v, cross_k, cross_v) per layer."""
+    return past.to_legacy_cache() if hasattr(past, "to_legacy_cache") else past
+
+class _Encoder(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.get_encoder()
+
+    def forward(self, input_ids, attention_mask):
+        return self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+class _DecoderInit(torch.nn.Module):
+    """First decoder step: computes logits plus self and cross attention caches."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.get_decoder()
+        self.lm_head = model.lm_head
+        self.final_logits_bias = model.final_logits_bias
+
+    def forward(self, input_ids, encoder_hidden_states, encoder_attention_mask):
+        out = self.decoder(input_ids=input_ids, encoder_hidden_states=encoder_hidden_states,
+                           encoder_attention_mask=encoder_attention_mask, use_cache=True, return_dict=True)
+        logits = self.lm_head(out.last_hidden_state[:, -1]) + self.final_logits_bias
+        return (logits,) + tuple(t for layer in _legacy(out.past_key_values) for t in layer)
+
+class _DecoderWithPast(torch.nn.Module):
+    """Later decoder steps: reuses both caches and returns only the grown self-attention cache."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.get_decoder()
+        self.lm_head = model.lm_head
+        self.final_logits_bias = model.final_logits_bias
+        self.num_layers = model.config.decoder_layers
+
+    def forward(self, input_ids, encoder_hidden_states, encoder_attention_mask, *past_flat):
+        past = tuple(tuple(past_flat[4 * i:4 * i + 4]) for i in range(self.num_layers))
+        try:
+            from transformers.cache_utils import EncoderDecoderCache
+            past = EncoderDecoderCache.from_legacy_cache(past)
+        except ImportError:
+            pass
+        out = self.decoder(input_ids=input_ids, encoder_hidden_states=encoder_hidden_states,
+                           encoder_attention_mask=encoder_attention_mask, past_key_values=past,
+                           use_cache=True, return_dict=True)
+        logits = self.lm_head(out.last_hidden_state[:, -1]) + self.final_logits_bias
+        return (logits,) + tuple(t for layer in _legacy(out.past_key_values) for t in layer[:2])
+
+def _past_names(num_layers: int, prefix: str, self_only: bool = False) -> List[str]:
+    kinds = ("self_key", "self_value") if self_only else ("self_key", "self_value", "cross_key", "cross_value")
+    return [f"{prefix}.{i}.{kind}" for i in range(num_layers) for kind in kinds]
+
+def export_model(model_name: str = DEFAULT_MODEL, output_dir: Optional[str] = None) -> str:
+    """Export encoder and decoder graphs plus tokenizer and generation metadata."""
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+    output_dir = output_dir or model_dir(model_name)
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+    config = model.config
+    layers = config.decoder_layers
+    heads = config.decoder_attention_heads
+    head_dim = config.d_model // heads
+
+    batch, enc_len, past_len = 2, 8, 3
+    input_ids = torch.ones((batch, enc_len), dtype=torch.long)
+    attention_mask = torch.ones((batch, enc_len), dtype=torch.long)
+    hidden = torch.zeros((batch, enc_len, config.d_model))
+    dec_ids = torch.full((batch, 1), config.decoder_start_token_id, dtype=torch.long)
+    past = []
+    for _ in range(layers):
+        past += [torch.zeros((batch, heads, past_len, head_dim))] * 2
+        past += [torch.zeros((batch, heads, enc_len, head_dim))] * 2
+
+    enc_axes = {0: "batch", 1: "enc_seq"}
+    self_axes = {0: "batch", 2: "past_seq"}
+    cross_axes = {0: "batch", 2: "enc_seq"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(model), (input_ids, attention_mask), os.path.join(output_dir, "encoder.onnx"),
+            input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": enc_axes, "attention_mask": enc_axes, "last_hidden_state": enc_axes},
+            opset_version=OPSET, dynamo=False,
+        )
+
+        present = _past_names(layers, "present")
+        torch.onnx.export(
+            _DecoderInit(model), (dec_ids, hidden, attention_mask), os.path.join(output_dir, "decoder_init.onnx"),
+            input_names=["input_ids", "encoder_hidden_states", "encoder_attention_mask"],
+            output_names=["logits"] + present,
+            dynamic_axes={
+                "input_ids": {0: "batch"}, "encoder_hidden_states": enc_axes,
+                "encoder_attention_mask": enc_axes, "logits": {0: "batch"},
+                **{n: (self_axes if ".self_" in n else cross_axes) for n in present},
+            },
+            opset_version=OPSET, dynamo=False,
+        )
+
+        past_in = _past_names(layers, "past")
+        present_self = _past_names(layers, "present", self_only=True)
+        torch.onnx.export(
+            _DecoderWithPast(model), (dec_ids, hidden, attention_mask, *past),
+            os.path.join(output_dir, "decoder_with_past.onnx"),
+            input_names=["input_ids", "encoder_hidden_states", "encoder_attention_mask"] + past_in,
+            output_names=["logits"] + present_self,
+            dynamic_axes={
+                "input_ids": {0: "batch"}, "encoder_hidden_states": enc_axes,
+                "encoder_attention_mask": enc_axes, "logits": {0: "batch"},
+                **{n: (self_axes if ".self_" in n else cross_axes) for n in past_in},
+                **{n: self_axes for n in present_self},
+            },
+            opset_version=OPSET, dynamo=False,
+        )
+
+    tokenizer.save_pretrained(output_dir)
+    meta = {
+        "model_name": model_name,
+        "num_layers": layers,
+        "decoder_start_token_id": config.decoder_start_token_id,
+        "eos_token_id": config.eos_token_id,
+        "pad_token_id": config.pad_token_id,
+        "forced_eos_token_id": getattr(config, "forced_eos_token_id", None),
+    }
+    with open(os.path.join(output_dir, "textmorph_meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    logging.info(f"Exported {model_name} to {output_dir}")
+    return output_dir
+
+# ---------- DECODING ----------
+def _log_softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    return shifted - np.log(np.exp(shifted).sum(axis=-1, keepdims=True))
+
+class _Session:
+    """The three ORT sessions and metadata for one exported model."""
+
+    def __init__(self, path: str):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ["CPUExecutionProvider"]
+        self.encoder = ort.InferenceSession(os.path.join(path, "encoder.onnx"), options, providers=providers)
+        self.decoder_init = ort.InferenceSession(os.path.join(path, "decoder_init.onnx"), options, providers=providers)
+        self.decoder_past = ort.InferenceSession(os.path.join(path, "decoder_with_past.onnx"), options, providers=providers)
+        with open(os.path.join(path, "textmorph_meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self._past_inputs = {i.name for i in self.decoder_past.get_inputs()}
+
+    def encode(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        return self.encoder.run(None, {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+
+    def first_step(self, tokens, hidden, mask) -> Tuple[np.ndarray, List[np.ndarray], List[np.ndarray]]:
+        out = self.decoder_init.run(None, {"input_ids": tokens, "encoder_hidden_states": hidden,
+                                           "encoder_attention_mask": mask})
+        layers = self.meta["num_layers"]
+        caches = out[1:]
+        self_kv = [caches[4 * i + j] for i in range(layers) for j in (0, 1)]
+        cross_kv = [caches[4 * i + j] for i in range(layers) for j in (2, 3)]
+        return out[0], self_kv, cross_kv
+
+    def next_step(self, tokens, hidden, mask, self_kv, cross_kv) -> Tuple[np.ndarray, List[np.ndarray]]:
+        feeds = {"input_ids": tokens, "encoder_hidden_states": hidden, "encoder_attention_mask": mask}
+        for i in range(self.meta["num_layers"]):
+            feeds[f"past.{i}.self_key"] = self_kv[2 * i]
+            feeds[f"past.{i}.self_value"] = self_kv[2 * i + 1]
+            feeds[f"past.{i}.cross_key"] = cross_kv[2 * i]
+            feeds[f"past.{i}.cross_value"] = cross_kv[2 * i + 1]
+        # The exporter may prune inputs the traced graph never reads
+        feeds = {k: v for k, v in feeds.items() if k in self._past_inputs}
+        out = self.decoder_past.run(None, feeds)
+        return out[0], list(out[1:])
+
+def _constrain(logp: np.ndarray, cur_len: int, min_length: int, max_length: int, meta: dict) -> np.ndarray:
+    """Apply min-length and forced-EOS rules the way transformers' logits processors do."""
+    eos = meta["eos_token_id"]
+    if cur_len < min_length:
+        logp[:, eos] = -np.inf
+    forced = meta.get("forced_eos_token_id")
+    if forced is not None and cur_len == max_length - 1:
+        logp[:, :] = -np.inf
+        logp[:, forced] = 0.0
+    return logp
+
+def greedy_search(session: _Session, input_ids: np.ndarray, attention_mask: np.ndarray,
+                  max_length: int, min_length: int = 0) -> List[List[int]]:
+    meta = session.meta
+    batch = input_ids.shape[0]
+    hidden = session.encode(input_ids, attention_mask)
+    tokens = np.full((batch, 1), meta["decoder_start_token_id"], dtype=np.int64)
+    sequences = tokens.copy()
+    finished = np.zeros(batch, dtype=bool)
+
+    logits, self_kv, cross_kv = session.first_step(tokens, hidden, attention_mask)
+    cur_len = 1
+    while True:
+        logp = _constrain(_log_softmax(logits), cur_len, min_length, max_length, meta)
+        next_tokens = logp.argmax(axis=-1)
+        next_tokens[finished] = meta["pad_token_id"]
+        sequences = np.concatenate([sequences, next_tokens[:, None]], axis=1)
+        finished |= next_tokens == meta["eos_token_id"]
+        cur_len += 1
+        if finished.all() or cur_len >= max_length:
+            break
+        logits, self_kv = session.next_step(next_tokens[:, None], hidden, attention_mask, self_kv, cross_kv)
+
+    return sequences.tolist()
+
+def beam_search(session: _Session, input_ids: np.ndarray, attention_mask: np.ndarray, max_length: int,
+                min_length: int = 0, num_beams: int = 4, length_penalty: float = 1.0,
+                early_stopping: bool = False) -> List[List[int]]:
+    meta = session.meta
+    eos, pad = meta["eos_token_id"], meta["pad_token_id"]
+    batch, k = input_ids.shape[0], num_beams
+
+    hidden = np.repeat(session.encode(input_ids, attention_mask), k, axis=0)
+    mask = np.repeat(attention_mask, k, axis=0)
+    sequences = np.full((batch * k, 1), meta["decoder_start_token_id"], dtype=np.int64)
+    beam_scores = np.zeros((batch, k), dtype=np.float32)
+    beam_scores[:, 1:] = -1e9  # Only the first beam is live on step one
+    hyps: List[List[Tuple[float, List[int]]]] = [[] for _ in range(batch)]
+    done = np.zeros(batch, dtype=bool)
+
+    logits, self_kv, cross_kv = session.first_step(sequences, hidden, mask)
+    cur_len = 1
+    while True:
+        logp = _constrain(_log_softmax(logits), cur_len, min_length, max_length, meta)
+        vocab = logp.shape[-1]
+        scores = (logp + beam_scores.reshape(-1, 1)).reshape(batch, k * vocab)
+        top = np.argsort(-scores, axis=1)[:, :2 * k]
+
+        next_scores = np.zeros((batch, k), dtype=np.float32)
+        next_tokens = np.full((batch, k), pad, dtype=np.int64)
+        next_beams = np.tile(np.arange(k), (batch, 1))
+        for b in range(batch):
+            if done[b]:
+                continue
+            filled = 0
+            for rank, idx in enumerate(top[b]):
+                beam, token = divmod(int(idx), vocab)
+                score = float(scores[b, idx])
+                if token == eos:
+                    if rank < k:
+                        seq = sequences[b * k + beam].tolist()
+                        hyps[b].append((score / (cur_len ** length_penalty), seq))
+                        hyps[b] = sorted(hyps[b], key=lambda h: h[0], reverse=True)[:k]
+                    continue
+                next_scores[b, filled], next_tokens[b, filled], next_beams[b, filled] = score, token, beam
+                filled += 1
+                if filled == k:
+                    break
+
+            if len(hyps[b]) >= k:
+                if early_stopping:
+                    done[b] = True
+                else:
+                    best_running = next_scores[b, 0] / ((cur_len + 1) ** length_penalty)
+                    done[b] = best_running <= hyps[b][-1][0]
+
+        cur_len += 1
+        order = (np.arange(batch)[:, None] * k + next_beams).reshape(-1)
+        sequences = np.concatenate([sequences[order], next_tokens.reshape(-1, 1)], axis=1)
+        beam_scores = next_scores
+        if done.all() or cur_len >= max_length:
+            break
+        self_kv = [np.take(t, order, axis=0) for t in self_kv]
+        logits, self_kv = session.next_step(next_tokens.reshape(-1, 1), hidden, mask, self_kv, cross_kv)
+
+    results = []
+    for b in range(batch):
+        if not done[b]:
+            # Out of length: running beams compete with finished hypotheses
+            for j in range(k):
+                seq = sequences[b * k + j].tolist()
+                hyps[b].append((float(beam_scores[b, j]) / (len(seq) ** length_penalty), seq))
+        best = max(hyps[b], key=lambda h: h[0])[1]
+        results.append(best + [eos] if best[-1] != eos and len(best) < max_length else best)
+    return results
+
+class OnnxBackend(InferenceBackend):
+    """Runs exported Pegasus graphs on ONNX Runtime; exports on first use if needed."""
+
+    name = "onnx"
+
+    def __init__(self):
+        if ort is None:
+            raise RuntimeError("onnxruntime is not installed")
+        self._sessions: Dict[str, _Session] = {}
+        self._tokenizers: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._fallback = TorchBackend()
+
+    def _session(self, model_name: str) -> _Session:
+        with self._lock:
+            if model_name not in self._sessions:
+                path = model_dir(model_name)
+                if not os.path.isfile(os.path.join(path, "textmorph_meta.json")):
+                    export_model(model_name, path)
+                self._sessions[model_name] = _Session(path)
+            return self._sessions[model_name]
+
+    def tokenizer(self, model_name: str = DEFAULT_MODEL):
+        if model_name not in self._tokenizers:
+            from transformers import AutoTokenizer
+            self._session(model_name)
+            self._tokenizers[model_name] = AutoTokenizer.from_pretrained(model_dir(model_name))
+        return self._tokenizers[model_name]
+
+    def generate(self, model_name: str, batch: Dict[str, torch.Tensor], **params) -> List[List[int]]:
+        if params.get("do_sample"):
+            # Sampling is not implemented on ORT; keep results correct via torch
+            return self._fallback.generate(model_name, batch, **params)
+
+        session = self._session(model_name)
+        input_ids = np.asarray(batch["input_ids"], dtype=np.int64)
+        attention_mask = np.asarray(batch.get("attention_mask", np.ones_like(input_ids)), dtype=np.int64)
+        max_length = params.get("max_length", 64)
+        min_length = params.get("min_length", 0)
+        num_beams = params.get("num_beams", 1)
+
+        if num_beams <= 1:
+            return greedy_search(session, input_ids, attention_mask, max_length, min_length)
+        return beam_search(session, input_ids, attention_mask, max_length, min_length, num_beams,
+                           params.get("length_penalty", 1.0), params.get("early_stopping", False))
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Pegasus to ONNX or check ONNX/PyTorch parity.")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--beams", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(export_model(args.model))
+        return
+
+    from backend.inference import check_parity
+    from benchmarks.profiles import SAMPLE_TEXT
+    texts = [s + "." for s in SAMPLE_TEXT.split(". ") if s]
+    for beams in (1, args.beams):
+        report = check_parity(texts, args.model, "onnx", max_length=60, num_beams=beams,
+                              length_penalty=2.0, early_stopping=True)
+        print(json.dumps({"num_beams": beams, **report}, indent=2))
+
+if __name__ == "__main__":
+    main()
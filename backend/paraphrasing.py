@@ -5,47 +5,235 @@ Does NOT use NLTK, so avoids punkt issues.
 """
 
 import re
-from typing import Dict, Tuple
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-
-# Cache model & tokenizer
-_model_cache: Dict[str, Tuple[AutoTokenizer, AutoModelForSeq2SeqLM]] = {}
-
-def load_model(model_name: str = "google/pegasus-xsum"):
-    """Load and cache Pegasus model + tokenizer."""
-    if model_name not in _model_cache:
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-        _model_cache[model_name] = (tokenizer, model)
-    return _model_cache[model_name]
-
-def split_into_sentences(text: str) -> list:
-    """Split text into sentences using regex (avoiding NLTK)."""
-    sentences = re.split(r'(?<=[.!?]) +', text)
-    return [s.strip() for s in sentences if s.strip()]
-
-def generate_paraphrase(text: str, complexity: str = "medium") -> str:
-    """Paraphrase input text with adjustable complexity."""
-    tokenizer, model = load_model()
-
-    # Complexity → decoding params
-    decoding_map = {
-        "basic": dict(num_beams=3, max_length=60, do_sample=True, temperature=0.7),
-        "medium": dict(num_beams=5, max_length=80, do_sample=True, temperature=0.9),
-        "advanced": dict(num_beams=8, max_length=100, do_sample=True, temperature=1.0),
-    }
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend import assisted, budget, metrics, result_cache
+from backend.inference import get_backend
+from backend.model_manager import DEFAULT_MODEL, active_profile, get_model
+from backend.startup import lazy_import
+from backend.text_chunking import length_buckets, split_into_sentences
+
+# Sentences sent through one generate call
+DEFAULT_BATCH_SIZE = 8
+
+# Seed for sampled decoding; fixed so cached and fresh paraphrases agree
+DEFAULT_SEED = 0
+
+# Complexity → decoding params
+decoding_map = {
+    "basic": dict(num_beams=3, max_length=60, do_sample=True, temperature=0.7),
+    "medium": dict(num_beams=5, max_length=80, do_sample=True, temperature=0.9),
+    "advanced": dict(num_beams=8, max_length=100, do_sample=True, temperature=1.0),
+}
+
+def load_model(model_name: str = DEFAULT_MODEL):
+    """Pegasus model + tokenizer from the shared model registry."""
+    tokenizer, model, _ = get_model(model_name)
+    return tokenizer, model
+
+def iter_paraphrases(sentences: List[str], complexity: str = "medium",
+                     batch_size: int = DEFAULT_BATCH_SIZE, seed: Optional[int] = DEFAULT_SEED,
+                     bucketed: bool = True, deadline_s: Optional[float] = None,
+                     stats: Optional[dict] = None,
+                     started: Optional[float] = None) -> Iterator[Tuple[List[int], List[str]]]:
+    """
+    Paraphrase sentences in micro-batches, yielding (indices, paraphrases)
+    as each batch finishes. Bucketed batches group sentences of similar
+    length; unbucketed batches follow document order for streaming. Each
+    batch is sampled under ``seed`` plus its batch number; with a draft
+    model configured, decoding is greedy assisted decoding instead.
+    Beams and max length are scaled to the longest sentence of each batch.
+    With ``deadline_s`` they are lowered further to fit it, sentences still
+    pending at the deadline are returned unchanged, and stats["degradations"]
+    lists what was reduced.
+    """
+    if not sentences:
+        return
+    engine = get_backend()
+    tokenizer = engine.tokenizer(DEFAULT_MODEL)
     params = decoding_map.get(complexity, decoding_map["medium"])
+    batch_size = max(1, int(batch_size))
+    use_assisted = assisted.enabled("paraphrase", engine.name)
+
+    # Tokenize once; batches are padded from these ids
+    with metrics.span("tokenize", task="paraphrase"):
+        encoded = tokenizer(sentences, truncation=True)["input_ids"]
+    if bucketed:
+        batches = length_buckets([len(ids) for ids in encoded], batch_size)
+    else:
+        batches = [list(range(i, min(i + batch_size, len(encoded)))) for i in range(0, len(encoded), batch_size)]
+    batch_params = [budget.paraphrase_params(params, max(len(encoded[i]) for i in indices)) for indices in batches]
+
+    caps: Dict[str, int] = {}
+    plan = None
+    if deadline_s is not None:
+        rows = len(encoded)
+        beams = -(-sum(p["num_beams"] * len(b) for p, b in zip(batch_params, batches)) // rows)
+        max_tokens = -(-sum(p["max_length"] * len(b) for p, b in zip(batch_params, batches)) // rows)
+        plan = budget.plan("paraphrase", deadline_s, rows, beams, max_tokens, started=started)
+        if plan["beams"] < beams:
+            caps["num_beams"] = plan["beams"]
+        if plan["max_tokens"] < max_tokens:
+            caps["max_length"] = plan["max_tokens"]
+        if stats is not None:
+            stats.update(deadline_s=deadline_s, estimated_s=plan["estimated_s"], degradations=plan["degradations"])
+
+    skipped = 0
+    for batch_no, indices in enumerate(batches):
+        if budget.expired(plan):
+            skipped += len(indices)
+            yield indices, [sentences[i] for i in indices]
+            continue
+        params = dict(batch_params[batch_no])
+        params.update({k: min(v, params[k]) for k, v in caps.items()})
+
+        batch = tokenizer.pad({"input_ids": [encoded[i] for i in indices]},
+                              padding="longest", return_tensors="pt")
+        start = time.perf_counter()
+        outputs = None
+        if use_assisted:
+            outputs = assisted.generate("paraphrase", DEFAULT_MODEL, batch, max_length=params["max_length"])
+            use_assisted = outputs is not None
+        if outputs is None and seed is None:
+            outputs = engine.generate(DEFAULT_MODEL, batch, **params)
+        elif outputs is None:
+            torch = lazy_import("torch")
+            with torch.random.fork_rng(devices=[]):
+                torch.manual_seed(seed + batch_no)
+                outputs = engine.generate(DEFAULT_MODEL, batch, **params)
+        seconds, beams = time.perf_counter() - start, 1 if use_assisted else params["num_beams"]
+        metrics.record_generation("paraphrase", seconds,
+                                  sum(len(encoded[i]) for i in indices), sum(len(ids) for ids in outputs),
+                                  beams=beams, batch_size=len(indices))
+        budget.record("paraphrase", seconds, max(len(ids) for ids in outputs), beams, len(indices))
+        with metrics.span("decode", task="paraphrase"):
+            decoded = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        yield indices, [re.sub(r"\.\.+$", ".", out).strip() for out in decoded]  # Clean trailing dots
+
+    if skipped:
+        plan["degradations"].append(f"{skipped} of {len(encoded)} sentences left unchanged (deadline)")
 
+def paraphrase_sentences(sentences: List[str], complexity: str = "medium",
+                         batch_size: int = DEFAULT_BATCH_SIZE, seed: Optional[int] = DEFAULT_SEED,
+                         deadline_s: Optional[float] = None, stats: Optional[dict] = None,
+                         started: Optional[float] = None) -> List[str]:
+    """Paraphrase sentences in length-bucketed micro-batches, keeping input order."""
+    results: List[str] = [""] * len(sentences)
+    for indices, outputs in iter_paraphrases(sentences, complexity, batch_size, seed,
+                                             deadline_s=deadline_s, stats=stats, started=started):
+        for i, out in zip(indices, outputs):
+            results[i] = out
+    return results
+
+def _cache_key(text: str, complexity: str, batch_size: int, seed: Optional[int], bucketed) -> str:
+    backend = get_backend().name
+    decoding = dict(decoding_map.get(complexity, decoding_map["medium"]), scaled=True)
+    if assisted.enabled("paraphrase", backend):
+        decoding = dict(assisted.DECODING, max_length=decoding["max_length"], scaled=True)
+    return result_cache.make_key(
+        "paraphrase", text, model=DEFAULT_MODEL, backend=backend, profile=active_profile(),
+        complexity=complexity, decoding=decoding,
+        seed=seed, batch_size=batch_size, bucketed=bucketed
+    )
+
+def generate_paraphrase(text: str, complexity: str = "medium",
+                        batch_size: int = DEFAULT_BATCH_SIZE, seed: Optional[int] = DEFAULT_SEED,
+                        use_cache: bool = True, deadline_s: Optional[float] = None,
+                        stats: Optional[dict] = None) -> str:
+    """Paraphrase input text with adjustable complexity.
+
+    Sentences are generated in padded micro-batches of ``batch_size``;
+    ``batch_size=1`` runs one sentence per generate call. Sampling is seeded
+    with ``seed`` so results are reproducible and can be cached; with
+    ``seed=None`` sampling is unseeded and the cache is bypassed.
+    ``deadline_s`` is a latency budget in seconds; what was reduced to meet
+    it is listed in stats["degradations"], and degraded results are not cached.
+    """
+    started = time.perf_counter()
+    stats = stats if stats is not None else {}
     sentences = split_into_sentences(text)
     if not sentences:
         return text
 
-    paraphrased_sentences = []
-    for sent in sentences:
-        batch = tokenizer([sent], truncation=True, padding="longest", return_tensors="pt")
-        outputs = model.generate(**batch, **params)
-        out = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        out = re.sub(r"\.\.+$", ".", out).strip()  # Clean trailing dots
-        paraphrased_sentences.append(out)
+    use_cache = use_cache and seed is not None
+    cache_key = _cache_key(text, complexity, batch_size, seed, bucketed=True)
+    if use_cache:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    result = " ".join(paraphrase_sentences(sentences, complexity, batch_size, seed, deadline_s, stats, started))
+    if use_cache and not stats.get("degradations"):
+        result_cache.put(cache_key, result, "paraphrase")
+    return result
+
+def generate_paraphrase_stream(text: str, complexity: str = "medium",
+                               batch_size: int = DEFAULT_BATCH_SIZE, seed: Optional[int] = DEFAULT_SEED,
+                               use_cache: bool = True, deadline_s: Optional[float] = None,
+                               stats: Optional[dict] = None) -> Iterator[str]:
+    """
+    Streaming variant of generate_paraphrase.
+    Yields paraphrased sentences in document order as their batch finishes;
+    joining the pieces with spaces gives the full paraphrase. Closing the
+    generator early stops further generation.
+    """
+    started = time.perf_counter()
+    stats = stats if stats is not None else {}
+    sentences = split_into_sentences(text)
+    if not sentences:
+        if text:
+            yield text
+        return
+
+    use_cache = use_cache and seed is not None
+    cache_key = _cache_key(text, complexity, batch_size, seed, bucketed=False)
+    if use_cache:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    pieces: List[str] = []
+    for _, outputs in iter_paraphrases(sentences, complexity, batch_size, seed, bucketed=False,
+                                       deadline_s=deadline_s, stats=stats, started=started):
+        for out in outputs:
+            pieces.append(out)
+            yield out
+
+    if use_cache and not stats.get("degradations"):
+        result_cache.put(cache_key, " ".join(pieces), "paraphrase")
+
+def paraphrase_many(texts: List[str], complexity: str = "medium",
+                    batch_size: int = DEFAULT_BATCH_SIZE, seed: Optional[int] = DEFAULT_SEED,
+                    use_cache: bool = True) -> List[str]:
+    """
+    Paraphrase several texts with their sentences sharing micro-batches.
+    Sampled output depends on which texts were batched together, so these
+    results are cached separately from generate_paraphrase.
+    """
+    results = list(texts)
+    use_cache = use_cache and seed is not None
+    pending = []  # (index, sentences, cache key)
+    for i, text in enumerate(texts):
+        sentences = split_into_sentences(text)
+        if not sentences:
+            continue
+        key = _cache_key(text, complexity, batch_size, seed, bucketed="shared")
+        cached = result_cache.get(key) if use_cache else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append((i, sentences, key))
+    if not pending:
+        return results
 
-    return " ".join(paraphrased_sentences)
+    flat = [sent for _, sentences, _ in pending for sent in sentences]
+    paraphrased = paraphrase_sentences(flat, complexity, batch_size, seed)
+    start = 0
+    for i, sentences, key in pending:
+        results[i] = " ".join(paraphrased[start:start + len(sentences)])
+        start += len(sentences)
+        if use_cache:
+            result_cache.put(key, results[i], "paraphrase")
+    return results
@@ -0,0 +1,187 @@
+"""
+Content-addressed cache for summaries and paraphrases.
+Results are keyed on a hash of the exact input text plus every setting
+that changes the output (model, length/complexity, decoding params, seed).
+Lookups go through a bounded in-process LRU first, then a persistent SQLite
+tier stored next to the user database. The SQLite tier is bounded too: past
+TEXTMORPH_CACHE_DISK_ENTRIES rows, the least recently used ones are pruned.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from database.connection import ConnectionPool
+
+# ---------- CACHE SETTINGS ----------
+CACHE_DB = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database", "cache.db")
+MEMORY_ENTRIES = int(os.environ.get("TEXTMORPH_CACHE_ENTRIES", "256"))
+DISK_ENTRIES = int(os.environ.get("TEXTMORPH_CACHE_DISK_ENTRIES", "10000"))
+CACHE_ENABLED = os.environ.get("TEXTMORPH_CACHE", "1") != "0"
+PRUNE_EVERY_WRITES = 64
+
+class LRUCache:
+    """Thread-safe LRU mapping bounded by entry count."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+_memory = LRUCache(MEMORY_ENTRIES)
+_counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "pruned": 0}
+_counters_lock = threading.Lock()
+_table_ready = False
+_pool = ConnectionPool(CACHE_DB)
+
+def make_key(task: str, text: str, **settings) -> str:
+    """
+    Build the cache key for a task, its input text and output-affecting
+    settings. The text is hashed exactly as given: sentence splitting and
+    chunking see its line breaks, so texts differing only in whitespace can
+    produce different results.
+    """
+    payload = json.dumps({
+        "task": task,
+        "text": hashlib.sha256((text or "").encode("utf-8")).hexdigest(),
+        "settings": settings,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _count(name: str, n: int = 1) -> int:
+    with _counters_lock:
+        _counters[name] += n
+        return _counters[name]
+
+def _create_table(conn) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS result_cache (
+            key TEXT PRIMARY KEY,
+            task TEXT,
+            value TEXT,
+            created_at TEXT
+        )
+    """)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(result_cache)")]
+    if "last_used" not in columns:
+        conn.execute("ALTER TABLE result_cache ADD COLUMN last_used REAL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_last_used ON result_cache (last_used)")
+    # Extracted upload texts used to be cached here; they now stay in backend.extraction's memory LRU
+    conn.execute("DELETE FROM result_cache WHERE task='extract'")
+    conn.commit()
+
+@contextmanager
+def _connect():
+    """Borrow a pooled cache connection; it goes back to the pool even when a statement fails."""
+    global _table_ready
+    conn = _pool.acquire()
+    try:
+        if not _table_ready:
+            _create_table(conn)
+            _table_ready = True
+        yield conn
+    finally:
+        conn.close()
+
+def _prune(conn) -> int:
+    """Delete the least recently used rows beyond DISK_ENTRIES; returns how many."""
+    cursor = conn.execute("""
+        DELETE FROM result_cache WHERE key IN (
+            SELECT key FROM result_cache ORDER BY COALESCE(last_used, 0) DESC LIMIT -1 OFFSET ?
+        )
+    """, (DISK_ENTRIES,))
+    conn.commit()
+    return cursor.rowcount
+
+def get(key: str) -> Optional[Any]:
+    """Return the cached value for ``key`` or None, promoting disk hits to memory."""
+    if not CACHE_ENABLED:
+        return None
+
+    value = _memory.get(key)
+    if value is not None:
+        _count("memory_hits")
+        return value
+
+    try:
+        with _connect() as conn:
+            row = conn.execute("SELECT value FROM result_cache WHERE key=?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE result_cache SET last_used=? WHERE key=?", (time.time(), key))
+                conn.commit()
+    except sqlite3.Error as e:
+        logging.warning(f"Result cache read failed: {e}")
+        row = None
+
+    if row is None:
+        _count("misses")
+        return None
+
+    value = json.loads(row[0])
+    _memory.put(key, value)
+    _count("disk_hits")
+    return value
+
+def put(key: str, value: Any, task: str = "") -> None:
+    """Store a JSON-serializable value in both tiers."""
+    if not CACHE_ENABLED:
+        return
+
+    _memory.put(key, value)
+    try:
+        with _connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO result_cache (key, task, value, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, task, json.dumps(value), datetime.now(timezone.utc).isoformat(), time.time()))
+            conn.commit()
+            if _count("writes") % PRUNE_EVERY_WRITES == 0:
+                _count("pruned", _prune(conn))
+    except sqlite3.Error as e:
+        logging.warning(f"Result cache write failed: {e}")
+
+def cache_stats() -> Dict[str, float]:
+    """Hit/miss counters plus the current memory tier size."""
+    with _counters_lock:
+        stats = dict(_counters)
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["memory_entries"] = len(_memory)
+    stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    return stats
+
+def clear_cache(persistent: bool = False) -> None:
+    """Empty the memory tier, and the SQLite tier too when ``persistent``."""
+    _memory.clear()
+    if persistent:
+        with _connect() as conn:
+            conn.execute("DELETE FROM result_cache")
+            conn.commit()
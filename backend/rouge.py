@@ -0,0 +1,116 @@
+"""
+ROUGE-1, ROUGE-2 and ROUGE-L scoring with reusable reference preprocessing.
+Tokenization matches rouge_score (lowercase, alphanumeric tokens, Porter
+stemming of tokens longer than 3 characters). The stemmed tokens, n-gram
+counts and LCS bit masks of a reference are computed once and cached by the
+reference's hash, so scoring a summary, a paraphrase and several summary
+lengths against the same document reuses them. ROUGE-L uses a bit-parallel
+LCS, which is fast even when the reference is tens of thousands of words.
+"""
+
+import hashlib
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List
+
+from backend import metrics
+from backend.result_cache import LRUCache
+from backend.startup import lazy_import
+
+ROUGE_TYPES = ("rouge1", "rouge2", "rougeL")
+REFERENCE_CACHE_ENTRIES = 8
+
+_NON_ALPHANUM_RE = re.compile(r"[^a-z0-9]+")
+
+_stemmer = None
+
+def _get_stemmer():
+    """Porter stemmer, importing nltk on first use (False when unavailable)."""
+    global _stemmer
+    if _stemmer is None:
+        try:
+            _stemmer = lazy_import("nltk.stem.porter").PorterStemmer()
+        except ImportError:
+            _stemmer = False
+    return _stemmer
+
+@lru_cache(maxsize=100_000)
+def _stem(token: str) -> str:
+    stemmer = _get_stemmer()
+    return stemmer.stem(token) if stemmer and len(token) > 3 else token
+
+def tokenize(text: str) -> List[str]:
+    """rouge_score-compatible tokens with memoized stemming."""
+    return [_stem(t) for t in _NON_ALPHANUM_RE.sub(" ", (text or "").lower()).split()]
+
+def ngram_counts(tokens: List[str], n: int) -> Counter:
+    return Counter(zip(*(tokens[i:] for i in range(n))))
+
+class Reference:
+    """Precomputed tokens, n-gram counts and token position bit masks of a reference text."""
+
+    def __init__(self, text: str):
+        self.tokens = tokenize(text)
+        self.ngrams = {1: ngram_counts(self.tokens, 1), 2: ngram_counts(self.tokens, 2)}
+        self.positions: Dict[str, List[int]] = {}
+        for i, token in enumerate(self.tokens):
+            self.positions.setdefault(token, []).append(i)
+        # Masks are m bits wide, so build them only for tokens candidates actually use
+        self._masks: Dict[str, int] = {}
+
+    def mask(self, token: str) -> int:
+        """Bit i is set when reference token i equals ``token``."""
+        mask = self._masks.get(token)
+        if mask is None:
+            bits = bytearray(len(self.tokens) // 8 + 1)
+            for i in self.positions.get(token, ()):
+                bits[i >> 3] |= 1 << (i & 7)
+            mask = self._masks[token] = int.from_bytes(bits, "little")
+        return mask
+
+    def lcs_length(self, tokens: List[str]) -> int:
+        """Bit-parallel LCS (Allison-Dix / Hyyrö): one big-int update per candidate token."""
+        m = len(self.tokens)
+        if m == 0 or not tokens:
+            return 0
+        full = (1 << m) - 1
+        v = full
+        for token in tokens:
+            u = v & self.mask(token)
+            v = ((v + u) | (v - u)) & full
+        return m - bin(v).count("1")
+
+_references = LRUCache(REFERENCE_CACHE_ENTRIES)
+
+def get_reference(text: str) -> Reference:
+    """Return the cached preprocessing of a reference text, building it on first use."""
+    key = hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+    ref = _references.get(key)
+    if ref is None:
+        ref = Reference(text)
+        _references.put(key, ref)
+    return ref
+
+def _f1(overlap: int, candidate_total: int, reference_total: int) -> Dict[str, float]:
+    precision = overlap / candidate_total if candidate_total else 0.0
+    recall = overlap / reference_total if reference_total else 0.0
+    fmeasure = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "fmeasure": fmeasure}
+
+def score_detailed(reference: str, candidate: str) -> Dict[str, Dict[str, float]]:
+    """Precision, recall and F1 for each ROUGE type."""
+    ref = get_reference(reference)
+    tokens = tokenize(candidate)
+    scores = {}
+    for n in (1, 2):
+        cand = ngram_counts(tokens, n)
+        overlap = sum(min(count, ref.ngrams[n][gram]) for gram, count in cand.items() if gram in ref.ngrams[n])
+        scores[f"rouge{n}"] = _f1(overlap, sum(cand.values()), sum(ref.ngrams[n].values()))
+    scores["rougeL"] = _f1(ref.lcs_length(tokens), len(tokens), len(ref.tokens))
+    return scores
+
+def score(reference: str, candidate: str) -> Dict[str, float]:
+    """ROUGE-1/2/L F1 of ``candidate`` against ``reference``."""
+    with metrics.span("rouge"):
+        return {k: v["fmeasure"] for k, v in score_detailed(reference, candidate).items()}
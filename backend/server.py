@@ -0,0 +1,166 @@
+"""
+Local inference service with dynamic micro-batching.
+Concurrent summarize/paraphrase requests are queued and coalesced into
+shared generate batches: the batcher waits at most `max_wait_ms` after the
+first request, or until `max_batch_size` requests are collected, then runs
+the whole batch and returns each caller its own result.
+
+Prometheus metrics are served at /metrics when TEXTMORPH_METRICS=1.
+
+Usage:
+    python -m backend.server [--host 127.0.0.1] [--port 8000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from backend import metrics
+from backend.paraphrasing import paraphrase_many
+from backend.startup import start_warmup, startup_report
+from backend.summarization import summarize_many
+
+MAX_WAIT_MS = float(os.environ.get("TEXTMORPH_BATCH_MAX_WAIT_MS", "20"))
+MAX_BATCH_SIZE = int(os.environ.get("TEXTMORPH_BATCH_MAX_SIZE", "16"))
+
+class MicroBatcher:
+    """
+    Collects (key, item) requests and hands them to ``batch_fn(key, items)``
+    in batches. Items with the same key (e.g. task and length setting) are
+    run together; ``batch_fn`` returns one result per item, in order.
+    Batches run one at a time on a single inference thread, so requests that
+    arrive while a batch is generating are coalesced into the next one.
+    """
+
+    def __init__(self, batch_fn: Callable[[Tuple, List], List], max_batch_size: int = MAX_BATCH_SIZE,
+                 max_wait_ms: float = MAX_WAIT_MS):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.batches_run = 0
+        self.items_run = 0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._worker())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, key: Tuple, item):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, item, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Tuple, object, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            groups: Dict[Tuple, list] = defaultdict(list)
+            for key, item, future in await self._collect():
+                groups[key].append((item, future))
+
+            for key, entries in groups.items():
+                items = [item for item, _ in entries]
+                metrics.observe("server_batch_size", len(items), task=key[0])
+                try:
+                    with metrics.span("server_batch", task=key[0]):
+                        results = await loop.run_in_executor(self._executor, self.batch_fn, key, items)
+                except Exception as e:
+                    logging.exception(f"Batch {key} of {len(items)} failed")
+                    for _, future in entries:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self.batches_run += 1
+                self.items_run += len(items)
+                for (_, future), result in zip(entries, results):
+                    if not future.done():
+                        future.set_result(result)
+
+def run_batch(key: Tuple, texts: List[str]) -> List:
+    """Batch function: key is ("summary", length) or ("paraphrase", complexity)."""
+    task, setting = key
+    if task == "summary":
+        return summarize_many(texts, summary_length=setting)
+    return paraphrase_many(texts, complexity=setting)
+
+batcher = MicroBatcher(run_batch)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    batcher.start()
+    # Start accepting requests right away; the model loads in the background
+    start_warmup()
+    yield
+    await batcher.stop()
+
+app = FastAPI(title="AI-Text-Morph inference", lifespan=lifespan)
+
+class SummarizeRequest(BaseModel):
+    text: str
+    summary_length: str = "medium"
+
+class ParaphraseRequest(BaseModel):
+    text: str
+    complexity: str = "medium"
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "batches": batcher.batches_run, "requests": batcher.items_run,
+            "startup": startup_report()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return metrics.render_prometheus()
+
+@app.post("/summarize")
+async def summarize(req: SummarizeRequest):
+    metrics.inc("requests", task="summary")
+    summary, rouge_scores = await batcher.submit(("summary", req.summary_length), req.text)
+    return {"summary": summary, "rouge": rouge_scores}
+
+@app.post("/paraphrase")
+async def paraphrase(req: ParaphraseRequest):
+    metrics.inc("requests", task="paraphrase")
+    text = await batcher.submit(("paraphrase", req.complexity), req.text)
+    return {"paraphrase": text}
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the batching inference server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
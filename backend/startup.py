@@ -0,0 +1,94 @@
+"""
+Cold-start helpers: deferred heavy imports, background model warm-up and a
+startup-time report.
+Heavy dependencies (torch, transformers, matplotlib, ...) are imported on
+first use through lazy_import, which records how long each import took.
+start_warmup loads and primes the models in a background thread so the
+first user request does not pay for from_pretrained.
+
+Usage:
+    python -m backend.startup        # measure a cold start and print the report
+"""
+
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+WARMUP_ENABLED = os.environ.get("TEXTMORPH_WARMUP", "0") == "1"
+
+_timings: Dict[str, float] = {}
+_lock = threading.Lock()
+_warmup_thread: Optional[threading.Thread] = None
+_warmup_state = {"status": "idle", "error": None}
+
+@contextmanager
+def timed(label: str):
+    """Record the wall time of a startup step under ``label``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _timings[label] = _timings.get(label, 0.0) + time.perf_counter() - start
+
+def lazy_import(name: str):
+    """Import a module on first use, timing the import the first time it happens."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with timed(f"import {name}"):
+        return importlib.import_module(name)
+
+def startup_report() -> Dict[str, object]:
+    """Seconds spent per import and model load so far, plus warm-up status."""
+    with _lock:
+        steps = {label: round(seconds, 3) for label, seconds in _timings.items()}
+    return {"steps": steps, "total_s": round(sum(steps.values()), 3), "warmup": dict(_warmup_state)}
+
+def warm_up(model_names: Iterable[str] = (), prime: bool = True) -> None:
+    """Load models (and run one tiny generation each) in the calling thread."""
+    from backend.inference import get_backend
+    from backend.model_manager import DEFAULT_MODEL
+
+    _warmup_state["status"] = "running"
+    try:
+        engine = get_backend()
+        for name in list(model_names) or [DEFAULT_MODEL]:
+            with timed(f"load {name}"):
+                tokenizer = engine.tokenizer(name)
+            if prime:
+                with timed(f"prime {name}"):
+                    batch = tokenizer(["Warm-up sentence."], return_tensors="pt")
+                    engine.generate(name, batch, max_length=8, num_beams=1)
+        _warmup_state["status"] = "done"
+    except Exception as e:
+        logging.exception("Model warm-up failed")
+        _warmup_state.update(status="failed", error=str(e))
+
+def start_warmup(model_names: Iterable[str] = (), prime: bool = True) -> threading.Thread:
+    """Start warm-up in a daemon thread once per process; later calls return the same thread."""
+    global _warmup_thread
+    with _lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, args=(tuple(model_names), prime),
+                                              name="model-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    with timed("import backend.summarization"):
+        import backend.summarization  # noqa: F401
+    with timed("import backend.paraphrasing"):
+        import backend.paraphrasing  # noqa: F401
+    warm_up()
+    print(json.dumps(startup_report(), indent=2))
+
+if __name__ == "__main__":
+    main()
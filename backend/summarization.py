@@ -1,21 +1,40 @@
 """
 Summarization module using HuggingFace Pegasus.
-Handles long documents safely with configurable summary lengths.
+Handles long documents safely with configurable summary lengths; the "fast"
+length first keeps only a token budget of salient sentences (extractive
+pre-selection), so one generate call covers the whole document.
 Returns summary along with ROUGE-1, ROUGE-2, and ROUGE-L scores.
 """
 
 import logging
-from typing import Dict, Tuple
-import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 
-try:
-    from rouge_score import rouge_scorer
-except ImportError:
-    rouge_scorer = None
+from backend import assisted, budget, extractive, metrics, result_cache, rouge
+from backend.inference import get_backend
+from backend.model_manager import DEFAULT_MODEL, active_profile
+from backend.result_cache import LRUCache
+from backend.text_chunking import chunk_by_tokens, length_buckets, pack_by_tokens
 
-# Cache loaded model/tokenizer
-_pegasus_cache: Dict[str, Tuple[AutoTokenizer, AutoModelForSeq2SeqLM, torch.device]] = {}
+# Pegasus input limit and the per-chunk token budget (room left for </s>)
+MAX_INPUT_TOKENS = 1024
+DEFAULT_CHUNK_TOKENS = 1000
+
+# Chunks summarized per generate call in the map stage
+DEFAULT_BATCH_SIZE = 4
+
+# Beam width, unless a latency budget lowers it
+NUM_BEAMS = 6
+
+# Safety cap on reduce levels for pathological inputs
+MAX_TREE_DEPTH = 8
+
+# Tokens kept by extractive pre-selection in the "fast" mode: one chunk, no reduce stage
+FAST_BUDGET_TOKENS = DEFAULT_CHUNK_TOKENS
+
+# Chunkings of recent documents, so trying another length does not re-split and
+# re-tokenize the text (the encoder states of the chunks are cached by the backend)
+_chunkings = LRUCache(32)
 
 def clean_generated_text(text: str) -> str:
     """Remove unwanted <n> tokens and extra spaces."""
@@ -25,84 +44,354 @@ def clean_generated_text(text: str) -> str:
     text = re.sub(r"\s+", " ", text)
     return text.strip()
 
-def summarize_text(text: str, model_name: str = "google/pegasus-xsum", summary_length: str = "medium") -> Tuple[str, Dict[str, float]]:
-    text = (text or "").strip()
-    if not text:
-        return "", {}
+def iter_summaries(texts: List[str], model_name: str, min_len: int, max_len: int,
+                   batch_size: int = DEFAULT_BATCH_SIZE, bucketed: bool = True,
+                   num_beams: int = NUM_BEAMS) -> Iterator[Tuple[List[int], List[str]]]:
+    """
+    Summarize texts with batched beam search, yielding (indices, summaries)
+    as each batch finishes. Bucketed batches group texts of similar length;
+    unbucketed batches follow input order for streaming. Summary lengths
+    are capped by the longest input of each batch. Failed batches yield
+    empty strings.
+    """
+    if not texts:
+        return
+
+    engine = get_backend()
+    tokenizer = engine.tokenizer(model_name)
+    batch_size = max(1, int(batch_size))
+    use_assisted = assisted.enabled("summary", engine.name)
+    with metrics.span("tokenize", task="summary"):
+        encoded = tokenizer(texts, truncation=True, max_length=MAX_INPUT_TOKENS)["input_ids"]
+    if bucketed:
+        batches = length_buckets([len(ids) for ids in encoded], batch_size)
+    else:
+        batches = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
 
-    # Load model/tokenizer (cached)
-    if model_name not in _pegasus_cache:
+    for indices in batches:
+        decoded = [""] * len(indices)
         try:
-            tokenizer = AutoTokenizer.from_pretrained(model_name)
-            model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-            device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            model.to(device)
-            _pegasus_cache[model_name] = (tokenizer, model, device)
+            inputs = tokenizer.pad({"input_ids": [encoded[i] for i in indices]},
+                                   padding="longest", return_tensors="pt")
+            batch_min, batch_max = budget.summary_lengths(max(len(encoded[i]) for i in indices), min_len, max_len)
+
+            start = time.perf_counter()
+            output_ids = None
+            if use_assisted:
+                # Greedy, verified against the draft model's proposals
+                output_ids = assisted.generate("summary", model_name, inputs, max_length=batch_max,
+                                               min_length=batch_min)
+                use_assisted = output_ids is not None
+            if output_ids is None:
+                output_ids = engine.generate(
+                    model_name,
+                    inputs,
+                    max_length=batch_max,
+                    min_length=batch_min,
+                    num_beams=num_beams,
+                    length_penalty=2.0,
+                    early_stopping=True
+                )
+            seconds, beams = time.perf_counter() - start, 1 if use_assisted else num_beams
+            metrics.record_generation("summary", seconds,
+                                      sum(len(encoded[i]) for i in indices), sum(len(ids) for ids in output_ids),
+                                      beams=beams, batch_size=len(indices))
+            budget.record("summary", seconds, max(len(ids) for ids in output_ids), beams, len(indices))
+            with metrics.span("decode", task="summary"):
+                decoded = [clean_generated_text(out)
+                           for out in tokenizer.batch_decode(output_ids, skip_special_tokens=True)]
         except Exception as e:
-            logging.exception(f"Failed to load Pegasus model: {e}")
-            return "", {}
+            logging.warning(f"Chunk summarization failed: {e}")
+        yield indices, decoded
+
+def generate_summaries(texts: List[str], model_name: str, min_len: int, max_len: int,
+                       batch_size: int = DEFAULT_BATCH_SIZE, num_beams: int = NUM_BEAMS) -> List[str]:
+    """Summarize each text with batched beam search; failed batches yield empty strings."""
+    summaries: List[str] = [""] * len(texts)
+    for indices, decoded in iter_summaries(texts, model_name, min_len, max_len, batch_size, num_beams=num_beams):
+        for i, out in zip(indices, decoded):
+            summaries[i] = out
+    return summaries
+
+def reduce_summaries(summaries: List[str], model_name: str, min_len: int, max_len: int,
+                     chunk_tokens: int = DEFAULT_CHUNK_TOKENS, batch_size: int = DEFAULT_BATCH_SIZE,
+                     stats: Optional[dict] = None, num_beams: int = NUM_BEAMS) -> str:
+    """
+    Reduce chunk summaries level by level until they fit one context window.
+    Each level packs the current summaries into groups of at most
+    ``chunk_tokens`` tokens and summarizes every group, so only one tree
+    level is held in memory at a time. Depth and per-level fan-out are
+    recorded in ``stats`` when given.
+    """
+    stats = stats if stats is not None else {}
+    tokenizer = get_backend().tokenizer(model_name)
+    stats.setdefault("levels", [len(summaries)])
+    stats.setdefault("fan_out", [])
+    level = summaries
+
+    while len(level) > 1 and len(stats["fan_out"]) < MAX_TREE_DEPTH:
+        lengths = [len(ids) for ids in tokenizer(level, add_special_tokens=False)["input_ids"]]
+        if sum(lengths) + len(level) <= chunk_tokens:
+            groups = [list(range(len(level)))]
+        else:
+            groups = pack_by_tokens(lengths, chunk_tokens)
+            if len(groups) >= len(level):
+                # Summaries too long to pack; pair them so the tree still shrinks
+                groups = [list(range(i, min(i + 2, len(level)))) for i in range(0, len(level), 2)]
+
+        final = len(groups) == 1
+        texts = [" ".join(level[j] for j in group) for group in groups]
+        reduced = generate_summaries(texts, model_name, max(min_len, 20) if final else min_len,
+                                     max_len, batch_size, num_beams)
+        # Keep the unsummarized text of a failed group rather than dropping it
+        level = [r or t for r, t in zip(reduced, texts)]
+        stats["fan_out"].append(max(len(g) for g in groups))
+        stats["levels"].append(len(level))
+
+    stats["depth"] = len(stats["fan_out"])
+    return " ".join(level)
+
+# Token length settings
+length_map = {"short": (30, 80), "medium": (80, 120), "long": (120, 300), "fast": (80, 120)}
+
+def _extract_budget(summary_length: str, extract_budget: Optional[int]) -> Optional[int]:
+    """Token budget for extractive pre-selection: explicit, the "fast" default, or None (off)."""
+    if extract_budget is not None:
+        return max(1, int(extract_budget))
+    return FAST_BUDGET_TOKENS if summary_length == "fast" else None
+
+def _chunk(text: str, tokenizer, model_name: str, chunk_tokens: int, overlap_sentences: int) -> List[str]:
+    key = result_cache.make_key("chunks", text, model=model_name, chunk_tokens=chunk_tokens,
+                                overlap=overlap_sentences)
+    chunks = _chunkings.get(key)
+    if chunks is None:
+        with metrics.span("chunk"):
+            chunks = chunk_by_tokens(text, tokenizer, chunk_tokens, overlap_sentences) or [text]
+        _chunkings.put(key, chunks)
+    return chunks
+
+def _preselect(text: str, tokenizer, extract_tokens: Optional[int], stats: dict) -> str:
+    """The text the abstractive stage sees: all of it, or its most salient sentences within ``extract_tokens``."""
+    if extract_tokens is None:
+        return text
+    counts: Dict[str, int] = {}
+    with metrics.span("extractive"):
+        selected = extractive.select_sentences(text, tokenizer, extract_tokens, counts)
+    stats["extractive"] = counts
+    if counts.get("tokens"):
+        metrics.observe("extractive_kept_ratio", counts["selected_tokens"] / counts["tokens"])
+    return selected
+
+def _cache_key(text: str, model_name: str, summary_length: str, chunk_tokens: int, overlap_sentences: int,
+               extract_budget: Optional[int] = None) -> str:
+    backend = get_backend().name
+    if assisted.enabled("summary", backend):
+        decoding = dict(assisted.DECODING, scaled_lengths=True)
+    else:
+        decoding = dict(num_beams=NUM_BEAMS, length_penalty=2.0, early_stopping=True, scaled_lengths=True)
+    return result_cache.make_key(
+        "summary", text, model=model_name, backend=backend, profile=active_profile(),
+        length=summary_length, chunk_tokens=chunk_tokens, overlap=overlap_sentences,
+        extract_budget=extract_budget, decoding=decoding
+    )
+
+def _summarize_events(text: str, model_name: str, summary_length: str, chunk_tokens: int,
+                      overlap_sentences: int, batch_size: int, stats: dict, use_cache: bool,
+                      bucketed: bool, extract_budget: Optional[int] = None, deadline_s: Optional[float] = None,
+                      started: Optional[float] = None) -> Iterator[Dict[str, object]]:
+    """
+    Run the summarization pipeline as a sequence of progress events:
+    one "chunk" event per finished map-stage batch, then one "final" event
+    carrying the summary and its ROUGE scores. With ``deadline_s``, beams,
+    chunks and max tokens are reduced to fit it (see backend.budget) and the
+    reductions are listed in stats["degradations"].
+    """
+    extract_tokens = _extract_budget(summary_length, extract_budget)
+    cache_key = _cache_key(text, model_name, summary_length, chunk_tokens, overlap_sentences, extract_tokens)
+    if use_cache:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            stats.update(cached["stats"], cache="hit")
+            yield {"stage": "final", "text": cached["summary"], "rouge": cached["rouge"]}
+            return
 
-    tokenizer, model, device = _pegasus_cache[model_name]
+    # Load model/tokenizer (shared registry or exported graphs)
+    try:
+        tokenizer = get_backend().tokenizer(model_name)
+    except Exception as e:
+        logging.exception(f"Failed to load Pegasus model: {e}")
+        yield {"stage": "final", "text": "", "rouge": {}}
+        return
 
-    # Token length settings
-    length_map = {"short": (30, 80), "medium": (80, 120), "long": (120, 300)}
     min_len, max_len = length_map.get(summary_length, (80, 120))
+    selected = _preselect(text, tokenizer, extract_tokens, stats)
 
-    # Split long texts into chunks
-    words = text.split()
-    chunks = [" ".join(words[i:i + 800]) for i in range(0, len(words), 800)]
+    # Split long texts into token-bounded chunks at sentence boundaries
+    chunk_tokens = min(chunk_tokens, MAX_INPUT_TOKENS - 1)
+    chunks = _chunk(selected, tokenizer, model_name, chunk_tokens, overlap_sentences)
+    metrics.observe("summary_chunks", len(chunks))
 
-    chunk_summaries = []
-    for chunk in chunks:
-        try:
-            inputs = tokenizer(chunk, truncation=True, padding="longest", return_tensors="pt", max_length=1024)
-            for k, v in inputs.items():
-                inputs[k] = v.to(device)
-
-            output_ids = model.generate(
-                inputs["input_ids"],
-                max_length=max_len,
-                min_length=min_len,
-                num_beams=6,
-                length_penalty=2.0,
-                early_stopping=True
-            )
-            summary_chunk = tokenizer.decode(output_ids[0], skip_special_tokens=True)
-            chunk_summaries.append(clean_generated_text(summary_chunk))
-        except Exception as e:
-            logging.warning(f"Chunk summarization failed: {e}")
+    num_beams, plan = NUM_BEAMS, None
+    if deadline_s is not None:
+        # Each chunk also costs about max_len/chunk_tokens of a row in the reduce stage
+        plan = budget.plan("summary", deadline_s, len(chunks), NUM_BEAMS, max_len, reducible_rows=True,
+                           row_weight=1 + max_len / chunk_tokens if len(chunks) > 1 else 1.0, started=started)
+        num_beams, max_len = plan["beams"], plan["max_tokens"]
+        min_len = min(min_len, max_len // 2)
+        if plan["rows"] < len(chunks):
+            # Fewer chunks: keep only the most salient sentences that fit in them (with
+            # slack for sentence boundaries, so packing does not spill into one more chunk)
+            selected = _preselect(text, tokenizer, plan["rows"] * chunk_tokens * 9 // 10, stats)
+            chunks = _chunk(selected, tokenizer, model_name, chunk_tokens, overlap_sentences)
+        stats.update(deadline_s=deadline_s, estimated_s=plan["estimated_s"], degradations=plan["degradations"])
+
+    chunk_summaries: List[str] = [""] * len(chunks)
+    finished = 0
+    summaries = iter_summaries(chunks, model_name, min_len, max_len, batch_size, bucketed, num_beams)
+    for indices, decoded in summaries:
+        for i, out in zip(indices, decoded):
+            chunk_summaries[i] = out
+        finished += len(indices)
+        yield {"stage": "chunk", "text": " ".join(d for d in decoded if d),
+               "done": finished, "total": len(chunks)}
+        if finished < len(chunks) and budget.expired(plan):
+            summaries.close()
+            plan["degradations"].append(f"skipped {len(chunks) - finished} of {len(chunks)} chunks (deadline)")
+            break
+    chunk_summaries = [s for s in chunk_summaries if s]
 
     if not chunk_summaries:
-        return "", {}
+        yield {"stage": "final", "text": "", "rouge": {}}
+        return
 
-    # Combine chunk summaries
-    if len(chunk_summaries) == 1:
-        summary = chunk_summaries[0]
-    else:
-        combined = " ".join(chunk_summaries)
-        try:
-            inputs = tokenizer(combined, truncation=True, padding="longest", return_tensors="pt", max_length=1024)
-            for k, v in inputs.items():
-                inputs[k] = v.to(device)
-
-            output_ids = model.generate(
-                inputs["input_ids"],
-                max_length=max_len,
-                min_length=max(min_len, 20),
-                num_beams=6,
-                length_penalty=2.0,
-                early_stopping=True
-            )
-            summary = clean_generated_text(tokenizer.decode(output_ids[0], skip_special_tokens=True))
-        except Exception as e:
-            logging.warning(f"Final summarization failed: {e}")
-            summary = " ".join(chunk_summaries)
+    # Reduce chunk summaries level by level
+    stats["chunks"] = len(chunks)
+    if len(chunk_summaries) > 1 and num_beams > 1 and budget.expired(plan):
+        plan["degradations"].append(f"reduce beams {num_beams}→1 (deadline)")
+        num_beams = 1
+    with metrics.span("reduce"):
+        summary = reduce_summaries(chunk_summaries, model_name, min_len, max_len, chunk_tokens, batch_size, stats,
+                                   num_beams)
+    metrics.observe("summary_tree_depth", stats["depth"])
+    logging.info(f"Summary tree: {stats['chunks']} chunks, depth {stats['depth']}, fan-out {stats['fan_out']}")
 
     # ---------- Compute ROUGE ----------
-    rouge_scores = {}
-    if rouge_scorer:
-        scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
-        scores = scorer.score(text, summary)
-        rouge_scores = {k: v.fmeasure for k, v in scores.items()}
+    # Against the full text, so fast-mode scores stay comparable with the others
+    rouge_scores = rouge.score(text, summary)
+
+    # Degraded results are not what the cache key promises
+    if use_cache and summary and not (plan and plan["degradations"]):
+        result_cache.put(cache_key, {"summary": summary, "rouge": rouge_scores, "stats": dict(stats)}, "summary")
+    stats["cache"] = "miss"
+
+    yield {"stage": "final", "text": summary, "rouge": rouge_scores}
+
+def summarize_text(text: str, model_name: str = DEFAULT_MODEL, summary_length: str = "medium",
+                   chunk_tokens: int = DEFAULT_CHUNK_TOKENS, overlap_sentences: int = 0,
+                   batch_size: int = DEFAULT_BATCH_SIZE,
+                   stats: Optional[dict] = None, use_cache: bool = True,
+                   extract_budget: Optional[int] = None,
+                   deadline_s: Optional[float] = None) -> Tuple[str, Dict[str, float]]:
+    """
+    Summarize text of any length.
+    With ``extract_budget`` (default FAST_BUDGET_TOKENS for summary_length
+    "fast", otherwise off) only the most salient sentences within that many
+    tokens are kept first, in document order.
+    The text is cut into chunks of at most ``chunk_tokens`` tokens at sentence
+    boundaries (optionally overlapping by ``overlap_sentences``), the chunks
+    are summarized in batches of ``batch_size``, and the chunk summaries are
+    reduced as a tree until they fit one context window.
+    Pass a dict as ``stats`` to receive chunk count, tree depth and fan-out
+    (and the extractive sentence/token counts).
+    ``deadline_s`` is a latency budget in seconds: beams, chunks and max
+    tokens are reduced as needed to meet it, and stats["degradations"]
+    lists what was reduced.
+    Results are served from the result cache when ``use_cache`` is set.
+    """
+    started = time.perf_counter()
+    stats = stats if stats is not None else {}
+    text = (text or "").strip()
+    if not text:
+        return "", {}
+
+    final: Dict[str, object] = {"text": "", "rouge": {}}
+    for event in _summarize_events(text, model_name, summary_length, chunk_tokens, overlap_sentences,
+                                   batch_size, stats, use_cache, bucketed=True, extract_budget=extract_budget,
+                                   deadline_s=deadline_s, started=started):
+        if event["stage"] == "final":
+            final = event
+    return final["text"], final["rouge"]
+
+def summarize_text_stream(text: str, model_name: str = DEFAULT_MODEL, summary_length: str = "medium",
+                          chunk_tokens: int = DEFAULT_CHUNK_TOKENS, overlap_sentences: int = 0,
+                          batch_size: int = DEFAULT_BATCH_SIZE, stats: Optional[dict] = None,
+                          use_cache: bool = True, extract_budget: Optional[int] = None,
+                          deadline_s: Optional[float] = None) -> Iterator[Dict[str, object]]:
+    """
+    Streaming variant of summarize_text.
+    Yields {"stage": "chunk", "text", "done", "total"} as map-stage batches
+    finish in document order, then {"stage": "final", "text", "rouge"}.
+    Closing the generator early stops further generation.
+    """
+    started = time.perf_counter()
+    stats = stats if stats is not None else {}
+    text = (text or "").strip()
+    if not text:
+        yield {"stage": "final", "text": "", "rouge": {}}
+        return
+
+    yield from _summarize_events(text, model_name, summary_length, chunk_tokens, overlap_sentences,
+                                 batch_size, stats, use_cache, bucketed=False, extract_budget=extract_budget,
+                                 deadline_s=deadline_s, started=started)
+
+def summarize_many(texts: List[str], model_name: str = DEFAULT_MODEL, summary_length: str = "medium",
+                   chunk_tokens: int = DEFAULT_CHUNK_TOKENS, overlap_sentences: int = 0,
+                   batch_size: int = DEFAULT_BATCH_SIZE, use_cache: bool = True,
+                   extract_budget: Optional[int] = None) -> List[Tuple[str, Dict[str, float]]]:
+    """
+    Summarize several documents at once.
+    Map-stage chunks of all uncached documents share batched generate calls;
+    each document is then reduced on its own. Returns (summary, rouge) per text.
+    """
+    results: List[Tuple[str, Dict[str, float]]] = [("", {})] * len(texts)
+    extract_tokens = _extract_budget(summary_length, extract_budget)
+    pending = []  # (index, text, cache key)
+    for i, text in enumerate(texts):
+        text = (text or "").strip()
+        if not text:
+            continue
+        key = _cache_key(text, model_name, summary_length, chunk_tokens, overlap_sentences, extract_tokens)
+        cached = result_cache.get(key) if use_cache else None
+        if cached is not None:
+            results[i] = (cached["summary"], cached["rouge"])
+        else:
+            pending.append((i, text, key))
+    if not pending:
+        return results
+
+    tokenizer = get_backend().tokenizer(model_name)
+    min_len, max_len = length_map.get(summary_length, (80, 120))
+    chunk_tokens = min(chunk_tokens, MAX_INPUT_TOKENS - 1)
+
+    all_chunks: List[str] = []
+    spans = []
+    extract_stats = []
+    for _, text, _ in pending:
+        extract_stats.append({})
+        selected = _preselect(text, tokenizer, extract_tokens, extract_stats[-1])
+        chunks = _chunk(selected, tokenizer, model_name, chunk_tokens, overlap_sentences)
+        spans.append((len(all_chunks), len(all_chunks) + len(chunks)))
+        all_chunks.extend(chunks)
+    chunk_summaries = generate_summaries(all_chunks, model_name, min_len, max_len, batch_size)
 
-    return summary, rouge_scores
+    for (i, text, key), (start, end), extracted in zip(pending, spans, extract_stats):
+        own = [s for s in chunk_summaries[start:end] if s]
+        if not own:
+            continue
+        stats = {"chunks": end - start, **extracted}
+        summary = reduce_summaries(own, model_name, min_len, max_len, chunk_tokens, batch_size, stats)
+        rouge_scores = rouge.score(text, summary)
+        if use_cache and summary:
+            result_cache.put(key, {"summary": summary, "rouge": rouge_scores, "stats": stats}, "summary")
+        results[i] = (summary, rouge_scores)
+    return results
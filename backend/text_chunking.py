@@ -0,0 +1,73 @@
+"""
+Sentence splitting and token-aware chunking shared by the Pegasus modules.
+Chunks are cut on tokenizer token counts at sentence boundaries, so no text
+is silently truncated by the model's max input length.
+"""
+
+import re
+from typing import List
+
+def split_into_sentences(text: str) -> list:
+    """Split text into sentences using regex (avoiding NLTK)."""
+    sentences = re.split(r'(?<=[.!?]) +', text)
+    return [s.strip() for s in sentences if s.strip()]
+
+def length_buckets(lengths: List[int], batch_size: int) -> List[List[int]]:
+    """Group indices into batches of similar length so padding stays small."""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+def _split_long_sentence(ids: List[int], tokenizer, max_tokens: int) -> List[str]:
+    """Cut a sentence that alone exceeds the budget into token windows."""
+    return [tokenizer.decode(ids[i:i + max_tokens], skip_special_tokens=True)
+            for i in range(0, len(ids), max_tokens)]
+
+def pack_by_tokens(lengths: List[int], max_tokens: int, overlap: int = 0) -> List[List[int]]:
+    """
+    Greedily pack consecutive items into groups whose token lengths sum to at
+    most ``max_tokens``; the last ``overlap`` items of a group are repeated at
+    the start of the next one when they leave room for it.
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    current_len = 0
+    for i, n in enumerate(lengths):
+        if current and current_len + n > max_tokens:
+            groups.append(current)
+            carry = current[-overlap:] if overlap > 0 else []
+            while carry and sum(lengths[j] for j in carry) + n > max_tokens:
+                carry = carry[1:]
+            current = list(carry)
+            current_len = sum(lengths[j] for j in current)
+        current.append(i)
+        current_len += n
+
+    if current:
+        groups.append(current)
+    return groups
+
+def chunk_by_tokens(text: str, tokenizer, max_tokens: int = 1000,
+                    overlap_sentences: int = 0) -> List[str]:
+    """
+    Pack sentences into chunks of at most ``max_tokens`` tokens.
+    The last ``overlap_sentences`` sentences of a chunk are repeated at the
+    start of the next one to keep context across the boundary.
+    """
+    sentences = split_into_sentences(text)
+    if not sentences:
+        return []
+
+    token_ids = tokenizer(sentences, add_special_tokens=False)["input_ids"]
+    pieces: List[str] = []
+    lengths: List[int] = []
+    for sent, ids in zip(sentences, token_ids):
+        if len(ids) > max_tokens:
+            for part in _split_long_sentence(ids, tokenizer, max_tokens):
+                pieces.append(part)
+                lengths.append(max_tokens)
+        else:
+            pieces.append(sent)
+            lengths.append(len(ids))
+
+    return [" ".join(pieces[j] for j in group)
+            for group in pack_by_tokens(lengths, max_tokens, overlap_sentences)]
@@ -1,64 +1,186 @@
-import textstat
-import matplotlib.pyplot as plt
+"""
+Readability scoring.
+The text is tokenized once and every index (Flesch-Kincaid, Gunning Fog,
+SMOG, Flesch Reading Ease, Coleman-Liau) is derived from the same counts.
+Syllables are counted per distinct word through a memoized counter, and the
+matplotlib chart is only built when asked for.
 
-def calculate_readability(text):
+Words, sentences, syllables and difficult words follow textstat's
+definitions, so the scores match textstat.flesch_kincaid_grade,
+gunning_fog and smog_index (up to rounding) whenever textstat is installed.
+"""
+
+import importlib.resources
+import math
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
+
+from backend import metrics
+from backend.startup import lazy_import
+
+# textstat's tokenization: apostrophes survive only in contractions, other punctuation
+# (hyphens included) is dropped, and sentences of two words or fewer are not counted
+_SENTENCE_RE = re.compile(r"\b[^.!?]+[.!?]*")
+_NONCONTRACTION_APOSTROPHE_RE = re.compile(r"'(?!(?:[tsd]|ve|ll|re))")
+_PUNCTUATION_RE = re.compile(r"[^\w\s']")
+_VOWEL_GROUPS_RE = re.compile(r"[aeiouy]+")
+
+# Difficult words (Gunning Fog) have this many syllables and are not on the easy-word list
+DIFFICULT_SYLLABLES = 3
+
+# Grade-level indices used for the overall category and the chart
+GRADE_METRICS = ["Flesch-Kincaid Grade", "Gunning Fog Index", "SMOG Index"]
+
+_textstat = None
+
+def _get_textstat():
+    """textstat module, imported on first use (False when unavailable)."""
+    global _textstat
+    if _textstat is None:
+        try:
+            _textstat = lazy_import("textstat")
+        except ImportError:
+            _textstat = False
+    return _textstat
+
+@lru_cache(maxsize=1)
+def easy_words() -> FrozenSet[str]:
+    """textstat's Dale-Chall easy-word list (empty without textstat)."""
+    if not _get_textstat():
+        return frozenset()
+    try:
+        resource = importlib.resources.files("textstat").joinpath("resources/en/easy_words.txt")
+        with resource.open(encoding="utf-8") as f:
+            return frozenset(line.strip() for line in f)
+    except (FileNotFoundError, ModuleNotFoundError):
+        return frozenset()
+
+def _words(text: str) -> List[str]:
+    return _PUNCTUATION_RE.sub("", _NONCONTRACTION_APOSTROPHE_RE.sub("", text)).split()
+
+@lru_cache(maxsize=50_000)
+def syllable_count(word: str) -> int:
+    """Syllables in one lowercase word (memoized)."""
+    textstat = _get_textstat()
+    if textstat:
+        return max(1, textstat.syllable_count(word))
+    groups = len(_VOWEL_GROUPS_RE.findall(word))
+    if word.endswith("e") and groups > 1 and not word.endswith("le"):
+        groups -= 1
+    return max(1, groups)
+
+def text_statistics(text: str) -> Dict[str, int]:
+    """Sentence, word, letter, syllable, polysyllable and difficult-word counts from a single pass."""
+    sentences = sum(1 for s in _SENTENCE_RE.findall(text) if len(_words(s)) > 2)
+    easy = easy_words()
+    words = letters = syllables = polysyllables = difficult = 0
+    for word in _words(text):
+        word = word.lower()
+        count = syllable_count(word)
+        words += 1
+        letters += sum(ch.isalpha() for ch in word)
+        syllables += count
+        polysyllables += count >= 3
+        difficult += count >= DIFFICULT_SYLLABLES and word not in easy
+    return {
+        "sentences": max(sentences, 1),
+        "words": words,
+        "letters": letters,
+        "syllables": syllables,
+        "polysyllables": polysyllables,
+        "difficult_words": difficult,
+    }
+
+def scores_from_statistics(stats: Dict[str, int]) -> Dict[str, float]:
+    """All readability indices from shared counts."""
+    words, sentences = stats["words"], stats["sentences"]
+    if words == 0:
+        return {}
+    asl = words / sentences                 # average sentence length
+    asw = stats["syllables"] / words        # average syllables per word
+    difficult_share = stats["difficult_words"] / words
+
+    fk = 0.39 * asl + 11.8 * asw - 15.59
+    gf = 0.4 * (asl + 100 * difficult_share)
+    smog = 1.043 * math.sqrt(stats["polysyllables"] * 30 / sentences) + 3.1291
+    if words < 50:
+        smog = min(smog, (fk + gf) / 2)
+
+    return {
+        "Flesch-Kincaid Grade": round(fk, 2),
+        "Gunning Fog Index": round(gf, 2),
+        "SMOG Index": round(smog, 2),
+        "Flesch Reading Ease": round(206.835 - 1.015 * asl - 84.6 * asw, 2),
+        "Coleman-Liau Index": round(0.0588 * (stats["letters"] / words * 100)
+                                    - 0.296 * (sentences / words * 100) - 15.8, 2),
+    }
+
+def overall_category(scores: Dict[str, float]) -> str:
+    avg_score = sum(scores[m] for m in GRADE_METRICS) / len(GRADE_METRICS)
+    if avg_score <= 4:
+        return "Beginner"
+    elif avg_score <= 8:
+        return "Intermediate"
+    return "Advanced"
+
+def build_readability_chart(scores: Dict[str, float]):
+    """Matplotlib bar chart of the grade-level indices (imports matplotlib on first use)."""
+    plt = lazy_import("matplotlib.pyplot")
+
+    raw_values = [scores[m] for m in GRADE_METRICS]
+    labels = ["Flesch-Kincaid", "Gunning Fog", "SMOG"]
+    colors = ["green" if x <= 4 else "orange" if x <= 8 else "red" for x in raw_values]
+    top = max(max(raw_values), 1)
+
+    fig, ax = plt.subplots(figsize=(5, 3))
+    bars = ax.bar(labels, raw_values, color=colors, width=0.5)
+    ax.set_ylim(0, top * 1.1)
+    ax.set_ylabel("Score")
+    ax.set_title("Readability Scores")
+
+    for bar, val in zip(bars, raw_values):
+        height = bar.get_height()
+        ax.text(
+            bar.get_x() + bar.get_width() / 2,
+            height + (top * 0.02),
+            f"{val:.2f}",
+            ha='center',
+            fontsize=10,
+            fontweight='bold'
+        )
+
+    plt.tight_layout()
+    return fig
+
+def calculate_readability(text, with_chart=True):
     """
-    Calculates readability scores and generates a matplotlib bar chart.
+    Calculates readability scores and optionally a matplotlib bar chart.
     Returns:
         scores: dict of individual readability scores
         overall_cat: string (Beginner / Intermediate / Advanced)
-        fig: matplotlib figure
+        fig: matplotlib figure, or None when with_chart is False
     """
     text = text.replace("<n>", " ").replace("\n", " ").strip()
     if not text:
         return {}, "⚠️ No valid text provided", None
 
     try:
-        fk = textstat.flesch_kincaid_grade(text)
-        gf = textstat.gunning_fog(text)
-        smog = textstat.smog_index(text)
-
-        num_words = len(text.split())
-        if num_words < 50:
-            smog = min(smog, (fk + gf) / 2)
-
-        scores = {
-            "Flesch-Kincaid Grade": fk,
-            "Gunning Fog Index": gf,
-            "SMOG Index": smog
-        }
-
-        avg_score = (fk + gf + smog) / 3
-        if avg_score <= 4:
-            overall_cat = "Beginner"
-        elif avg_score <= 8:
-            overall_cat = "Intermediate"
-        else:
-            overall_cat = "Advanced"
-
-        raw_values = [fk, gf, smog]
-        labels = ["Flesch-Kincaid", "Gunning Fog", "SMOG"]
-        colors = ["green" if x <= 4 else "orange" if x <= 8 else "red" for x in raw_values]
-
-        fig, ax = plt.subplots(figsize=(5, 3))
-        bars = ax.bar(labels, raw_values, color=colors, width=0.5)
-        ax.set_ylim(0, max(raw_values) * 1.1)
-        ax.set_ylabel("Score")
-        ax.set_title("Readability Scores")
-
-        for bar, val in zip(bars, raw_values):
-            height = bar.get_height()
-            ax.text(
-                bar.get_x() + bar.get_width() / 2,
-                height + (max(raw_values) * 0.02),
-                f"{val:.2f}",
-                ha='center',
-                fontsize=10,
-                fontweight='bold'
-            )
-
-        plt.tight_layout()
+        with metrics.span("readability"):
+            scores = scores_from_statistics(text_statistics(text))
+        if not scores:
+            return {}, "⚠️ No valid text provided", None
+        overall_cat = overall_category(scores)
+        fig = build_readability_chart(scores) if with_chart else None
         return scores, overall_cat, fig
 
     except Exception as e:
         return {}, f"❌ Error calculating readability: {e}", None
+
+def calculate_readability_batch(texts: List[str]) -> List[Tuple[Dict[str, float], str]]:
+    """Score many documents; the syllable memo is shared across all of them."""
+    results = []
+    for text in texts:
+        scores, overall_cat, _ = calculate_readability(text or "", with_chart=False)
+        results.append((scores, overall_cat))
+    return results
@@ -0,0 +1,270 @@
+"""
+Offline benchmark suite for the backend hot paths.
+Covers summarization, paraphrasing, readability, ROUGE scoring and the
+user_db writes/reads on short, medium and book-length inputs. The model is a
+tiny randomly initialized Pegasus registered under the default model name,
+so nothing is downloaded. Reports latency percentiles, throughput and the
+RSS growth of each benchmark, writes JSON, and exits non-zero when a stored
+baseline regresses.
+
+Usage:
+    python -m benchmarks.hot_paths [--output bench.json] [--baseline benchmarks/baseline.json]
+                                   [--threshold 0.25] [--save-baseline] [--only rouge readability]
+"""
+
+import os
+import tempfile
+
+# Offline, uncached and on a scratch database; set before the backend modules read them.
+# The database path is always overridden so runs never write to a real database, and the
+# encoder cache is always off so repeated runs time the cold path (see bench_model).
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ.setdefault("TEXTMORPH_CACHE", "0")
+os.environ["TEXTMORPH_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="textmorph-bench-"), "bench.db")
+os.environ["TEXTMORPH_ENCODER_CACHE_MB"] = "0"
+
+import argparse
+import json
+import platform
+import resource
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.tiny_model import synthetic_text
+
+SIZES = {"short": 120, "medium": 1_500, "book": 60_000}   # words
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.25   # fail when p50 is more than 25% above the baseline
+ENCODER_CACHE_MB = 256     # only for the repeat-decode case
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+def current_rss_mb() -> float:
+    """Current resident set size; falls back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mb()
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def measure(fn: Callable[[], object], runs: int, warmup: int = 1, units: float = 1.0, unit: str = "calls",
+            setup: Optional[Callable[[], None]] = None) -> Dict[str, object]:
+    """
+    Time ``fn`` over ``runs`` calls; throughput is ``units`` (e.g. words per
+    call) per second. Memory is reported as the RSS change over the
+    benchmark, since the process peak only ever shows the largest one so far.
+    """
+    rss_before = current_rss_mb()
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    latencies: List[float] = []
+    for _ in range(runs):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    mean = statistics.fmean(latencies)
+    return {
+        "runs": runs,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(mean * 1000, 3),
+        "throughput_per_s": round(units / mean, 2) if mean else 0.0,
+        "throughput_unit": unit,
+        "rss_delta_mb": round(current_rss_mb() - rss_before, 1),
+    }
+
+# ---------- BENCHMARKS ----------
+def bench_readability(texts: Dict[str, str], runs: int) -> Dict[str, dict]:
+    from backend import text_readability
+    results = {}
+    for size, text in texts.items():
+        # Cold syllable memo each run, as for a new document
+        results[f"readability/{size}"] = measure(
+            lambda: text_readability.calculate_readability(text, with_chart=False), runs,
+            units=len(text.split()), unit="words", setup=text_readability.syllable_count.cache_clear)
+    return results
+
+def bench_rouge(texts: Dict[str, str], runs: int) -> Dict[str, dict]:
+    from backend import rouge
+    results = {}
+    for size, text in texts.items():
+        words = text.split()
+        candidate = " ".join(words[: max(20, len(words) // 10)])
+        results[f"rouge/{size}/cold"] = measure(lambda: rouge.score(text, candidate), runs,
+                                                units=len(words), unit="words", setup=rouge._references.clear)
+        results[f"rouge/{size}/cached"] = measure(lambda: rouge.score(text, candidate), runs,
+                                                  units=len(words), unit="words")
+    return results
+
+def bench_user_db(texts: Dict[str, str], runs: int) -> Dict[str, dict]:
+    from database import user_db
+    text = synthetic_text(800, seed=7)
+    counter = iter(range(10**9))
+    results = {
+        "user_db/save_processed_text": measure(
+            lambda: user_db.save_processed_text("bench", "summary", f"{text} {next(counter)}", "summary"), runs),
+        "user_db/save_processed_texts_x100": measure(
+            lambda: user_db.save_processed_texts(
+                "bench", "summary", [(f"{text} {next(counter)}", "summary") for _ in range(100)]),
+            max(3, runs // 5), units=100, unit="rows"),
+    }
+    results["user_db/get_history_page"] = measure(lambda: user_db.get_history("bench", 20), runs)
+    results["user_db/search_history"] = measure(lambda: user_db.search_history("bench", "council transport"), runs)
+    return results
+
+def bench_model(texts: Dict[str, str], runs: int) -> Dict[str, dict]:
+    from backend import encoder_cache
+    from backend.model_manager import DEFAULT_MODEL
+    from backend.paraphrasing import generate_paraphrase
+    from backend.summarization import summarize_text
+    from benchmarks.tiny_model import register_tiny_model
+
+    register_tiny_model(DEFAULT_MODEL)
+    results = {}
+    for size, text in texts.items():
+        # Book-length inputs are fewer runs: one call already covers dozens of chunks
+        n = runs if size != "book" else max(1, runs // 5)
+        results[f"summarize/{size}"] = measure(lambda: summarize_text(text, use_cache=False), n,
+                                               units=len(text.split()), unit="words")
+        results[f"summarize/{size}/fast"] = measure(
+            lambda: summarize_text(text, summary_length="fast", use_cache=False), runs,
+            units=len(text.split()), unit="words")
+        if size == "medium":
+            # Another length for the same document: with the encoder cache on, only the decoder runs again
+            lengths = iter(["short", "long"] * (n + 1))
+            encoder_cache.set_max_mb(ENCODER_CACHE_MB)
+            try:
+                results[f"summarize/{size}/other_length"] = measure(
+                    lambda: summarize_text(text, summary_length=next(lengths), use_cache=False), n,
+                    units=len(text.split()), unit="words")
+            finally:
+                encoder_cache.set_max_mb(0)
+        if size != "book":
+            results[f"paraphrase/{size}"] = measure(lambda: generate_paraphrase(text, use_cache=False), n,
+                                                    units=len(text.split()), unit="words")
+    return results
+
+def bench_assisted(texts: Dict[str, str], runs: int) -> Dict[str, dict]:
+    """Greedy summaries with and without a one-layer draft model sharing the tokenizer."""
+    from backend import assisted
+    from backend.model_manager import DEFAULT_MODEL, register_model
+    from backend.summarization import summarize_text
+    from benchmarks.tiny_model import build_model, register_tiny_model
+
+    tokenizer, _ = register_tiny_model(DEFAULT_MODEL, layers=4)
+    register_model("tiny-draft", tokenizer, build_model(len(tokenizer), layers=1, seed=1))
+    results = {}
+    for size in ("short", "medium"):
+        text = texts[size]
+        assisted.set_draft_model("summary", "tiny-draft")
+        assisted.reset_stats()
+        try:
+            result = measure(lambda: summarize_text(text, use_cache=False), runs,
+                             units=len(text.split()), unit="words")
+        finally:
+            assisted.set_draft_model("summary", None)
+        acceptance = assisted.acceptance_stats().get("summary", {})
+        result["acceptance_rate"] = round(acceptance.get("acceptance_rate", 0.0), 3)
+        result["tokens_per_pass"] = round(acceptance.get("tokens_per_pass", 0.0), 3)
+        results[f"summarize/{size}/assisted"] = result
+    return results
+
+BENCHMARKS = {
+    "readability": bench_readability,
+    "rouge": bench_rouge,
+    "user_db": bench_user_db,
+    "model": bench_model,
+    "assisted": bench_assisted,
+}
+
+def run(groups: List[str], runs: int, sizes: Dict[str, int] = SIZES) -> Dict[str, object]:
+    texts = {size: synthetic_text(words, seed=i) for i, (size, words) in enumerate(sizes.items())}
+    results: Dict[str, dict] = {}
+    for group in groups:
+        start = time.perf_counter()
+        results.update(BENCHMARKS[group](texts, runs))
+        print(f"{group}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "runs": runs,
+            "sizes_words": sizes,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+# ---------- BASELINE ----------
+def compare(report: Dict[str, object], baseline: Dict[str, object], threshold: float) -> List[str]:
+    """Names of benchmarks whose p50 is more than ``threshold`` above the baseline's."""
+    regressions = []
+    for name, current in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("p50_ms"):
+            continue
+        ratio = current["p50_ms"] / base["p50_ms"]
+        current["vs_baseline"] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: p50 {current['p50_ms']} ms vs baseline {base['p50_ms']} ms "
+                               f"(+{(ratio - 1) * 100:.0f}%)")
+    return regressions
+
+def print_table(report: Dict[str, object]) -> None:
+    print(f"{'benchmark':40} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'units/s':>12} {'Δrss MB':>8} {'vs base':>8}")
+    for name, r in report["results"].items():
+        print(f"{name:40} {r['p50_ms']:>10} {r['p90_ms']:>10} {r['p99_ms']:>10} "
+              f"{r['throughput_per_s']:>12} {r['rss_delta_mb']:>8} {r.get('vs_baseline', ''):>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend hot paths offline.")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed p50 slowdown versus the baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args()
+
+    report = run(args.only, args.runs)
+
+    regressions: List[str] = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+    print_table(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+
+    if regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
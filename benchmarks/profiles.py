@@ -0,0 +1,84 @@
+"""
+Inference profile benchmark.
+Runs summarization and paraphrasing under each inference profile and reports
+latency plus ROUGE drift against the fp32 baseline output.
+
+Usage:
+    python -m benchmarks.profiles [--text FILE] [--runs 3] [--profiles fp32 int8 bf16]
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Dict, List
+
+from backend import model_manager, rouge
+from backend.paraphrasing import generate_paraphrase
+from backend.summarization import summarize_text
+
+SAMPLE_TEXT = (
+    "The city council met on Tuesday to discuss the new public transport plan. "
+    "Officials proposed adding three bus routes that connect the northern suburbs to the city centre. "
+    "Residents have complained for years that the current service is slow and unreliable. "
+    "The plan also includes dedicated bus lanes on the main avenue during rush hour. "
+    "Some shop owners worry that the lanes will reduce parking and hurt their business. "
+    "The council will vote on the proposal next month after a period of public consultation. "
+    "If approved, construction of the new lanes could begin early next year. "
+    "Transport experts say faster buses could cut car traffic in the centre by a tenth."
+)
+
+def _time_runs(fn, runs: int) -> Dict[str, object]:
+    latencies: List[float] = []
+    output = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = fn()
+        latencies.append(time.perf_counter() - start)
+    return {"output": output, "median_s": statistics.median(latencies), "min_s": min(latencies)}
+
+def run(text: str, profiles: List[str], runs: int) -> Dict[str, dict]:
+    tasks = {
+        "summary": lambda: summarize_text(text, use_cache=False)[0],
+        "paraphrase": lambda: generate_paraphrase(text, use_cache=False),
+    }
+
+    results: Dict[str, dict] = {}
+    baseline: Dict[str, str] = {}
+    for profile in ["fp32"] + [p for p in profiles if p != "fp32"]:
+        model_manager.set_inference_profile(profile)
+        model_manager.get_model()  # Load outside the timed runs
+        results[profile] = {}
+        for task, fn in tasks.items():
+            timing = _time_runs(fn, runs)
+            output = timing.pop("output")
+            if profile == "fp32":
+                baseline[task] = output
+            drift = rouge.score(baseline[task], output)
+            timing["rouge_vs_fp32"] = {k: round(v, 4) for k, v in drift.items()}
+            timing["speedup"] = round(results["fp32"][task]["median_s"] / timing["median_s"], 2) \
+                if profile != "fp32" else 1.0
+            results[profile][task] = timing
+        results[profile]["memory_mb"] = model_manager.total_memory_mb()
+        model_manager.unload_model(model_manager.DEFAULT_MODEL, profile)
+
+    model_manager.set_inference_profile("fp32")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inference profiles against fp32.")
+    parser.add_argument("--text", help="Input text file (defaults to a bundled sample)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--profiles", nargs="+", default=list(model_manager.PROFILES),
+                        choices=model_manager.PROFILES)
+    args = parser.parse_args()
+
+    text = SAMPLE_TEXT
+    if args.text:
+        with open(args.text, encoding="utf-8") as f:
+            text = f.read()
+
+    print(json.dumps(run(text, args.profiles, args.runs), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+A tiny, randomly initialized Pegasus model and a word-level tokenizer built
+locally, so benchmarks exercise the real generate/chunking code paths without
+downloading weights. Outputs are gibberish, but the cost still scales with
+input and output length the way the real model's does.
+"""
+
+import random
+from typing import List
+
+WORDS = (
+    "the a city council plan transport bus route new public service residents officials proposal "
+    "vote month year road traffic centre lane parking shop owner business expert study report data "
+    "model system network energy water school health market price growth policy court law group "
+    "company team project result change people time day week number part place case point fact "
+    "is was will would could should has have had made said found showed reported expected increased "
+    "and or but because while after before during since until although if when where which that "
+    "large small early late major local national fast slow high low strong weak recent current"
+).split()
+
+SPECIAL_TOKENS = ["<pad>", "</s>", "<unk>", "<mask_1>", "<mask_2>"]
+
+def synthetic_text(words: int, seed: int = 0) -> str:
+    """Deterministic pseudo-English text of roughly ``words`` words, in sentences of 8-24 words."""
+    rng = random.Random(seed)
+    sentences: List[str] = []
+    count = 0
+    while count < words:
+        n = rng.randint(8, 24)
+        sentence = " ".join(rng.choice(WORDS) for _ in range(n))
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        count += n
+    return " ".join(sentences)
+
+def build_tokenizer(model_max_length: int = 1024):
+    """WordLevel tokenizer over WORDS, wrapped as a transformers fast tokenizer that appends </s>."""
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast
+
+    vocab = {token: i for i, token in enumerate(SPECIAL_TOKENS)}
+    for word in WORDS + [w.capitalize() for w in WORDS] + [".", ",", "!", "?"]:
+        vocab.setdefault(word, len(vocab))
+
+    tok = Tokenizer(models.WordLevel(vocab=vocab, unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    tok.post_processor = processors.TemplateProcessing(single="$A </s>", pair="$A $B </s>",
+                                                       special_tokens=[("</s>", vocab["</s>"])])
+    tok.decoder = decoders.WordPiece(prefix="##")   # joins words with spaces
+    return PreTrainedTokenizerFast(tokenizer_object=tok, pad_token="<pad>", eos_token="</s>",
+                                   unk_token="<unk>", model_max_length=model_max_length)
+
+def build_model(vocab_size: int, d_model: int = 64, layers: int = 2, seed: int = 0):
+    """Randomly initialized PegasusForConditionalGeneration with a small config."""
+    import torch
+    from transformers import PegasusConfig, PegasusForConditionalGeneration
+
+    torch.manual_seed(seed)
+    config = PegasusConfig(
+        vocab_size=vocab_size,
+        d_model=d_model,
+        encoder_layers=layers,
+        decoder_layers=layers,
+        encoder_attention_heads=4,
+        decoder_attention_heads=4,
+        encoder_ffn_dim=d_model * 4,
+        decoder_ffn_dim=d_model * 4,
+        max_position_embeddings=1024,
+        pad_token_id=0,
+        eos_token_id=1,
+        decoder_start_token_id=0,
+        forced_eos_token_id=1,
+    )
+    return PegasusForConditionalGeneration(config).eval()
+
+def register_tiny_model(model_name: str, d_model: int = 64, layers: int = 2, seed: int = 0):
+    """Build the tiny tokenizer/model pair and register it under ``model_name`` in the shared registry."""
+    from backend.model_manager import register_model
+
+    tokenizer = build_tokenizer()
+    model = build_model(len(tokenizer), d_model=d_model, layers=layers, seed=seed)
+    register_model(model_name, tokenizer, model)
+    return tokenizer, model
@@ -1,10 +1,18 @@
 import sqlite3
 import bcrypt
+import hashlib
+import io
+import json
+import logging
 import os
+import threading
+import zlib
 from datetime import datetime, timedelta, timezone
 
+from database.connection import ConnectionPool, insert_many, transaction
+
 # ---------- DATABASE PATH ----------
-DB_NAME = os.path.join(os.path.dirname(__file__), "user.db")
+DB_NAME = os.environ.get("TEXTMORPH_DB_PATH") or os.path.join(os.path.dirname(__file__), "user.db")
 
 # ---------- TIMEZONE (IST) ----------
 IST = timezone(timedelta(hours=5, minutes=30))  # UTC+5:30
@@ -14,15 +22,35 @@ def _now_iso():
     return datetime.now(IST).isoformat()
 
 # ---------- DB CONNECTION ----------
+_pools = {}
+_pools_lock = threading.Lock()
+
 def get_db():
-    conn = sqlite3.connect(DB_NAME, check_same_thread=False)
-    return conn
+    """Pooled WAL connection to DB_NAME; conn.close() hands it back to the pool."""
+    with _pools_lock:
+        pool = _pools.get(DB_NAME)
+        if pool is None:
+            pool = _pools[DB_NAME] = ConnectionPool(DB_NAME, setup=_register_functions)
+    return pool.acquire()
 
-# ---------- INITIALIZE TABLES ----------
-def init_db():
-    conn = get_db()
-    c = conn.cursor()
+def _text_unpack(codec, data):
+    """SQL text_unpack(codec, data): decoded text of a blobs row."""
+    if data is None:
+        return None
+    data = zlib.decompress(data) if codec == "zlib" else bytes(data)
+    return data.decode("utf-8", errors="ignore")
 
+def _register_functions(conn):
+    # Used by history previews and the search index; never referenced from the schema
+    conn.create_function("text_unpack", 2, _text_unpack, deterministic=True)
+
+# ---------- SCHEMA MIGRATIONS ----------
+def _add_column(c, table, column, decl):
+    columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+def _m001_base_tables(c):
     # Users table
     c.execute("""
         CREATE TABLE IF NOT EXISTS users (
@@ -62,37 +90,513 @@ def init_db():
         )
     """)
 
+def _m002_users_uploaded_file(c):
+    # Formerly backend/fix_db.py
+    _add_column(c, "users", "uploaded_file", "BLOB")
+
+def _m003_jobs(c):
+    # Background jobs table
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            task_type TEXT,      -- "summary" or "paraphrase"
+            params TEXT,         -- JSON task settings
+            input_text TEXT,
+            input_hash TEXT,
+            status TEXT,         -- "queued", "running", "done" or "failed"
+            result TEXT,         -- JSON result when done
+            error TEXT,
+            worker TEXT,
+            created_at TEXT,
+            updated_at TEXT
+        )
+    """)
+
+def _m004_blob_store(c):
+    # Content-addressed blob store: each distinct upload/text is kept once, compressed
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,   -- sha256 of the uncompressed bytes
+            codec TEXT,              -- "zlib" or "raw"
+            size INTEGER,            -- uncompressed bytes
+            data BLOB,
+            created_at TEXT
+        )
+    """)
+    _add_column(c, "uploaded_files", "content_hash", "TEXT")
+    _add_column(c, "processed_text", "original_hash", "TEXT")
+    _add_column(c, "processed_text", "processed_hash", "TEXT")
+    report = _move_inline_texts(c)
+    if any(report.values()):
+        logging.info(f"Moved inline texts to the blob store: {report}")
+
+def _m005_indexes(c):
+    # Per-user lookups done by the pages, the upload dedup check and the job queue
+    c.execute("CREATE INDEX IF NOT EXISTS idx_uploaded_files_user ON uploaded_files (username, uploaded_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_uploaded_files_hash ON uploaded_files (username, content_hash, file_name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_processed_text_user ON processed_text (username, created_at, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_input ON jobs (username, task_type, input_hash)")
+
+def _fts5_available(c):
+    try:
+        c.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        c.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+# Blob text of one processed_text column, for use inside triggers
+_UNPACK = "(SELECT text_unpack(codec, data) FROM blobs WHERE hash = {})"
+
+def _m006_history_search(c):
+    # Contentless FTS5 index over original and processed text, kept in sync by triggers.
+    # The texts themselves stay in the blob store; the index only stores tokens.
+    if not _fts5_available(c):
+        logging.warning("SQLite was built without FTS5; history search falls back to scanning")
+        return
+    c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS processed_text_fts
+        USING fts5(original, processed, content='', tokenize='unicode61 remove_diacritics 2')
+    """)
+    new_values = f"new.id, {_UNPACK.format('new.original_hash')}, {_UNPACK.format('new.processed_hash')}"
+    old_values = f"old.id, {_UNPACK.format('old.original_hash')}, {_UNPACK.format('old.processed_hash')}"
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS processed_text_fts_insert AFTER INSERT ON processed_text
+        WHEN new.original_hash IS NOT NULL BEGIN
+            INSERT INTO processed_text_fts (rowid, original, processed) VALUES ({new_values});
+        END
+    """)
+    # Contentless tables need the old values to remove a row from the index
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS processed_text_fts_delete AFTER DELETE ON processed_text
+        WHEN old.original_hash IS NOT NULL BEGIN
+            INSERT INTO processed_text_fts (processed_text_fts, rowid, original, processed)
+            VALUES ('delete', {old_values});
+        END
+    """)
+    c.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS processed_text_fts_update
+        AFTER UPDATE OF original_hash, processed_hash ON processed_text BEGIN
+            INSERT INTO processed_text_fts (processed_text_fts, rowid, original, processed)
+            SELECT 'delete', {old_values} WHERE old.original_hash IS NOT NULL;
+            INSERT INTO processed_text_fts (rowid, original, processed)
+            SELECT {new_values} WHERE new.original_hash IS NOT NULL;
+        END
+    """)
+    c.execute(f"""
+        INSERT INTO processed_text_fts (rowid, original, processed)
+        SELECT id, {_UNPACK.format('original_hash')}, {_UNPACK.format('processed_hash')}
+        FROM processed_text WHERE original_hash IS NOT NULL
+    """)
+
+def _m007_user_files(c):
+    # Photos and documents move out of the users row into their own table,
+    # so user lookups never drag BLOBs along
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS user_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            file_data BLOB NOT NULL,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    _add_column(c, "user_files", "kind", "TEXT")      # "photo" or "document"
+    _add_column(c, "user_files", "size", "INTEGER")
+    c.execute("UPDATE user_files SET kind=COALESCE(kind, 'document'), size=LENGTH(file_data) WHERE size IS NULL")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_user_files_user ON user_files (username, kind, id)")
+
+    now = _now_iso()
+    c.execute("""
+        INSERT INTO user_files (username, file_name, file_data, uploaded_at, kind, size)
+        SELECT username, 'profile_photo', photo, ?, 'photo', LENGTH(photo) FROM users WHERE photo IS NOT NULL
+    """, (now,))
+    c.execute("""
+        INSERT INTO user_files (username, file_name, file_data, uploaded_at, kind, size)
+        SELECT username, 'uploaded_document', uploaded_file, ?, 'document', LENGTH(uploaded_file)
+        FROM users WHERE uploaded_file IS NOT NULL
+    """, (now,))
+    c.execute("UPDATE users SET photo=NULL, uploaded_file=NULL WHERE photo IS NOT NULL OR uploaded_file IS NOT NULL")
+
+def _m008_drop_history_triggers(c):
+    # Earlier databases kept the search index in sync with triggers that called
+    # text_unpack, which made processed_text unwritable from any connection
+    # without it (sqlite3 CLI, DB browsers). The index is now maintained in Python.
+    for name in ("insert", "delete", "update"):
+        c.execute(f"DROP TRIGGER IF EXISTS processed_text_fts_{name}")
+
+# (version, description, function); append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, "base tables", _m001_base_tables),
+    (2, "users.uploaded_file column", _m002_users_uploaded_file),
+    (3, "jobs table", _m003_jobs),
+    (4, "blob store", _m004_blob_store),
+    (5, "indexes", _m005_indexes),
+    (6, "history full-text index", _m006_history_search),
+    (7, "user_files table for photos and documents", _m007_user_files),
+    (8, "history index maintained by the application", _m008_drop_history_triggers),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations(conn=None):
+    """
+    Apply pending migrations in order, each in its own write transaction, and
+    record the version in PRAGMA user_version. Safe to call from several
+    processes at once; returns the versions this call applied.
+    """
+    own = conn is None
+    conn = conn or get_db()
+    applied = []
+    try:
+        if schema_version(conn) >= SCHEMA_VERSION:
+            return applied
+        conn.isolation_level = None   # explicit BEGIN/COMMIT
+        for version, description, migrate in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if schema_version(conn) >= version:
+                    conn.execute("COMMIT")
+                    continue
+                migrate(conn.cursor())
+                conn.execute(f"PRAGMA user_version={version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            logging.info(f"Applied migration {version}: {description}")
+            applied.append(version)
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.isolation_level = ""
+        if own:
+            conn.close()
+    return applied
+
+# ---------- INITIALIZE TABLES ----------
+_initialized = set()
+_init_lock = threading.Lock()
+
+def init_db():
+    """Bring the schema up to date; only the first call per process and database does any work."""
+    if DB_NAME in _initialized:
+        return
+    with _init_lock:
+        if DB_NAME not in _initialized:
+            run_migrations()
+            _initialized.add(DB_NAME)
+
+# ---------- BLOB STORE ----------
+def _to_bytes(content):
+    return content.encode("utf-8") if isinstance(content, str) else bytes(content or b"")
+
+def put_blob(c, content):
+    """Store content (str or bytes) once under its sha256 and return the hash; uses the caller's cursor."""
+    data = _to_bytes(content)
+    digest = hashlib.sha256(data).hexdigest()
+    if c.execute("SELECT 1 FROM blobs WHERE hash=?", (digest,)).fetchone() is None:
+        packed = zlib.compress(data, 6)
+        codec = "zlib" if len(packed) < len(data) else "raw"
+        c.execute("INSERT OR IGNORE INTO blobs (hash, codec, size, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                  (digest, codec, len(data), packed if codec == "zlib" else data, _now_iso()))
+    return digest
+
+def get_blob(digest, conn=None):
+    """Return the uncompressed bytes stored under ``digest``, or None."""
+    own = conn is None
+    conn = conn or get_db()
+    row = conn.execute("SELECT codec, data FROM blobs WHERE hash=?", (digest,)).fetchone()
+    if own:
+        conn.close()
+    if row is None:
+        return None
+    codec, data = row
+    return zlib.decompress(data) if codec == "zlib" else bytes(data)
+
+def get_blob_text(digest, conn=None):
+    data = get_blob(digest, conn)
+    return data.decode("utf-8", errors="ignore") if data is not None else None
+
+def _db_size(c):
+    return c.execute("PRAGMA page_count").fetchone()[0] * c.execute("PRAGMA page_size").fetchone()[0]
+
+def blob_storage_stats(conn=None):
+    """Bytes the referencing rows represent versus bytes actually stored in the blob store."""
+    own = conn is None
+    conn = conn or get_db()
+    c = conn.cursor()
+    logical = c.execute("""
+        SELECT COALESCE(SUM(b.size), 0) FROM (
+            SELECT content_hash AS h FROM uploaded_files
+            UNION ALL SELECT original_hash FROM processed_text
+            UNION ALL SELECT processed_hash FROM processed_text
+        ) r JOIN blobs b ON b.hash = r.h
+    """).fetchone()[0]
+    blob_count, stored = c.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()
+    if own:
+        conn.close()
+    return {
+        "blobs": blob_count,
+        "logical_bytes": logical,
+        "stored_bytes": stored,
+        "saved_bytes": logical - stored,
+        "ratio": round(stored / logical, 3) if logical else 1.0,
+    }
+
+_UNREFERENCED_BLOBS_SQL = """
+    DELETE FROM blobs WHERE hash NOT IN (
+        SELECT content_hash FROM uploaded_files WHERE content_hash IS NOT NULL
+        UNION SELECT original_hash FROM processed_text WHERE original_hash IS NOT NULL
+        UNION SELECT processed_hash FROM processed_text WHERE processed_hash IS NOT NULL
+    )
+"""
+
+def gc_blobs(conn=None):
+    """Delete blobs no row references any more; returns how many were removed."""
+    own = conn is None
+    conn = conn or get_db()
+    c = conn.cursor()
+    c.execute(_UNREFERENCED_BLOBS_SQL)
+    removed = c.rowcount
     conn.commit()
-    conn.close()
+    if own:
+        conn.close()
+    return removed
+
+def _move_inline_texts(c, batch_size=500):
+    """
+    Move inline texts of uploaded_files/processed_text rows into the blob store
+    and drop repeated copies of the same upload. Runs inside the caller's
+    transaction; returns row counts.
+    """
+    report = {"uploads_moved": 0, "results_moved": 0, "duplicate_uploads_removed": 0}
+    while True:
+        rows = c.execute("""
+            SELECT id, file_content FROM uploaded_files
+            WHERE content_hash IS NULL AND file_content IS NOT NULL LIMIT ?
+        """, (batch_size,)).fetchall()
+        if not rows:
+            break
+        for row_id, content in rows:
+            c.execute("UPDATE uploaded_files SET content_hash=?, file_content=NULL WHERE id=?",
+                      (put_blob(c, content), row_id))
+        report["uploads_moved"] += len(rows)
+
+    while True:
+        rows = c.execute("""
+            SELECT id, original_text, processed_text FROM processed_text
+            WHERE original_hash IS NULL AND (original_text IS NOT NULL OR processed_text IS NOT NULL) LIMIT ?
+        """, (batch_size,)).fetchall()
+        if not rows:
+            break
+        for row_id, original, processed in rows:
+            c.execute("""
+                UPDATE processed_text SET original_hash=?, processed_hash=?, original_text=NULL, processed_text=NULL
+                WHERE id=?
+            """, (put_blob(c, original or ""), put_blob(c, processed or ""), row_id))
+        _index_history(c, [(row_id, original or "", processed or "") for row_id, original, processed in rows])
+        report["results_moved"] += len(rows)
+
+    # Dashboard reruns used to insert the same upload again on every click
+    c.execute("""
+        DELETE FROM uploaded_files WHERE content_hash IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM uploaded_files WHERE content_hash IS NOT NULL
+            GROUP BY username, file_name, content_hash
+        )
+    """)
+    report["duplicate_uploads_removed"] = c.rowcount
+    if any(report.values()):
+        c.execute(_UNREFERENCED_BLOBS_SQL)
+    return report
+
+def migrate_to_blobs(conn=None, vacuum=False):
+    """
+    Move any remaining inline texts into the blob store (migration 4 does this
+    once) and report the space saved; the file only shrinks with ``vacuum``.
+    """
+    own = conn is None
+    conn = conn or get_db()
+    c = conn.cursor()
+    before = _db_size(c)
+    with transaction(conn):
+        report = _move_inline_texts(c)
+    report["db_bytes_before"] = before
+    if vacuum:
+        conn.execute("VACUUM")
+    report["db_bytes_after"] = _db_size(c)
+    report.update(blob_storage_stats(conn))
+    if own:
+        conn.close()
+    return report
 
 # ---------- USER FUNCTIONS ----------
+# Every column except password and the legacy BLOB columns
+USER_COLUMNS = ["id", "username", "email", "name", "age", "gender", "language"]
+
+# Bumped whenever a user's profile changes; sessions compare it to their cached copy
+_profile_versions = {}
+_profile_versions_lock = threading.Lock()
+
 def add_user(username, email, password, name=None, age=None, gender=None, language=None, photo=None):
     conn = get_db()
     c = conn.cursor()
     try:
         hashed_pw = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
         c.execute("""
-            INSERT INTO users (username, email, password, name, age, gender, language, photo)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (username, email, hashed_pw, name, age, gender, language, photo))
+            INSERT INTO users (username, email, password, name, age, gender, language)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (username, email, hashed_pw, name, age, gender, language))
         conn.commit()
-        return True
     except sqlite3.IntegrityError:
         return False
     finally:
         conn.close()
+    if photo:
+        save_user_file(username, "photo", "profile_photo", photo)
+    return True
+
+def _fetch_user(where, params, extra_columns=()):
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    try:
+        return conn.execute(f"SELECT {', '.join(USER_COLUMNS + list(extra_columns))} FROM users WHERE {where}",
+                            params).fetchone()
+    finally:
+        conn.close()
+
+def get_user(identifier):
+    """User fields (no password, no BLOBs) by username or email, as a dict; None if unknown."""
+    row = _fetch_user("email=? OR username=?", (identifier, identifier))
+    return dict(row) if row else None
 
 def check_user(identifier, password):
+    """Return the user dict when the password matches, else None."""
+    row = _fetch_user("email=? OR username=?", (identifier, identifier), extra_columns=["password"])
+    if row and bcrypt.checkpw(password.encode('utf-8'), row["password"]):
+        return {k: row[k] for k in USER_COLUMNS}
+    return None
+
+def get_user_profile(username):
+    """
+    Profile summary for the profile page: user fields plus metadata of the
+    user's stored files (never their bytes). Not cached here: the page keeps
+    it in its session until profile_version(username) changes.
+    """
+    row = _fetch_user("username=?", (username,))
+    if row is None:
+        return None
+    profile = dict(row)
+    profile["files"] = list_user_files(username)
+    profile["photo_id"] = next((f["id"] for f in profile["files"] if f["kind"] == "photo"), None)
+    return profile
+
+def profile_version(username):
+    """Counter that changes whenever the user's profile or stored files change."""
+    with _profile_versions_lock:
+        return _profile_versions.get(username, 0)
+
+def invalidate_profile(username):
+    with _profile_versions_lock:
+        _profile_versions[username] = _profile_versions.get(username, 0) + 1
+
+def update_profile(username, name, age, gender, language, photo=None):
+    """
+    Update profile fields; a new photo (bytes or file object) replaces the
+    stored one. Everything happens in one transaction, so a failed photo
+    upload leaves the old photo and fields in place.
+    """
     conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE email=? OR username=?", (identifier, identifier))
-    user = c.fetchone()
+    try:
+        with transaction(conn, immediate=True):
+            conn.execute("UPDATE users SET name=?, age=?, gender=?, language=? WHERE username=?",
+                         (name, age, gender, language, username))
+            if photo:
+                conn.execute("DELETE FROM user_files WHERE username=? AND kind='photo'", (username,))
+                _write_user_file(conn, username, "photo", "profile_photo", photo)
+    finally:
+        conn.close()
+    invalidate_profile(username)
+    return True
+
+# ---------- USER FILES (chunked BLOB I/O) ----------
+FILE_CHUNK_BYTES = 64 * 1024
+FILE_COLUMNS = ["id", "kind", "file_name", "size", "uploaded_at"]
+
+def _write_user_file(conn, username, kind, file_name, source, size=None):
+    """Insert a user_files row and stream ``source`` into it; runs in the caller's transaction."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        size = len(source)
+        source = io.BytesIO(source)
+    elif size is None:
+        source.seek(0, io.SEEK_END)
+        size = source.tell()
+        source.seek(0)
+
+    c = conn.execute("""
+        INSERT INTO user_files (username, file_name, file_data, uploaded_at, kind, size)
+        VALUES (?, ?, zeroblob(?), ?, ?, ?)
+    """, (username, file_name, size, _now_iso(), kind, size))
+    file_id = c.lastrowid
+    with conn.blobopen("user_files", "file_data", file_id) as blob:
+        written = 0
+        while written < size:
+            chunk = source.read(min(FILE_CHUNK_BYTES, size - written))
+            if not chunk:
+                raise ValueError(f"{file_name}: expected {size} bytes, got {written}")
+            blob.write(chunk)
+            written += len(chunk)
+    return file_id
+
+def save_user_file(username, kind, file_name, source, size=None):
+    """
+    Store a photo/document from bytes or a binary file object. The row is
+    created with a zeroblob and filled chunk by chunk through incremental
+    BLOB I/O, so the file is never held in memory twice. Returns the file id.
+    """
+    conn = get_db()
+    try:
+        with transaction(conn):
+            file_id = _write_user_file(conn, username, kind, file_name, source, size)
+    finally:
+        conn.close()
+    invalidate_profile(username)
+    return file_id
+
+def list_user_files(username, kind=None):
+    """Metadata of a user's stored files, newest first."""
+    sql = f"SELECT {', '.join(FILE_COLUMNS)} FROM user_files WHERE username=?"
+    params = [username]
+    if kind:
+        sql += " AND kind=?"
+        params.append(kind)
+    conn = get_db()
+    rows = [dict(zip(FILE_COLUMNS, row)) for row in conn.execute(sql + " ORDER BY id DESC", params)]
     conn.close()
-    if user:
-        stored_pw = user[3]  # password is in 4th column
-        if bcrypt.checkpw(password.encode('utf-8'), stored_pw):
-            return user
-    return None
+    return rows
+
+def iter_user_file(username, file_id, chunk_size=FILE_CHUNK_BYTES):
+    """Yield a stored file's bytes in chunks (incremental BLOB reads)."""
+    conn = get_db()
+    try:
+        if conn.execute("SELECT 1 FROM user_files WHERE id=? AND username=?", (file_id, username)).fetchone() is None:
+            return
+        with conn.blobopen("user_files", "file_data", file_id, readonly=True) as blob:
+            while True:
+                chunk = blob.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        conn.close()
+
+def read_user_file(username, file_id):
+    """A stored file's bytes, or None if it does not belong to the user."""
+    chunks = list(iter_user_file(username, file_id))
+    return b"".join(chunks) if chunks else None
 
 def reset_password(identifier, new_password):
     """Reset password for a user (by email or username)."""
@@ -108,30 +612,295 @@ def reset_password(identifier, new_password):
     return updated
 
 def save_uploaded_file(username, file_bytes, file_name="uploaded_file.txt"):
+    """Record an upload; the bytes go to the blob store and re-uploads of the same file are not duplicated."""
     conn = get_db()
     c = conn.cursor()
-    try:
-        content = file_bytes.decode("utf-8", errors="ignore")
-    except:
-        content = ""
-    c.execute("""
-        INSERT INTO uploaded_files (username, file_name, file_content, uploaded_at)
-        VALUES (?, ?, ?, ?)
-    """, (username, file_name, content, _now_iso()))
+    content_hash = put_blob(c, file_bytes)
+    c.execute("SELECT 1 FROM uploaded_files WHERE username=? AND file_name=? AND content_hash=?",
+              (username, file_name, content_hash))
+    if c.fetchone() is None:
+        c.execute("""
+            INSERT INTO uploaded_files (username, file_name, content_hash, uploaded_at)
+            VALUES (?, ?, ?, ?)
+        """, (username, file_name, content_hash, _now_iso()))
     conn.commit()
     conn.close()
     return True
 
+# The search index is written here rather than by triggers, so processed_text
+# stays writable from connections that lack text_unpack
+def _fts_ready(c):
+    return c.execute("SELECT 1 FROM sqlite_master WHERE name='processed_text_fts'").fetchone() is not None
+
+def _index_history(c, rows):
+    """Add (id, original, processed) rows to the search index; runs in the caller's transaction."""
+    if rows and _fts_ready(c):
+        c.executemany("INSERT INTO processed_text_fts (rowid, original, processed) VALUES (?, ?, ?)", rows)
+
+def _unindex_history(c, ids):
+    """Remove rows from the index before they are deleted; a contentless index needs their old texts."""
+    if not ids or not _fts_ready(c):
+        return
+    for row_id in ids:
+        row = c.execute(f"""
+            SELECT id, {_UNPACK.format('original_hash')}, {_UNPACK.format('processed_hash')}
+            FROM processed_text WHERE id=? AND original_hash IS NOT NULL
+        """, (row_id,)).fetchone()
+        if row:
+            c.execute("""
+                INSERT INTO processed_text_fts (processed_text_fts, rowid, original, processed)
+                VALUES ('delete', ?, ?, ?)
+            """, row)
+
 def save_processed_text(username, task_type, original_text, processed_text, model="pegasus"):
     conn = get_db()
     c = conn.cursor()
-    c.execute("""
-        INSERT INTO processed_text (username, task_type, original_text, processed_text, model, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (username, task_type, original_text, processed_text, model, _now_iso()))
+    try:
+        with transaction(conn):
+            c.execute("""
+                INSERT INTO processed_text (username, task_type, original_hash, processed_hash, model, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (username, task_type, put_blob(c, original_text), put_blob(c, processed_text), model, _now_iso()))
+            _index_history(c, [(c.lastrowid, original_text, processed_text)])
+    finally:
+        conn.close()
+    return True
+
+def save_processed_texts(username, task_type, pairs, model="pegasus"):
+    """Bulk version of save_processed_text for (original, processed) pairs, in one transaction."""
+    pairs = list(pairs)
+    conn = get_db()
+    c = conn.cursor()
+    now = _now_iso()
+    try:
+        with transaction(conn, immediate=True):
+            count = insert_many(conn, "processed_text",
+                                ["username", "task_type", "original_hash", "processed_hash", "model", "created_at"],
+                                [(username, task_type, put_blob(c, original), put_blob(c, processed), model, now)
+                                 for original, processed in pairs])
+            # Holding the write lock, one executemany gets consecutive ids ending at the last insert
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            _index_history(c, [(last_id - count + 1 + i, original, processed)
+                               for i, (original, processed) in enumerate(pairs)])
+    finally:
+        conn.close()
+    return count
+
+def delete_history_item(username, item_id):
+    """Delete one of the user's history entries and its search index row; returns whether it existed."""
+    conn = get_db()
+    c = conn.cursor()
+    try:
+        with transaction(conn, immediate=True):
+            if c.execute("SELECT 1 FROM processed_text WHERE id=? AND username=?",
+                         (item_id, username)).fetchone() is None:
+                return False
+            _unindex_history(c, [item_id])
+            c.execute("DELETE FROM processed_text WHERE id=?", (item_id,))
+    finally:
+        conn.close()
+    return True
+
+def rebuild_history_index(conn=None):
+    """Re-index every processed text, e.g. after rows were edited outside the app; returns the row count."""
+    own = conn is None
+    conn = conn or get_db()
+    c = conn.cursor()
+    try:
+        if not _fts_ready(c):
+            return 0
+        with transaction(conn, immediate=True):
+            c.execute("INSERT INTO processed_text_fts (processed_text_fts) VALUES ('delete-all')")
+            c.execute(f"""
+                INSERT INTO processed_text_fts (rowid, original, processed)
+                SELECT id, {_UNPACK.format('original_hash')}, {_UNPACK.format('processed_hash')}
+                FROM processed_text WHERE original_hash IS NOT NULL
+            """)
+            return c.rowcount
+    finally:
+        if own:
+            conn.close()
+
+# ---------- HISTORY ----------
+HISTORY_COLUMNS = ["id", "task_type", "model", "created_at", "preview"]
+PREVIEW_CHARS = 200
+
+# List views only decompress the processed text, and only its first characters
+_HISTORY_SELECT = f"""
+    SELECT p.id, p.task_type, p.model, p.created_at,
+           substr({_UNPACK.format('p.processed_hash')}, 1, {PREVIEW_CHARS}) AS preview
+    FROM processed_text p
+"""
+
+def get_history(username, limit=20, cursor=None, task_type=None):
+    """
+    One page of a user's processed texts, newest first, as (rows, next_cursor).
+    Keyset pagination: pass the returned cursor (created_at, id of the last
+    row) to get the next page; next_cursor is None on the last page.
+    """
+    sql = _HISTORY_SELECT + " WHERE p.username=?"
+    params = [username]
+    if task_type:
+        sql += " AND p.task_type=?"
+        params.append(task_type)
+    if cursor:
+        sql += " AND (p.created_at, p.id) < (?, ?)"
+        params.extend(cursor)
+    sql += " ORDER BY p.created_at DESC, p.id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    conn = get_db()
+    rows = [dict(zip(HISTORY_COLUMNS, row)) for row in conn.execute(sql, params)]
+    conn.close()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (rows[-1]["created_at"], rows[-1]["id"]) if has_more else None
+    return rows, next_cursor
+
+def _fts_query(text):
+    """Quote each term so user input is matched literally (terms are ANDed)."""
+    terms = text.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def search_history(username, query, limit=20):
+    """A user's processed texts whose original or processed text matches ``query``, best matches first."""
+    match = _fts_query(query)
+    if not match:
+        return []
+    conn = get_db()
+    try:
+        rows = conn.execute(_HISTORY_SELECT + """
+            JOIN processed_text_fts f ON f.rowid = p.id
+            WHERE processed_text_fts MATCH ? AND p.username=?
+            ORDER BY f.rank LIMIT ?
+        """, (match, username, limit)).fetchall()
+    except sqlite3.OperationalError:
+        # No FTS5 index: scan this user's rows instead
+        needle = query.lower()
+        rows = conn.execute(_HISTORY_SELECT + f"""
+            WHERE p.username=? AND (instr(lower({_UNPACK.format('p.original_hash')}), ?)
+                                    OR instr(lower({_UNPACK.format('p.processed_hash')}), ?))
+            ORDER BY p.created_at DESC, p.id DESC LIMIT ?
+        """, (username, needle, needle, limit)).fetchall()
+    conn.close()
+    return [dict(zip(HISTORY_COLUMNS, row)) for row in rows]
+
+def get_history_item(username, item_id):
+    """Full original and processed text of one of the user's history entries, or None."""
+    conn = get_db()
+    row = conn.execute(f"""
+        SELECT id, task_type, model, created_at,
+               {_UNPACK.format('original_hash')}, {_UNPACK.format('processed_hash')}
+        FROM processed_text WHERE id=? AND username=?
+    """, (item_id, username)).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    return dict(zip(["id", "task_type", "model", "created_at", "original_text", "processed_text"], row))
+
+# ---------- JOB FUNCTIONS ----------
+JOB_COLUMNS = ["id", "username", "task_type", "params", "status", "result", "error", "created_at", "updated_at"]
+
+def _job_row(row):
+    if row is None:
+        return None
+    job = dict(zip(JOB_COLUMNS, row))
+    job["params"] = json.loads(job["params"] or "{}")
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def submit_job(username, task_type, text, params=None):
+    """
+    Queue a summary/paraphrase job and return its id.
+    An identical queued or running job (same user, task, text and params)
+    is reused instead of queueing a duplicate.
+    """
+    params_json = json.dumps(params or {}, sort_keys=True)
+    input_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    conn = get_db()
+    c = conn.cursor()
+    # Check and insert under one write lock, so concurrent submits cannot both insert
+    with transaction(conn, immediate=True):
+        c.execute("""
+            SELECT id FROM jobs
+            WHERE username=? AND task_type=? AND input_hash=? AND params=? AND status IN ('queued', 'running')
+            ORDER BY id LIMIT 1
+        """, (username, task_type, input_hash, params_json))
+        row = c.fetchone()
+        if row:
+            job_id = row[0]
+        else:
+            now = _now_iso()
+            c.execute("""
+                INSERT INTO jobs (username, task_type, params, input_text, input_hash, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)
+            """, (username, task_type, params_json, text, input_hash, now, now))
+            job_id = c.lastrowid
+    conn.close()
+    return job_id
+
+def get_job(job_id):
+    """Return a job as a dict (without its input text), or None."""
+    conn = get_db()
+    c = conn.cursor()
+    c.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id=?", (job_id,))
+    job = _job_row(c.fetchone())
+    conn.close()
+    return job
+
+def claim_next_job(worker):
+    """Atomically move the oldest queued job to running; returns it with its input text, or None."""
+    conn = get_db()
+    c = conn.cursor()
+    try:
+        with transaction(conn, immediate=True):
+            c.execute("SELECT id, input_text FROM jobs WHERE status='queued' ORDER BY id LIMIT 1")
+            row = c.fetchone()
+            if row is None:
+                return None
+            c.execute("UPDATE jobs SET status='running', worker=?, updated_at=? WHERE id=?",
+                      (worker, _now_iso(), row[0]))
+        c.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id=?", (row[0],))
+        job = _job_row(c.fetchone())
+        job["input_text"] = row[1]
+        return job
+    finally:
+        conn.close()
+
+def finish_job(job_id, result=None, error=None):
+    """Mark a running job done with its result, or failed with an error message."""
+    conn = get_db()
+    c = conn.cursor()
+    status = "failed" if error else "done"
+    c.execute("UPDATE jobs SET status=?, result=?, error=?, updated_at=? WHERE id=?",
+              (status, json.dumps(result) if result is not None else None, error, _now_iso(), job_id))
     conn.commit()
     conn.close()
     return True
 
+def running_job_workers(prefix=""):
+    """Distinct worker ids that hold running jobs, optionally only those starting with ``prefix``."""
+    conn = get_db()
+    rows = conn.execute("""
+        SELECT DISTINCT worker FROM jobs
+        WHERE status='running' AND worker IS NOT NULL AND substr(worker, 1, ?) = ?
+    """, (len(prefix), prefix)).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+def requeue_running_jobs(worker=None):
+    """Put running jobs (optionally only those of one worker) back in the queue, e.g. after a crash."""
+    conn = get_db()
+    c = conn.cursor()
+    if worker:
+        c.execute("UPDATE jobs SET status='queued', worker=NULL, updated_at=? WHERE status='running' AND worker=?",
+                  (_now_iso(), worker))
+    else:
+        c.execute("UPDATE jobs SET status='queued', worker=NULL, updated_at=? WHERE status='running'", (_now_iso(),))
+    conn.commit()
+    count = c.rowcount
+    conn.close()
+    return count
+
 # ---------- INIT DB ----------
 init_db()
@@ -7,8 +7,9 @@ import base64
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # ---------- IMPORTS ----------
-from database.user_db import init_db, check_user, reset_password, get_db
+from database.user_db import init_db, check_user, reset_password, get_user
 from backend.utils import add_logout_button, generate_jwt, verify_jwt
+from backend.startup import WARMUP_ENABLED, start_warmup
 
 # ---------- BACKGROUND FUNCTION ----------
 def add_bg_from_local(image_file):
@@ -66,6 +67,10 @@ if bg_style:
 # Initialize DB
 init_db()
 
+# Load the model in the background while the user logs in
+if WARMUP_ENABLED:
+    start_warmup()
+
 # ---------- SESSION STATES ----------
 for key in ["forgot_mode", "reset_mode", "user", "new_pw", "confirm_pw", "jwt_token"]:
     if key not in st.session_state:
@@ -108,10 +113,10 @@ if not st.session_state.forgot_mode:
         user = check_user(identifier, password)
         if user:
             hours_valid = 168 if remember else 1
-            token = generate_jwt(user[1], hours_valid=hours_valid)
+            token = generate_jwt(user["username"], hours_valid=hours_valid)
             st.session_state.jwt_token = token
             st.session_state.user = user
-            st.success(f"✅ Welcome {user[4]}!")
+            st.success(f"✅ Welcome {user['name']}!")
             st.rerun()
         else:
             st.error("❌ Invalid email or password.")
@@ -123,11 +128,7 @@ elif st.session_state.forgot_mode:
 
     if not st.session_state.reset_mode:
         if st.button("Recover Account"):
-            conn = get_db()
-            c = conn.cursor()
-            c.execute("SELECT * FROM users WHERE email=? OR username=?", (reset_identifier, reset_identifier))
-            user = c.fetchone()
-            conn.close()
+            user = get_user(reset_identifier)
 
             if user:
                 st.success("✅ User found. Please set a new password.")
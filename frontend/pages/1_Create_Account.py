@@ -2,7 +2,7 @@ import sys
 import os
 import streamlit as st
 from backend.utils import add_logout_button, generate_jwt
-from database.user_db import init_db, add_user, get_db
+from database.user_db import init_db, add_user, get_user_profile
 
 
 # Add project root to sys.path so imports work
@@ -55,12 +55,7 @@ with st.form("register_form", clear_on_submit=True):
                 st.session_state.jwt_token = token
 
                 # Fetch the newly created user
-                conn = get_db()
-                c = conn.cursor()
-                c.execute("SELECT * FROM users WHERE username=?", (username,))
-                user = c.fetchone()
-                conn.close()
-                st.session_state.user = user
+                st.session_state.user = get_user_profile(username)
 
                 # Show success message
                 st.success("🎉 Account Created Successfully! You are now logged in.")
@@ -1,21 +1,31 @@
 import sys
 import os
 import re
+import hashlib
+import time
 import streamlit as st
-import docx
-import PyPDF2
-import pandas as pd
-import matplotlib.pyplot as plt
-from rouge_score import rouge_scorer
 
 # Add backend folder to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from backend.text_readability import calculate_readability
+from backend.startup import lazy_import  # matplotlib loads on first use
+from backend.extraction import ExtractionError, extract_text
+from backend.text_readability import calculate_readability, build_readability_chart
 from backend.utils import verify_jwt, add_logout_button
-from backend.summarization import summarize_text
-from backend.paraphrasing import generate_paraphrase  # New version
-from database.user_db import save_uploaded_file, save_processed_text
+from backend import client as inference_client
+from backend import metrics, rouge
+from backend.summarization import summarize_text_stream
+from backend.paraphrasing import generate_paraphrase_stream  # Streams sentences as they finish
+from database.user_db import (save_uploaded_file, save_processed_text, submit_job, get_job,
+                              get_history, search_history, get_history_item)
+
+# Hand inference to background workers (python -m backend.jobs) instead of running it inline
+USE_JOB_QUEUE = os.environ.get("TEXTMORPH_JOB_QUEUE", "0") == "1"
+# The inference server batches requests together, so it cannot honour a per-request time budget
+DEADLINE_UNSUPPORTED = not USE_JOB_QUEUE and inference_client.server_enabled()
+DEADLINE_HELP = ("Not available with the inference server (TEXTMORPH_INFERENCE_URL), which batches requests together"
+                 if DEADLINE_UNSUPPORTED else
+                 "Counted from when a worker starts the job" if USE_JOB_QUEUE else None)
 
 # ---------- LOGIN CHECK ----------
 token = st.session_state.get("jwt_token")
@@ -42,15 +52,15 @@ def compression_percentage(original: str, generated: str) -> float:
     return round((1 - gen_len / orig_len) * 100, 2)
 
 def calculate_rouge(reference: str, generated: str) -> dict:
-    scorer = rouge_scorer.RougeScorer(['rouge1', 'rouge2', 'rougeL'], use_stemmer=True)
-    scores = scorer.score(reference, generated)
-    return {k: v.fmeasure for k, v in scores.items()}
+    # Reference tokens/n-grams are cached, so rescoring the same document is cheap
+    return rouge.score(reference, generated)
 
 def plot_rouge_bar(rouge_scores: dict):
     metrics = list(rouge_scores.keys())
     values = [rouge_scores[m] for m in metrics]
     colors = ["green" if v > 0.5 else "orange" if v > 0.3 else "red" for v in values]
 
+    plt = lazy_import("matplotlib.pyplot")
     fig, ax = plt.subplots(figsize=(5, 3))
     bars = ax.bar(metrics, values, color=colors, width=0.5)
     ax.set_ylim(0, 1)
@@ -61,6 +71,76 @@ def plot_rouge_bar(rouge_scores: dict):
     plt.tight_layout()
     st.pyplot(fig)
 
+def show_summary_result(content: str, summary: str, rouge_scores: dict = None):
+    if not rouge_scores:
+        rouge_scores = calculate_rouge(content, summary)
+    compression = compression_percentage(content, summary)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Original Text")
+        st.text_area("Original", content, height=400)
+    with col2:
+        st.subheader("Summary")
+        st.text_area("Summary", summary, height=400)
+
+    st.subheader("ROUGE Scores 📊")
+    plot_rouge_bar(rouge_scores)
+
+    st.markdown(f"*Original Words:* {word_count(content)}  |  *Summary Words:* {word_count(summary)}  |  *Compression:* {compression}%")
+
+def show_paraphrase_result(content: str, para_text: str):
+    rouge_scores = calculate_rouge(content, para_text)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Original Text")
+        st.text_area("Original", content, height=400)
+    with col2:
+        st.subheader("Paraphrased Text")
+        st.text_area("Paraphrase", para_text, height=400)
+
+    st.subheader("ROUGE Scores 📊")
+    plot_rouge_bar(rouge_scores)
+
+    st.markdown(f"*Original Words:* {word_count(content)}  |  *Paraphrased Words:* {word_count(para_text)}")
+
+def save_result(task_type: str, original: str, processed: str):
+    with metrics.span("db_write", table="processed_text"):
+        save_processed_text(username, task_type, original, processed, "pegasus")
+    st.session_state.pop("history_pages", None)   # the history panel reloads with the new entry
+
+def show_degradations(degradations):
+    if degradations:
+        st.caption("⏱ To meet the time budget: " + "; ".join(degradations))
+
+def poll_job(state_key: str, content_key: str):
+    """
+    Show the status of the job stored under state_key; returns its result once
+    done. A job submitted for other text than content_key is dropped, so a
+    result is never shown against a document it was not computed from.
+    """
+    submitted = st.session_state.get(state_key)
+    if not submitted:
+        return None
+    if submitted["input"] != content_key:
+        st.session_state.pop(state_key, None)
+        return None
+    job_id = submitted["id"]
+    job = get_job(job_id)
+    if job is None:
+        st.session_state.pop(state_key, None)
+        return None
+    if job["status"] in ("queued", "running"):
+        st.info(f"⏳ Job #{job_id} is {job['status']}...")
+        time.sleep(1)
+        st.rerun()
+    if job["status"] == "failed":
+        st.error(f"❌ Job #{job_id} failed: {job['error']}")
+        st.session_state.pop(state_key, None)
+        return None
+    return job["result"]
+
 # ---------- PAGE ----------
 st.title("📊 AI-Text-Morph Dashboard")
 add_logout_button()
@@ -79,19 +159,20 @@ file_name = "pasted_text.txt"
 
 # ---------- READ FILE ----------
 if uploaded_file:
-    file_bytes = uploaded_file.read()
+    file_bytes = uploaded_file.getvalue()
     file_name = uploaded_file.name
-    save_uploaded_file(username, file_bytes, file_name)
+    # Record each distinct upload once, not on every rerun
+    upload_id = hashlib.sha256(file_bytes).hexdigest()
+    if st.session_state.get("saved_upload") != upload_id:
+        with metrics.span("db_write", table="uploaded_files"):
+            save_uploaded_file(username, file_bytes, file_name)
+        st.session_state["saved_upload"] = upload_id
     st.success("📄 File uploaded successfully!")
     try:
-        if uploaded_file.type == "text/plain":
-            content = file_bytes.decode("utf-8", errors="ignore")
-        elif uploaded_file.type == "application/pdf":
-            pdf_reader = PyPDF2.PdfReader(uploaded_file)
-            content = "".join([page.extract_text() or "" for page in pdf_reader.pages])
-        elif uploaded_file.type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/msword"]:
-            doc = docx.Document(uploaded_file)
-            content = "\n".join([para.text for para in doc.paragraphs])
+        # Cached by content hash, so reruns and task switches reuse the first extraction
+        content = extract_text(file_bytes, file_name, uploaded_file.type)
+    except ExtractionError as e:
+        st.error(f"❌ {e}")
     except Exception as e:
         st.error(f"❌ Error reading file: {e}")
 elif pasted_text.strip():
@@ -100,78 +181,154 @@ elif pasted_text.strip():
 
 # ---------- CLEAN TEXT ----------
 if content:
-    content = clean_text(content)
+    with metrics.span("clean_text"):
+        content = clean_text(content)
+    content_key = hashlib.sha256(content.encode("utf-8")).hexdigest()
     st.success("✅ Text ready for processing!")
 
     task = st.radio("Select Task:", ["Readability", "Summarization", "Paraphrasing"])
 
     # ---------------- READABILITY ----------------
     if task == "Readability":
-        scores, overall, chart_data = calculate_readability(content)
+        # Scores and chart are kept per document so widget reruns don't recompute them
+        cached = st.session_state.get("readability")
+        if not cached or cached["key"] != content_key:
+            scores, overall, _ = calculate_readability(content, with_chart=False)
+            cached = st.session_state["readability"] = {"key": content_key, "scores": scores,
+                                                        "overall": overall, "fig": None}
+        scores, overall = cached["scores"], cached["overall"]
+
         st.subheader("Readability Scores 📊")
         for k, v in scores.items():
             st.write(f"{k}: **{v:.2f}**")
         st.markdown(f"### 🏷️ Overall Difficulty: *{overall}*")
 
-        try:
-            st.pyplot(chart_data)
-        except AttributeError:
-            if isinstance(chart_data, pd.DataFrame):
-                st.bar_chart(chart_data)
-            elif isinstance(chart_data, dict):
-                df_chart = pd.DataFrame(list(chart_data.items()), columns=["Metric","Score"]).set_index("Metric")
-                st.bar_chart(df_chart)
+        if scores and st.checkbox("Show chart", value=True):
+            if cached["fig"] is None:
+                cached["fig"] = build_readability_chart(scores)
+            st.pyplot(cached["fig"])
 
     # ---------------- SUMMARIZATION ----------------
     elif task == "Summarization":
-        length_option = st.selectbox("Select Summary Length:", ["Short", "Medium", "Long"])
-        summary_length_map = {"Short":"short", "Medium":"medium", "Long":"long"}
+        length_option = st.selectbox("Select Summary Length:", ["Short", "Medium", "Long", "Fast"],
+                                     help="Fast summarizes only the most salient sentences of long texts")
+        summary_length_map = {"Short":"short", "Medium":"medium", "Long":"long", "Fast":"fast"}
+        summary_deadline = st.number_input("Time budget (seconds, 0 = none):", min_value=0.0, value=0.0, step=1.0,
+                                           key="summary_deadline", disabled=DEADLINE_UNSUPPORTED,
+                                           help=DEADLINE_HELP)
 
         if st.button("Generate Summary"):
-            with st.spinner("Summarizing..."):
-                summary, _ = summarize_text(content, summary_length=summary_length_map[length_option])
-                summary = clean_text(summary)
-                save_processed_text(username, "summary", content, summary, "pegasus")
+            if USE_JOB_QUEUE:
+                st.session_state["summary_job"] = {"input": content_key, "id": submit_job(
+                    username, "summary", content, {"summary_length": summary_length_map[length_option],
+                                                   "deadline_s": summary_deadline or None})}
+            elif inference_client.server_enabled():
+                with st.spinner("Summarizing..."):
+                    summary, rouge_scores = inference_client.summarize_text(content, summary_length_map[length_option])
+                    summary = clean_text(summary)
+                    save_result("summary", content, summary)
+                    show_summary_result(content, summary, rouge_scores)
+            else:
+                # Show section summaries as they finish; the final pass replaces them
+                progress = st.progress(0.0, text="Summarizing...")
+                partial = st.empty()
+                sections = []
+                summary, rouge_scores = "", {}
+                summary_stats = {}
+                for event in summarize_text_stream(content, summary_length=summary_length_map[length_option],
+                                                   stats=summary_stats, deadline_s=summary_deadline or None):
+                    if event["stage"] == "chunk":
+                        sections.append(event["text"])
+                        progress.progress(event["done"] / event["total"],
+                                          text=f"Summarized {event['done']} of {event['total']} sections...")
+                        partial.markdown("*Partial summary:* " + " ".join(sections))
+                    else:
+                        summary, rouge_scores = event["text"], event["rouge"]
+                progress.empty()
+                partial.empty()
+                show_degradations(summary_stats.get("degradations"))
 
-                rouge_scores = calculate_rouge(content, summary)
-                compression = compression_percentage(content, summary)
+                with st.spinner("Scoring summary..."):
+                    summary = clean_text(summary)
+                    save_result("summary", content, summary)
+                    show_summary_result(content, summary, rouge_scores)
 
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.subheader("Original Text")
-                    st.text_area("Original", content, height=400)
-                with col2:
-                    st.subheader("Summary")
-                    st.text_area("Summary", summary, height=400)
-
-                st.subheader("ROUGE Scores 📊")
-                plot_rouge_bar(rouge_scores)
-
-                st.markdown(f"*Original Words:* {word_count(content)}  |  *Summary Words:* {word_count(summary)}  |  *Compression:* {compression}%")
+        if USE_JOB_QUEUE:
+            result = poll_job("summary_job", content_key)
+            if result is not None:
+                show_degradations(result.get("degradations"))
+                show_summary_result(content, clean_text(result["text"]), result.get("rouge"))
 
     # ---------------- PARAPHRASING ----------------
     elif task == "Paraphrasing":
         complexity_option = st.selectbox("Select Paraphrase Complexity:", ["Basic","Medium","Advanced"])
         complexity_map = {"Basic":"basic","Medium":"medium","Advanced":"advanced"}
+        paraphrase_deadline = st.number_input("Time budget (seconds, 0 = none):", min_value=0.0, value=0.0,
+                                              step=1.0, key="paraphrase_deadline", disabled=DEADLINE_UNSUPPORTED,
+                                              help=DEADLINE_HELP)
 
         if st.button("Generate Paraphrase"):
-            with st.spinner("Paraphrasing..."):
-                # Use new generate_paraphrase (google/pegasus-xsum)
-                para_text = generate_paraphrase(content, complexity=complexity_map[complexity_option])
-                para_text = clean_text(para_text)
-                save_processed_text(username, "paraphrase", content, para_text, "pegasus")
+            if USE_JOB_QUEUE:
+                st.session_state["paraphrase_job"] = {"input": content_key, "id": submit_job(
+                    username, "paraphrase", content, {"complexity": complexity_map[complexity_option],
+                                                      "deadline_s": paraphrase_deadline or None})}
+            elif inference_client.server_enabled():
+                with st.spinner("Paraphrasing..."):
+                    para_text = clean_text(inference_client.generate_paraphrase(
+                        content, complexity_map[complexity_option]))
+                    save_result("paraphrase", content, para_text)
+                    show_paraphrase_result(content, para_text)
+            else:
+                # Render sentences as soon as their batch is generated
+                partial = st.empty()
+                pieces = []
+                paraphrase_stats = {}
+                with st.spinner("Paraphrasing..."):
+                    for piece in generate_paraphrase_stream(content, complexity=complexity_map[complexity_option],
+                                                            deadline_s=paraphrase_deadline or None,
+                                                            stats=paraphrase_stats):
+                        pieces.append(piece)
+                        partial.markdown("*Paraphrasing:* " + " ".join(pieces))
+                partial.empty()
+                show_degradations(paraphrase_stats.get("degradations"))
 
-                rouge_scores = calculate_rouge(content, para_text)
+                with st.spinner("Scoring paraphrase..."):
+                    para_text = clean_text(" ".join(pieces))
+                    save_result("paraphrase", content, para_text)
+                    show_paraphrase_result(content, para_text)
 
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.subheader("Original Text")
-                    st.text_area("Original", content, height=400)
-                with col2:
-                    st.subheader("Paraphrased Text")
-                    st.text_area("Paraphrase", para_text, height=400)
+        if USE_JOB_QUEUE:
+            result = poll_job("paraphrase_job", content_key)
+            if result is not None:
+                show_degradations(result.get("degradations"))
+                show_paraphrase_result(content, clean_text(result["text"]))
 
-                st.subheader("ROUGE Scores 📊")
-                plot_rouge_bar(rouge_scores)
+# ---------- HISTORY ----------
+with st.expander("🕘 History", expanded=False):
+    query = st.text_input("Search your past summaries and paraphrases:", key="history_query")
+    if query.strip():
+        entries = search_history(username, query)
+    else:
+        # Keyset pagination: each "Load more" fetches the page after the last row shown
+        pages = st.session_state.setdefault("history_pages", [])
+        if not pages:
+            pages.append(get_history(username))
+        entries = [row for rows, _ in pages for row in rows]
+        if pages[-1][1] and st.button("Load more"):
+            pages.append(get_history(username, cursor=pages[-1][1]))
+            st.rerun()
 
-                st.markdown(f"*Original Words:* {word_count(content)}  |  *Paraphrased Words:* {word_count(para_text)}")
+    if not entries:
+        st.info("No history yet." if not query.strip() else "No matches.")
+    for entry in entries:
+        label = f"{entry['created_at'][:16].replace('T', ' ')} · {entry['task_type']}"
+        st.markdown(f"**{label}** — {entry['preview'] or ''}")
+    if entries:
+        choice = st.selectbox("Open entry:", [None] + [e["id"] for e in entries],
+                              format_func=lambda i: "—" if i is None else f"#{i}")
+        if choice:
+            item = get_history_item(username, choice)
+            if item:
+                col1, col2 = st.columns(2)
+                col1.text_area("Original", item["original_text"], height=300)
+                col2.text_area("Result", item["processed_text"], height=300)
@@ -2,7 +2,7 @@ import sys
 import os
 import streamlit as st
 from backend.utils import verify_jwt, add_logout_button
-from database.user_db import update_profile, get_db
+from database.user_db import update_profile, get_user_profile, profile_version, read_user_file
 
 # Add project root to sys.path so imports work
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
@@ -24,11 +24,13 @@ if not username:
 add_logout_button()
 
 # ---------- FETCH USER DATA ----------
-conn = get_db()
-c = conn.cursor()
-c.execute("SELECT * FROM users WHERE username=?", (username,))
-user = c.fetchone()
-conn.close()
+# Named columns and file metadata only; kept in this session until the profile changes
+cached = st.session_state.get("profile_cache")
+version = profile_version(username)
+if not cached or cached["username"] != username or cached["version"] != version:
+    cached = {"username": username, "version": version, "profile": get_user_profile(username)}
+    st.session_state["profile_cache"] = cached
+user = cached["profile"]
 
 if not user:
     st.error("❌ User not found!")
@@ -38,41 +40,42 @@ st.title("👤 Profile Management")
 st.subheader(f"Welcome, {username} 👋")
 
 # ---------- PREFILL CURRENT VALUES ----------
-name = st.text_input("Full Name *", value=user[4] if user[4] else "")
-age = st.number_input("Age *", min_value=10, max_value=100, value=user[5] if user[5] else 18)
+name = st.text_input("Full Name *", value=user["name"] or "")
+age = st.number_input("Age *", min_value=10, max_value=100, value=user["age"] or 18)
 gender_options = ["Male", "Female", "Other"]
 gender = st.selectbox(
     "Gender *",
     gender_options,
-    index=gender_options.index(user[6]) if user[6] in gender_options else 0
+    index=gender_options.index(user["gender"]) if user["gender"] in gender_options else 0
 )
-language = st.text_input("Preferred Language *", value=user[7] if user[7] else "")
+language = st.text_input("Preferred Language *", value=user["language"] or "")
 photo = st.file_uploader("Upload Profile Photo", type=["jpg", "jpeg", "png"])
 
 # ---------- UPDATE PROFILE ----------
 if st.button("Update Profile"):
-    photo_bytes = photo.read() if photo else None
-    update_profile(username, name, age, gender, language, photo_bytes)
+    # The uploaded photo is streamed into the database in chunks
+    update_profile(username, name, age, gender, language, photo)
     st.success("✅ Profile updated successfully!")
 
     # Refresh session user data
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE username=?", (username,))
-    updated_user = c.fetchone()
-    conn.close()
-    st.session_state["user"] = updated_user
+    st.session_state["user"] = get_user_profile(username)
 
     # Trigger rerun safely with new query_params API
     st.query_params = {"page": "profile"}  # preserve current page
     st.stop()  # stops execution and reruns automatically
 
 # ---------- DOWNLOAD UPLOADED FILE ----------
-if user[9]:  # uploaded_file column index (assuming 0:id, 1:username,..., 9:uploaded_file)
-    st.subheader("📄 Your Uploaded Document")
-    st.download_button(
-        label="Download Uploaded File",
-        data=user[9],
-        file_name="uploaded_document",  # optional: add original extension if stored
-        mime="application/octet-stream"
-    )
+documents = [f for f in user["files"] if f["kind"] == "document"]
+if documents:
+    st.subheader("📄 Your Uploaded Documents")
+    for doc in documents:
+        st.write(f"{doc['file_name']} ({doc['size'] / 1024:.1f} KB)")
+        # The bytes are only read (in chunks) once a download is requested
+        if st.button("Prepare download", key=f"prepare_{doc['id']}"):
+            st.download_button(
+                label="Download Uploaded File",
+                data=read_user_file(username, doc["id"]) or b"",
+                file_name=doc["file_name"],
+                mime="application/octet-stream",
+                key=f"download_{doc['id']}",
+            )
@@ -0,0 +1,102 @@
+import sys
+import os
+import streamlit as st
+from backend.utils import verify_jwt, add_logout_button
+from backend import assisted, encoder_cache, extraction, metrics, result_cache
+from backend.model_manager import loaded_models
+from backend.startup import startup_report
+
+# Add project root to sys.path so imports work
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Comma-separated usernames allowed to see this page
+ADMIN_USERS = {u.strip() for u in os.environ.get("TEXTMORPH_ADMIN_USERS", "").split(",") if u.strip()}
+
+# ---------- PAGE CONFIG ----------
+st.set_page_config(page_title="Admin", page_icon="📈", layout="wide")
+
+# ---------- LOGIN CHECK ----------
+token = st.session_state.get("jwt_token")
+username = verify_jwt(token)
+if not username:
+    st.warning("⚠ Please login to access the admin page.")
+    st.query_params = {"page": "home"}  # redirect to home
+    st.stop()
+if username not in ADMIN_USERS:
+    st.error("❌ This page is restricted to admins (TEXTMORPH_ADMIN_USERS).")
+    st.stop()
+
+# ---------- LOGOUT BUTTON ----------
+add_logout_button()
+
+st.title("📈 Performance Metrics")
+if not metrics.ENABLED:
+    st.info("Metrics are off. Start the app with TEXTMORPH_METRICS=1 to record them.")
+
+snap = metrics.snapshot()
+
+# ---------- STAGE LATENCIES ----------
+st.subheader("⏱ Stage latencies")
+stages = [{
+    "stage": s["stage"],
+    "labels": ", ".join(f"{k}={v}" for k, v in s.items()
+                        if k not in ("name", "stage", "count", "sum", "max", "mean")),
+    "calls": s["count"],
+    "mean ms": round(s["mean"] * 1000, 2),
+    "max ms": round(s["max"] * 1000, 2),
+    "total s": round(s["sum"], 3),
+} for s in snap["series"] if s["name"] == "stage_seconds"]
+if stages:
+    st.dataframe(stages, use_container_width=True)
+else:
+    st.caption("No stages recorded yet.")
+
+# ---------- THROUGHPUT ----------
+st.subheader("🚀 Throughput and batching")
+values = [{k: round(v, 3) if isinstance(v, float) else v for k, v in s.items() if k != "sum"}
+          for s in snap["series"] if s["name"] != "stage_seconds"]
+if values:
+    st.dataframe(values, use_container_width=True)
+if snap["counters"]:
+    st.dataframe(snap["counters"], use_container_width=True)
+
+# ---------- CACHES AND MODELS ----------
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("🗃 Result cache")
+    st.json(result_cache.cache_stats())
+    st.subheader("🧮 Encoder-output cache")
+    st.json(encoder_cache.cache_stats())
+    st.subheader("📄 Extracted-text cache")
+    st.json(extraction.cache_stats())
+with col2:
+    st.subheader("🧠 Loaded models")
+    models = loaded_models()
+    if models:
+        st.dataframe(models, use_container_width=True)
+    else:
+        st.caption("No models loaded.")
+
+st.subheader("🎯 Assisted decoding")
+drafts = {task: assisted.draft_model(task) or "off" for task in assisted.TASKS}
+st.caption(", ".join(f"{task}: {name}" for task, name in drafts.items()))
+acceptance = assisted.acceptance_stats()
+if acceptance:
+    st.dataframe([{"task": task, **{k: round(v, 3) if isinstance(v, float) else v for k, v in totals.items()}}
+                  for task, totals in acceptance.items()], use_container_width=True)
+
+st.subheader("⚡ Startup")
+st.json(startup_report())
+
+# ---------- EXPORT ----------
+with st.expander("Prometheus text"):
+    text = metrics.render_prometheus()
+    st.code(text, language="text")
+    st.download_button("⬇ Download metrics", text, file_name="textmorph_metrics.prom", mime="text/plain")
+
+if st.button("🔄 Reset metrics"):
+    metrics.reset()
+    assisted.reset_stats()
+    st.rerun()
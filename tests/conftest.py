@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Add project root to sys.path so imports work
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Scratch database and no result cache; set before the backend modules read them
+os.environ["TEXTMORPH_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="textmorph-tests-"), "test.db")
+os.environ["TEXTMORPH_CACHE"] = "0"
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from backend import budget
+
+@pytest.fixture(autouse=True)
+def fixed_step_cost(monkeypatch):
+    # 1 ms per decoder step and beam until a test records its own measurements
+    monkeypatch.setattr(budget, "_step_seconds", {})
+    monkeypatch.setattr(budget, "DEFAULT_STEP_SECONDS", 0.001)
+
+def test_summary_lengths_keep_configured_bounds_for_long_inputs():
+    assert budget.summary_lengths(1000, 80, 120) == (80, 120)
+
+def test_summary_lengths_shrink_for_short_inputs():
+    assert budget.summary_lengths(50, 80, 120) == (25, 50)
+    assert budget.summary_lengths(3, 30, 60) == (8, budget.MIN_MAX_TOKENS)
+
+def test_paraphrase_params_scale_beams_and_length():
+    params = {"max_length": 60, "num_beams": 5, "do_sample": True}
+    short = budget.paraphrase_params(params, 6)
+    assert short["num_beams"] == budget.MIN_BEAMS
+    assert short["max_length"] == 6 * 2 + budget.PARAPHRASE_LENGTH_SLACK
+    assert short["do_sample"] is True
+    assert budget.paraphrase_params(params, 200) == params
+
+def test_record_moves_the_estimate_towards_measurements():
+    budget.record("summary", seconds=1.0, steps=100, beams=2, rows=5)
+    assert budget.step_seconds("summary") == pytest.approx(0.001)
+    budget.record("summary", seconds=2.0, steps=100, beams=2, rows=5)
+    assert budget.step_seconds("summary") == pytest.approx(0.001 + budget.EWMA_ALPHA * 0.001)
+    budget.record("summary", seconds=1.0, steps=0, beams=2, rows=5)   # ignored
+    assert budget.step_seconds("paraphrase") == budget.DEFAULT_STEP_SECONDS
+
+def test_plan_within_budget_degrades_nothing():
+    plan = budget.plan("summary", 10.0, rows=2, beams=4, max_tokens=100)
+    assert (plan["rows"], plan["beams"], plan["max_tokens"]) == (2, 4, 100)
+    assert plan["degradations"] == []
+
+def test_plan_reduces_beams_first():
+    # 2 rows x 4 beams x 100 tokens = 0.8 s; 0.55 s x PLAN_SHARE leaves room for 2 beams
+    plan = budget.plan("summary", 0.55, rows=2, beams=4, max_tokens=100)
+    assert (plan["rows"], plan["beams"], plan["max_tokens"]) == (2, 2, 100)
+    assert plan["degradations"] == ["beams 4→2"]
+
+def test_plan_then_drops_chunks_then_tokens():
+    plan = budget.plan("summary", 0.27, rows=10, beams=4, max_tokens=100, reducible_rows=True)
+    assert plan["beams"] == 1
+    assert plan["rows"] == 2
+    assert plan["degradations"] == ["beams 4→1", "chunks 10→2"]
+
+    plan = budget.plan("summary", 0.0505, rows=10, beams=4, max_tokens=100, reducible_rows=True)
+    assert (plan["rows"], plan["beams"]) == (1, 1)
+    assert plan["max_tokens"] == 40
+    assert plan["degradations"][-1] == "max tokens 100→40"
+
+def test_plan_keeps_rows_unless_reducible():
+    plan = budget.plan("summary", 0.05, rows=10, beams=1, max_tokens=100)
+    assert plan["rows"] == 10
+    assert plan["max_tokens"] == budget.MIN_MAX_TOKENS
+
+def test_plan_counts_time_already_spent_and_expires():
+    started = time.perf_counter() - 0.4
+    plan = budget.plan("summary", 0.5, rows=1, beams=4, max_tokens=100, started=started)
+    assert plan["beams"] == 1
+    assert not budget.expired(None)
+    assert budget.expired(budget.plan("summary", 0.01, rows=1, beams=1, max_tokens=16,
+                                      started=time.perf_counter() - 1.0))
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+
+import pytest
+
+from database.connection import ConnectionPool, insert_many, transaction
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_idle=2)
+    yield pool
+    pool.close_all()
+
+def test_close_returns_connections_to_the_pool(pool):
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+    conn.close()   # closing twice is harmless
+    assert pool.acquire() is conn
+    assert pool.opened == 1
+
+def test_connections_beyond_max_idle_really_close(pool):
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        conn.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conns[2].execute("SELECT 1")
+    assert pool.opened == 3
+
+def test_released_connections_are_reset(pool):
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x)")
+    conn.commit()
+    conn.row_factory = sqlite3.Row
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.close()   # uncommitted insert is rolled back
+    conn = pool.acquire()
+    assert conn.row_factory is None
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    conn.close()
+
+def test_transaction_commits_or_rolls_back(pool):
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x)")
+    with transaction(conn, immediate=True):
+        assert insert_many(conn, "t", ["x"], [(1,), (2,)]) == 2
+    with pytest.raises(ValueError):
+        with transaction(conn):
+            conn.execute("INSERT INTO t VALUES (3)")
+            raise ValueError("abort")
+    assert conn.execute("SELECT SUM(x) FROM t").fetchone()[0] == 3
+    conn.close()
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_never_reuses_the_parents_connection(pool):
+    parent = pool.acquire()
+    parent.close()
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            conn = pool.acquire()
+            ok = conn is not parent and pool.opened == 1 and conn.execute("SELECT 1").fetchone() == (1,)
+            conn.close()
+            os.write(write_end, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    os.waitpid(pid, 0)
+    assert os.read(read_end, 1) == b"1"
+    os.close(read_end)
+
+    # The parent's idle connection is untouched and still pooled
+    assert pool.acquire() is parent
+    assert parent.execute("SELECT 1").fetchone() == (1,)
+    parent.close()
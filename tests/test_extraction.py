@@ -0,0 +1,40 @@
+import pytest
+
+from backend import extraction, result_cache
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(extraction, "_cache", extraction.TextCache(100))
+    return extraction._cache
+
+def test_extracted_text_is_cached_in_memory_only(cache, monkeypatch):
+    # The result cache is off in tests (TEXTMORPH_CACHE=0); extraction keeps its own cache
+    assert not result_cache.CACHE_ENABLED
+    monkeypatch.setattr(result_cache, "put", lambda *args, **kwargs: pytest.fail("wrote to the result cache"))
+    parsed = []
+    iter_text = extraction.iter_text
+    monkeypatch.setattr(extraction, "iter_text", lambda data, kind: parsed.append(kind) or iter_text(data, kind))
+
+    assert extraction.extract_text(b"hello upload", "a.txt") == "hello upload"
+    assert extraction.extract_text(b"hello upload", "renamed.txt", "text/plain") == "hello upload"
+    assert parsed == ["txt"]
+    assert extraction.cache_stats()["hits"] == 1
+    extraction.extract_text(b"hello upload", "a.txt", use_cache=False)
+    assert parsed == ["txt", "txt"]
+
+def test_cache_evicts_least_recently_used_texts_by_size(cache):
+    cache.put("a", "x" * 40)
+    cache.put("b", "y" * 40)
+    assert cache.get("a")
+    cache.put("c", "z" * 40)
+    assert (cache.get("a"), cache.get("b")) == ("x" * 40, None)
+    cache.put("huge", "w" * 101)
+    assert cache.get("huge") is None
+    assert cache.stats()["entries"] == 2
+
+def test_limits_and_unsupported_types(monkeypatch):
+    with pytest.raises(extraction.ExtractionError):
+        extraction.extract_text(b"data", "image.png")
+    monkeypatch.setattr(extraction, "MAX_FILE_MB", 1 / 2**20)
+    with pytest.raises(extraction.ExtractionError):
+        extraction.extract_text(b"two bytes", "a.txt")
@@ -0,0 +1,80 @@
+import tracemalloc
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from backend import extractive
+from backend.text_chunking import split_into_sentences
+from benchmarks.tiny_model import synthetic_text
+
+def dense_scores(sentences):
+    """Reference: TextRank over the complete dense similarity matrix."""
+    matrix = extractive.tfidf_matrix(sentences).toarray()
+    weights = matrix @ matrix.T
+    np.fill_diagonal(weights, 0.0)
+    n = len(sentences)
+    out_degree = weights.sum(axis=1, keepdims=True)
+    transition = np.where(out_degree > 0, weights / np.maximum(out_degree, 1e-12), 1.0 / n)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(extractive.MAX_ITERATIONS):
+        updated = (1 - extractive.DAMPING) / n + extractive.DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < extractive.TOLERANCE:
+            break
+        scores = updated
+    centroid = matrix.mean(axis=0)
+    relevance = matrix @ (centroid / np.linalg.norm(centroid))
+    return (extractive.CENTRALITY_WEIGHT * updated / updated.max()
+            + (1 - extractive.CENTRALITY_WEIGHT) * relevance / relevance.max())
+
+class WordTokenizer:
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [text.split() for text in texts]}
+
+def test_small_documents_match_the_dense_graph():
+    sentences = split_into_sentences(synthetic_text(600, seed=3))
+    sentences.append("Zebra quokka narwhal.")   # shares no terms: an isolated sentence
+    assert len(sentences) <= extractive.NEIGHBORS + 1
+    assert np.allclose(extractive.sentence_scores(sentences), dense_scores(sentences), atol=1e-5)
+
+def test_graph_keeps_the_strongest_neighbors_within_the_window(monkeypatch):
+    monkeypatch.setattr(extractive, "NEIGHBORS", 3)
+    monkeypatch.setattr(extractive, "WINDOW", 5)
+    monkeypatch.setattr(extractive, "BLOCK_CELLS", 16)   # many row blocks
+    matrix = extractive.tfidf_matrix(split_into_sentences(synthetic_text(1500, seed=4)))
+    graph = extractive.similarity_graph(matrix).tocoo()
+    dense = matrix.toarray() @ matrix.toarray().T
+
+    assert np.all(np.bincount(graph.row, minlength=matrix.shape[0]) <= 3)
+    assert np.all(np.abs(graph.row - graph.col) <= 5) and np.all(graph.row != graph.col)
+    assert np.allclose(graph.data, dense[graph.row, graph.col], atol=1e-6)
+    # Each kept edge is at least as strong as any dropped edge inside the window
+    for row in range(0, matrix.shape[0], 17):
+        kept = graph.data[graph.row == row]
+        window = [dense[row, col] for col in range(max(0, row - 5), min(matrix.shape[0], row + 6)) if col != row]
+        assert kept.min() >= sorted(window, reverse=True)[len(kept) - 1] - 1e-6
+
+def test_book_length_input_stays_in_linear_memory():
+    sentences = split_into_sentences(synthetic_text(250_000, seed=1))
+    assert len(sentences) > 15_000
+    tracemalloc.start()
+    try:
+        scores = extractive.sentence_scores(sentences)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert len(scores) == len(sentences) and all(0.0 <= s <= 1.0 + 1e-6 for s in scores)
+    # A dense float32 similarity matrix alone would take len(sentences)**2 * 4 bytes (about 1 GB here)
+    assert peak < 200 * 2**20
+
+def test_selection_fits_the_budget_in_document_order():
+    text = synthetic_text(3000, seed=2)
+    stats = {}
+    selected = extractive.select_sentences(text, WordTokenizer(), 400, stats)
+    assert stats["selected_tokens"] <= 400 < stats["tokens"]
+    assert len(selected.split()) == stats["selected_tokens"]
+    sentences = split_into_sentences(text)
+    positions = [sentences.index(s) for s in split_into_sentences(selected)]
+    assert positions == sorted(positions)
+    assert extractive.select_sentences("Short text. Fits.", WordTokenizer(), 400) == "Short text. Fits."
@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from backend import budget, encoder_cache
+from backend.jobs import run_job
+from backend.model_manager import DEFAULT_MODEL, unload_model
+from backend.paraphrasing import iter_paraphrases, paraphrase_sentences
+from backend.summarization import summarize_text
+from benchmarks.tiny_model import register_tiny_model, synthetic_text
+
+@pytest.fixture(scope="module", autouse=True)
+def tiny_model():
+    """The benchmark's tiny random Pegasus stands in for the real model; nothing is downloaded."""
+    register_tiny_model(DEFAULT_MODEL)
+    yield
+    unload_model(DEFAULT_MODEL)
+
+@pytest.fixture(autouse=True)
+def slow_steps(monkeypatch):
+    # A pessimistic step cost makes deadlines bind regardless of how fast this machine is
+    monkeypatch.setattr(budget, "_step_seconds", {})
+    monkeypatch.setattr(budget, "record", lambda *args, **kwargs: None)
+    monkeypatch.setattr(budget, "DEFAULT_STEP_SECONDS", 0.01)
+
+def test_summary_without_deadline_is_not_degraded():
+    stats = {}
+    summary, scores = summarize_text(synthetic_text(300), use_cache=False, stats=stats)
+    assert isinstance(summary, str)
+    assert set(scores) == {"rouge1", "rouge2", "rougeL"}
+    assert not stats.get("degradations")
+
+def test_tight_deadline_reduces_beams_then_chunks():
+    stats = {}
+    summarize_text(synthetic_text(3000), use_cache=False, stats=stats, deadline_s=2.0)
+    assert stats["degradations"][0].startswith("beams ")
+    assert any(d.startswith("chunks ") for d in stats["degradations"])
+
+def test_paraphrase_deadline_keeps_every_sentence():
+    sentences = [f"Sentence number {i} is about the city council." for i in range(12)]
+    stats = {}
+    result = paraphrase_sentences(sentences, deadline_s=0.01, stats=stats)
+    assert stats["degradations"]
+    assert len(result) == len(sentences)
+
+def test_empty_sentence_list_with_deadline():
+    assert list(iter_paraphrases([], deadline_s=1.0)) == []
+
+def test_queued_job_honours_its_deadline():
+    job = {"task_type": "summary", "input_text": synthetic_text(3000),
+           "params": {"summary_length": "medium", "deadline_s": 2.0}}
+    result = run_job(job)
+    assert result["degradations"][0].startswith("beams ")
+    job["params"]["deadline_s"] = None
+    assert run_job(job)["degradations"] == []
+
+def test_encoder_cache_does_not_change_output():
+    text = synthetic_text(400, seed=5)
+    encoder_cache.set_max_mb(0)
+    try:
+        uncached = [summarize_text(text, summary_length=length, use_cache=False)[0] for length in ("short", "long")]
+    finally:
+        encoder_cache.set_max_mb(encoder_cache.MAX_MB)
+    encoder_cache.clear()
+    cached = [summarize_text(text, summary_length=length, use_cache=False)[0] for length in ("short", "long")]
+    assert cached == uncached
+    assert encoder_cache.cache_stats()["hits"] > 0
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from backend import inference, onnx_backend
+from benchmarks.tiny_model import build_model, build_tokenizer, synthetic_text
+
+@pytest.fixture(scope="module")
+def tiny_model_dir(tmp_path_factory):
+    """The benchmark's tiny Pegasus saved to disk, so both backends load (and export) it by path."""
+    path = tmp_path_factory.mktemp("tiny-pegasus")
+    tokenizer = build_tokenizer()
+    build_model(len(tokenizer)).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return str(path)
+
+@pytest.fixture
+def onnx_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(onnx_backend, "ONNX_DIR", str(tmp_path))
+    monkeypatch.setattr(inference, "_backends", {})
+
+@pytest.mark.parametrize("num_beams", [1, 4])
+def test_onnx_matches_torch(tiny_model_dir, onnx_dir, num_beams):
+    texts = [synthetic_text(words, seed=i) for i, words in enumerate((12, 40, 90))]
+    report = inference.check_parity(texts, tiny_model_dir, "onnx", max_length=24, min_length=4,
+                                    num_beams=num_beams, length_penalty=2.0, early_stopping=True)
+    assert report["backend"] == "onnx"
+    assert report["match_rate"] == 1.0, report["mismatches"]
+
+def test_missing_onnx_runtime_falls_back_to_torch(monkeypatch):
+    monkeypatch.setattr(inference, "_backends", {})
+    monkeypatch.setattr(onnx_backend, "ort", None)
+    assert inference.get_backend("onnx").name == "torch"
@@ -0,0 +1,39 @@
+import pytest
+
+from backend.text_readability import calculate_readability, text_statistics
+from benchmarks.tiny_model import synthetic_text
+
+SAMPLES = [
+    "The quick brown fox jumps over the lazy dog. It wasn't amused, however; the dog's owner laughed loudly!",
+    "Photosynthesis is the biological process by which green plants and certain other organisms transform "
+    "light energy into chemical energy. During photosynthesis in green plants, light energy is captured and "
+    "used to convert water, carbon dioxide, and minerals into oxygen and energy-rich organic compounds.",
+    "Hi. Go now. The committee's well-known recommendation, published in 2024, emphasized interdisciplinary "
+    "collaboration, sustainability and accountability. Don't forget 'quoted' words!",
+    synthetic_text(400, seed=3),
+]
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_scores_match_textstat(text):
+    textstat = pytest.importorskip("textstat")
+    scores, _, _ = calculate_readability(text, with_chart=False)
+
+    fk = textstat.flesch_kincaid_grade(text)
+    gf = textstat.gunning_fog(text)
+    smog = textstat.smog_index(text)
+    if len(text.split()) < 50:
+        smog = min(smog, (fk + gf) / 2)
+    assert scores["Flesch-Kincaid Grade"] == pytest.approx(fk, abs=0.01)
+    assert scores["Gunning Fog Index"] == pytest.approx(gf, abs=0.01)
+    assert scores["SMOG Index"] == pytest.approx(smog, abs=0.01)
+    assert scores["Flesch Reading Ease"] == pytest.approx(textstat.flesch_reading_ease(text), abs=0.01)
+
+def test_short_sentences_and_punctuation_follow_textstat_counting():
+    stats = text_statistics("Hi. Go now. The well-known committee's report wasn't 'final' at all.")
+    # "Hi." and "Go now." have two words or fewer and are not sentences
+    assert stats["sentences"] == 1
+    # Hyphenated words count once, contractions keep their apostrophe
+    assert stats["words"] == 11
+
+def test_empty_text():
+    assert calculate_readability("   ", with_chart=False) == ({}, "⚠️ No valid text provided", None)
@@ -0,0 +1,42 @@
+import pytest
+
+from backend import result_cache
+from backend.text_chunking import split_into_sentences
+from database.connection import ConnectionPool
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """An enabled cache on a scratch SQLite file."""
+    monkeypatch.setattr(result_cache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(result_cache, "_pool", ConnectionPool(str(tmp_path / "cache.db")))
+    monkeypatch.setattr(result_cache, "_table_ready", False)
+    monkeypatch.setattr(result_cache, "_memory", result_cache.LRUCache(4))
+    return result_cache
+
+def test_key_follows_the_exact_text_and_settings():
+    # Line breaks change the sentence split, so they must change the key too
+    assert split_into_sentences("First one.\nSecond one.") != split_into_sentences("First one. Second one.")
+    assert (result_cache.make_key("summary", "First one.\nSecond one.")
+            != result_cache.make_key("summary", "First one. Second one."))
+    assert result_cache.make_key("summary", "text", length="short") == result_cache.make_key(
+        "summary", "text", length="short")
+    assert result_cache.make_key("summary", "text", length="short") != result_cache.make_key(
+        "summary", "text", length="long")
+    assert result_cache.make_key("summary", "text") != result_cache.make_key("paraphrase", "text")
+
+def test_disk_tier_serves_values_evicted_from_memory(cache):
+    for i in range(6):
+        cache.put(f"key-{i}", {"text": f"value {i}"}, task="summary")
+    assert len(cache._memory) == 4
+    assert cache.get("key-0") == {"text": "value 0"}
+    assert cache.get("missing") is None
+    stats = cache.cache_stats()
+    assert (stats["disk_hits"], stats["misses"]) >= (1, 1)
+
+def test_disk_tier_prunes_the_least_recently_used_rows(cache, monkeypatch):
+    monkeypatch.setattr(cache, "DISK_ENTRIES", 3)
+    monkeypatch.setattr(cache, "PRUNE_EVERY_WRITES", 1)
+    for i in range(5):
+        cache.put(f"key-{i}", i)
+    cache._memory.clear()
+    assert [cache.get(f"key-{i}") for i in range(5)] == [None, None, 2, 3, 4]
@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from backend import rouge
+from benchmarks.tiny_model import synthetic_text
+
+def lcs_dp(a, b):
+    """Textbook O(n*m) LCS length, the reference for the bit-parallel version."""
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+@pytest.mark.parametrize("seed", range(20))
+def test_bit_parallel_lcs_matches_dynamic_programming(seed):
+    rng = random.Random(seed)
+    alphabet = "abcdefg"[: rng.randint(1, 7)]
+    reference = [rng.choice(alphabet) for _ in range(rng.randint(0, 150))]
+    candidate = [rng.choice(alphabet) for _ in range(rng.randint(0, 60))]
+    ref = rouge.Reference(" ".join(reference))
+    assert ref.lcs_length(candidate) == lcs_dp(reference, candidate)
+
+def test_lcs_across_word_boundaries_of_the_bit_masks():
+    # More than 64 reference tokens, so masks span several machine words
+    reference = ["x"] * 63 + ["a", "b"] + ["y"] * 70 + ["c"]
+    ref = rouge.Reference(" ".join(reference))
+    assert ref.lcs_length(["a", "b", "c", "z"]) == 3
+
+def test_empty_inputs():
+    assert rouge.score("", "") == {"rouge1": 0.0, "rouge2": 0.0, "rougeL": 0.0}
+    assert rouge.score("some reference text", "")["rougeL"] == 0.0
+
+def test_cached_reference_gives_the_same_scores():
+    reference = synthetic_text(300, seed=1)
+    candidate = synthetic_text(40, seed=2)
+    rouge._references.clear()
+    cold = rouge.score(reference, candidate)
+    assert rouge.score(reference, candidate) == cold
+
+@pytest.mark.parametrize("seed", range(5))
+def test_scores_match_rouge_score(seed):
+    rouge_scorer = pytest.importorskip("rouge_score.rouge_scorer")
+    pytest.importorskip("nltk")
+    reference = synthetic_text(200, seed=seed)
+    candidate = synthetic_text(50, seed=seed + 100)
+    expected = rouge_scorer.RougeScorer(list(rouge.ROUGE_TYPES), use_stemmer=True).score(reference, candidate)
+    actual = rouge.score_detailed(reference, candidate)
+    for rouge_type in rouge.ROUGE_TYPES:
+        for field in ("precision", "recall", "fmeasure"):
+            assert actual[rouge_type][field] == pytest.approx(getattr(expected[rouge_type], field))
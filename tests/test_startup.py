@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from backend import inference, startup
+
+HEAVY_MODULES = ("torch", "transformers", "matplotlib", "PyPDF2", "docx")
+
+def test_backend_modules_import_without_heavy_dependencies():
+    # A fresh interpreter, since this test process may already have imported them
+    code = ("import sys, backend.summarization, backend.paraphrasing, backend.text_readability; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert out.stdout.strip() == ""
+
+def test_lazy_import_defers_and_times_the_first_import(tmp_path, monkeypatch):
+    (tmp_path / "textmorph_lazy_probe.py").write_text("LOADED = True\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(startup, "_timings", {})
+    assert "textmorph_lazy_probe" not in sys.modules
+    try:
+        module = startup.lazy_import("textmorph_lazy_probe")
+        assert module.LOADED and "textmorph_lazy_probe" in sys.modules
+        assert "import textmorph_lazy_probe" in startup.startup_report()["steps"]
+        assert startup.lazy_import("textmorph_lazy_probe") is module
+    finally:
+        sys.modules.pop("textmorph_lazy_probe", None)
+
+class RecordingBackend:
+    """Stands in for the inference backend and records which thread loads the model."""
+
+    def __init__(self):
+        self.threads = []
+        self.loading = threading.Event()
+        self.release = threading.Event()
+
+    def tokenizer(self, model_name):
+        self.threads.append(threading.current_thread().name)
+        self.loading.set()
+        self.release.wait(5)
+        return lambda texts, **kwargs: {"input_ids": texts}
+
+    def generate(self, model_name, batch, **params):
+        self.threads.append(threading.current_thread().name)
+        return [[0]]
+
+@pytest.fixture
+def backend(monkeypatch):
+    engine = RecordingBackend()
+    monkeypatch.setattr(inference, "get_backend", lambda name=None: engine)
+    monkeypatch.setattr(startup, "_warmup_thread", None)
+    monkeypatch.setattr(startup, "_warmup_state", {"status": "idle", "error": None})
+    monkeypatch.setattr(startup, "_timings", {})
+    return engine
+
+def test_warmup_loads_the_model_off_the_main_thread(backend):
+    thread = startup.start_warmup(["some-model"])
+    # The caller is not blocked while the model loads
+    assert backend.loading.wait(5)
+    assert startup.startup_report()["warmup"]["status"] == "running"
+    assert startup.start_warmup(["some-model"]) is thread
+    backend.release.set()
+    thread.join(5)
+
+    assert backend.threads == ["model-warmup", "model-warmup"]
+    report = startup.startup_report()
+    assert report["warmup"]["status"] == "done"
+    assert {"load some-model", "prime some-model"} <= set(report["steps"])
+
+def test_failed_warmup_is_reported(backend, monkeypatch):
+    def broken(model_name):
+        raise OSError("weights missing")
+
+    monkeypatch.setattr(backend, "tokenizer", broken)
+    startup.start_warmup(["some-model"]).join(5)
+    assert startup.startup_report()["warmup"] == {"status": "failed", "error": "weights missing"}
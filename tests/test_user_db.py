@@ -0,0 +1,236 @@
+import io
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("bcrypt")
+
+from database import user_db
+from database.connection import ConnectionPool
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, fully migrated database for each test."""
+    monkeypatch.setattr(user_db, "DB_NAME", str(tmp_path / "user.db"))
+    user_db.init_db()
+    return user_db
+
+@pytest.fixture
+def fts(db):
+    conn = db.get_db()
+    available = db._fts5_available(conn.cursor())
+    conn.close()
+    if not available:
+        pytest.skip("SQLite built without FTS5")
+    return db
+
+LEGACY_SCHEMA = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL UNIQUE, email TEXT UNIQUE NOT NULL,
+        password BLOB NOT NULL, name TEXT, age INTEGER, gender TEXT, language TEXT, photo BLOB,
+        uploaded_file BLOB);
+    CREATE TABLE uploaded_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, file_name TEXT, file_content TEXT, uploaded_at TEXT);
+    CREATE TABLE processed_text (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, task_type TEXT, original_text TEXT,
+        processed_text TEXT, model TEXT, created_at TEXT);
+    CREATE TABLE user_files (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, file_name TEXT NOT NULL,
+        file_data BLOB NOT NULL, uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+"""
+
+def test_fresh_database_is_at_the_latest_version(db):
+    conn = db.get_db()
+    assert db.schema_version(conn) == db.SCHEMA_VERSION == len(db.MIGRATIONS)
+    assert db.run_migrations(conn) == []
+    conn.close()
+
+def test_legacy_database_migrates_through_every_version(tmp_path, monkeypatch):
+    path = str(tmp_path / "legacy.db")
+    legacy = sqlite3.connect(path)
+    legacy.executescript(LEGACY_SCHEMA)
+    legacy.execute("INSERT INTO users (username, email, password, photo, uploaded_file) VALUES (?, ?, ?, ?, ?)",
+                   ("ann", "ann@example.com", b"hash", b"PHOTO", b"DOCUMENT"))
+    legacy.executemany("INSERT INTO uploaded_files (username, file_name, file_content, uploaded_at) VALUES (?, ?, ?, ?)",
+                       [("ann", "a.txt", "same upload", "2024-01-01"), ("ann", "a.txt", "same upload", "2024-01-02"),
+                        ("ann", "b.txt", "other upload", "2024-01-03")])
+    legacy.execute("""INSERT INTO processed_text (username, task_type, original_text, processed_text, model, created_at)
+                      VALUES ('ann', 'summary', 'the original zeppelin text', 'a short summary', 'pegasus', '2024-01-04')""")
+    legacy.execute("INSERT INTO user_files (username, file_name, file_data) VALUES ('ann', 'old.pdf', X'0102')")
+    legacy.commit()
+    legacy.close()
+
+    conn = ConnectionPool(path, setup=user_db._register_functions).acquire()
+    assert user_db.run_migrations(conn) == [version for version, _, _ in user_db.MIGRATIONS]
+    assert user_db.schema_version(conn) == user_db.SCHEMA_VERSION
+    assert user_db.run_migrations(conn) == []
+
+    # Inline texts moved to the blob store, repeated uploads removed
+    assert conn.execute("SELECT COUNT(*) FROM uploaded_files").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM uploaded_files WHERE file_content IS NOT NULL").fetchone()[0] == 0
+    original_hash, processed_hash = conn.execute(
+        "SELECT original_hash, processed_hash FROM processed_text").fetchone()
+    assert user_db.get_blob_text(original_hash, conn) == "the original zeppelin text"
+    assert user_db.get_blob_text(processed_hash, conn) == "a short summary"
+
+    # Photos and documents moved out of the users row
+    assert conn.execute("SELECT photo, uploaded_file FROM users").fetchone() == (None, None)
+    files = {row[0]: row[1:] for row in conn.execute("SELECT file_name, kind, size FROM user_files")}
+    assert files == {"old.pdf": ("document", 2), "profile_photo": ("photo", 5),
+                     "uploaded_document": ("document", 8)}
+    fts_ready = conn.execute("SELECT 1 FROM sqlite_master WHERE name='processed_text_fts'").fetchone()
+    conn.close()
+
+    monkeypatch.setattr(user_db, "DB_NAME", path)
+    if fts_ready:
+        # Migration 6 indexes rows that already existed
+        assert [row["preview"] for row in user_db.search_history("ann", "zeppelin")] == ["a short summary"]
+    assert user_db.read_user_file("ann", user_db.get_user_profile("ann")["photo_id"]) == b"PHOTO"
+
+def test_blob_store_keeps_each_upload_once(db):
+    db.save_uploaded_file("ann", b"the same bytes " * 100, "a.txt")
+    db.save_uploaded_file("ann", b"the same bytes " * 100, "a.txt")
+    db.save_uploaded_file("ann", b"the same bytes " * 100, "copy.txt")
+    conn = db.get_db()
+    assert conn.execute("SELECT COUNT(*) FROM uploaded_files").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+    conn.close()
+    stats = db.blob_storage_stats()
+    assert stats["stored_bytes"] < stats["logical_bytes"]
+
+def test_history_keyset_pagination_visits_every_row_once(db):
+    db.save_processed_texts("ann", "summary", [(f"original {i}", f"summary {i}") for i in range(23)])
+    for i in range(4):
+        db.save_processed_text("ann", "paraphrase", f"sentence {i}", f"paraphrase {i}")
+    db.save_processed_text("bob", "summary", "not ann's", "hidden")
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = db.get_history("ann", limit=5, cursor=cursor)
+        seen.extend(rows)
+        if cursor is None:
+            break
+    assert len(seen) == 27
+    assert len({row["id"] for row in seen}) == 27
+    # Newest first; rows saved in one batch share created_at and are ordered by id
+    keys = [(row["created_at"], row["id"]) for row in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert seen[0]["preview"] == "paraphrase 3"
+
+    rows, cursor = db.get_history("ann", limit=10, task_type="paraphrase")
+    assert [row["preview"] for row in rows] == [f"paraphrase {i}" for i in reversed(range(4))]
+    assert cursor is None
+
+def test_history_item_is_scoped_to_its_user(db):
+    db.save_processed_text("ann", "summary", "full original", "full summary")
+    item_id = db.get_history("ann")[0][0]["id"]
+    item = db.get_history_item("ann", item_id)
+    assert (item["original_text"], item["processed_text"]) == ("full original", "full summary")
+    assert db.get_history_item("bob", item_id) is None
+
+def test_search_index_follows_saves_and_deletes(fts):
+    fts.save_processed_text("ann", "summary", "an aardvark walked", "the wombat summary")
+    fts.save_processed_text("bob", "summary", "an aardvark walked", "bob's wombat")
+    fts.save_processed_texts("ann", "paraphrase", [("a platypus swam", "one"), ("a platypus dived", "two")])
+    assert [row["preview"] for row in fts.search_history("ann", "aardvark")] == ["the wombat summary"]
+    assert sorted(row["preview"] for row in fts.search_history("ann", "platypus")) == ["one", "two"]
+
+    item_id = fts.search_history("ann", "wombat")[0]["id"]
+    assert fts.delete_history_item("bob", item_id) is False
+    assert fts.delete_history_item("ann", item_id) is True
+    assert fts.search_history("ann", "wombat") == []
+    assert len(fts.search_history("bob", "wombat")) == 1
+
+def test_processed_text_is_writable_without_the_app_functions(fts):
+    fts.save_processed_text("ann", "summary", "an aardvark walked", "the wombat summary")
+    # A plain connection, like the sqlite3 CLI, has no text_unpack
+    conn = sqlite3.connect(fts.DB_NAME)
+    digest = conn.execute("SELECT processed_hash FROM processed_text").fetchone()[0]
+    conn.execute("""INSERT INTO processed_text (username, task_type, original_hash, processed_hash, model, created_at)
+                    VALUES ('ann', 'summary', ?, ?, 'pegasus', '2024-01-01')""", (digest, digest))
+    conn.execute("UPDATE processed_text SET model='other'")
+    conn.execute("DELETE FROM processed_text WHERE created_at='2024-01-01'")
+    conn.commit()
+    conn.close()
+
+    assert fts.rebuild_history_index() == 1
+    assert [row["preview"] for row in fts.search_history("ann", "wombat")] == ["the wombat summary"]
+
+def test_search_treats_user_input_literally(fts):
+    fts.save_processed_text("ann", "summary", 'quote " and OR NOT near', "result")
+    assert len(fts.search_history("ann", 'quote " OR')) == 1
+    assert fts.search_history("ann", "   ") == []
+
+def test_update_profile_keeps_the_old_photo_when_the_upload_fails(db):
+    db.add_user("ann", "ann@example.com", "secret", photo=b"old photo")
+    version = db.profile_version("ann")
+
+    class Broken(io.BytesIO):
+        def read(self, *args):
+            raise OSError("upload interrupted")
+
+    with pytest.raises(OSError):
+        db.update_profile("ann", "Ann", 30, "Female", "en", Broken(b"new photo"))
+    profile = db.get_user_profile("ann")
+    assert profile["name"] is None
+    assert db.read_user_file("ann", profile["photo_id"]) == b"old photo"
+
+    db.update_profile("ann", "Ann", 30, "Female", "en", b"new photo")
+    profile = db.get_user_profile("ann")
+    assert profile["name"] == "Ann"
+    assert db.read_user_file("ann", profile["photo_id"]) == b"new photo"
+    assert len([f for f in profile["files"] if f["kind"] == "photo"]) == 1
+    assert db.profile_version("ann") > version
+
+def test_user_lookup_returns_its_connection_on_error(db, monkeypatch):
+    db.add_user("ann", "ann@example.com", "secret")
+    pool = db._pools[db.DB_NAME]
+    opened = pool.opened
+    for _ in range(3):
+        with pytest.raises(sqlite3.OperationalError):
+            db._fetch_user("no_such_column=?", ("ann",))
+    assert pool.opened == opened
+    assert db.get_user("ann")["email"] == "ann@example.com"
+
+def test_concurrent_identical_submits_share_one_job(db):
+    start = threading.Barrier(8)
+
+    def submit(_):
+        start.wait()
+        return db.submit_job("ann", "summary", "same text", {"summary_length": "short"})
+
+    with ThreadPoolExecutor(8) as pool:
+        ids = set(pool.map(submit, range(8)))
+    assert len(ids) == 1
+    assert db.submit_job("ann", "summary", "same text", {"summary_length": "long"}) not in ids
+
+def test_claim_finish_and_requeue(db):
+    first = db.submit_job("ann", "summary", "one")
+    second = db.submit_job("ann", "summary", "two")
+    job = db.claim_next_job("host:1:0")
+    assert (job["id"], job["input_text"], job["status"]) == (first, "one", "running")
+    assert db.claim_next_job("otherhost:2:0")["id"] == second
+
+    assert db.running_job_workers("host:") == ["host:1:0"]
+    assert db.requeue_running_jobs("host:1:0") == 1
+    assert db.get_job(first)["status"] == "queued"
+
+    db.finish_job(second, result={"text": "done"})
+    assert db.get_job(second)["result"] == {"text": "done"}
+
+def test_claim_reports_a_locked_database(db):
+    db.submit_job("ann", "summary", "one")
+    blocker = sqlite3.connect(db.DB_NAME, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    conn = db.get_db()
+    conn.execute("PRAGMA busy_timeout=0")
+    conn.close()
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            db.claim_next_job("host:1:0")
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert db.claim_next_job("host:1:0")["status"] == "running"